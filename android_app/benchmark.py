@@ -0,0 +1,318 @@
+#!/usr/bin/env python3
+"""
+Benchmark suite for the Android Card Generator
+Measures rendering throughput, output size and memory for several deck
+shapes and sizes, and compares the results against a stored JSON baseline
+"""
+
+from card_generator_android import CardGeneratorAndroid
+from test_generator import create_sample_card_data
+from concurrent.futures import ProcessPoolExecutor
+import argparse
+import contextlib
+import io
+import json
+import multiprocessing
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+DECK_KINDS = ('icons', 'images', 'long_text')
+DEFAULT_SIZES = (10, 1000, 100000)
+DEFAULT_BASELINE = 'benchmark_baseline.json'
+PAGES_PER_FILE = 100  # Keeps 100k-card runs at constant memory
+IMAGE_POOL_SIZE = 16
+
+# Metric name -> True if bigger is better
+METRICS = {
+    'cards_per_second': True,
+    'bytes_per_card': False,
+    'tracemalloc_peak_kb': False,
+    'peak_rss_kb': False,
+}
+
+# App modules main.py imports before its first frame (Kivy's own startup is not ours)
+STARTUP_MODULES = ('thumbnails', 'deck_model', 'deck_project')
+# Loaded on first use (Generate, first thumbnail); none may be pulled in at startup
+DEFERRED_MODULES = ('card_generator_android', 'reportlab', 'PIL')
+STARTUP_BUDGET_MS = 150.0
+STARTUP_PROBE = """
+import sys, time
+start = time.perf_counter()
+import {modules}
+elapsed = time.perf_counter() - start
+print(elapsed * 1000)
+print(' '.join(name for name in {deferred!r} if name in sys.modules))
+"""
+
+LONG_WORDS = ('draw discard attack defend shield energy token opponent turn '
+              'reveal shuffle deck hand graveyard exile counter target ally').split()
+
+def make_images(tmp_dir, count=IMAGE_POOL_SIZE):
+    """Write a pool of camera-sized JPEGs for the image-heavy deck"""
+    from PIL import Image as PILImage
+    paths = []
+    for i in range(count):
+        path = os.path.join(tmp_dir, f'art_{i}.jpg')
+        noise = PILImage.effect_noise((1600, 1200), 40 + i).convert('RGB')
+        noise.save(path, 'JPEG', quality=85)
+        paths.append(path)
+    return paths
+
+def long_text(seed, words=40):
+    """Deterministic rules-style text of roughly words words"""
+    return ' '.join(LONG_WORDS[(seed * 7 + i * 3) % len(LONG_WORDS)] for i in range(words))
+
+def make_deck(card_count, kind='icons', image_paths=None):
+    """Yield card_count cards of the given deck kind"""
+    sample_cards = create_sample_card_data()
+    for i in range(card_count):
+        card = dict(sample_cards[i % len(sample_cards)])
+        card['Card_Name'] = f"{card['Card_Name']} {i}"
+        if kind == 'images':
+            card['Custom_Image'] = image_paths[i % len(image_paths)]
+        elif kind == 'long_text':
+            # A pool of 50 distinct texts, like a real deck's shared rules
+            card['Task'] = long_text(i % 50)
+            card['Rules'] = long_text(i % 50 + 1, words=60)
+        yield card
+
+def render_deck(kind, card_count, tmp_dir, image_paths):
+    """Render one deck and return the total bytes written"""
+    generator = CardGeneratorAndroid()
+    output_file = os.path.join(tmp_dir, f'{kind}_{card_count}.pdf')
+    with contextlib.redirect_stdout(io.StringIO()):
+        files = generator.generate_pdf_stream(make_deck(card_count, kind, image_paths),
+                                              output_file, pages_per_file=PAGES_PER_FILE)
+    if not files:
+        raise RuntimeError(f"PDF generation failed for {kind}/{card_count}")
+    total_bytes = sum(os.path.getsize(name) for name in files)
+    for name in files:
+        os.remove(name)
+    return total_bytes
+
+def peak_rss_kb():
+    """Peak resident set size of this process, or None where unsupported"""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # macOS reports bytes, Linux kilobytes
+    return peak // 1024 if sys.platform == 'darwin' else peak
+
+def run_case(kind, card_count):
+    """Measure one (deck kind, size) case; meant to run in a fresh process"""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        image_paths = make_images(tmp_dir) if kind == 'images' else None
+
+        start = time.perf_counter()
+        total_bytes = render_deck(kind, card_count, tmp_dir, image_paths)
+        elapsed = time.perf_counter() - start
+        rss = peak_rss_kb()
+
+        # Separate pass so tracing overhead does not skew the timing
+        tracemalloc.start()
+        render_deck(kind, card_count, tmp_dir, image_paths)
+        traced_peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+    return {
+        'kind': kind,
+        'cards': card_count,
+        'seconds': elapsed,
+        'cards_per_second': card_count / elapsed,
+        'bytes_per_card': total_bytes / card_count,
+        'tracemalloc_peak_kb': traced_peak // 1024,
+        'peak_rss_kb': rss,
+    }
+
+def run_suite(sizes, kinds):
+    """Run every case in its own process so peak RSS is per case"""
+    results = {}
+    context = multiprocessing.get_context('spawn')
+    print(f"{'case':<18} {'cards/s':>10} {'bytes/card':>11} {'trace KB':>9} {'RSS KB':>9}")
+    for kind in kinds:
+        for card_count in sizes:
+            with ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+                result = pool.submit(run_case, kind, card_count).result()
+            key = f'{kind}/{card_count}'
+            results[key] = result
+            rss = result['peak_rss_kb'] if result['peak_rss_kb'] is not None else '-'
+            print(f"{key:<18} {result['cards_per_second']:>10.1f} "
+                  f"{result['bytes_per_card']:>11.1f} {result['tracemalloc_peak_kb']:>9} {rss:>9}")
+    return results
+
+def compare_to_baseline(results, baseline, threshold):
+    """Return a description of every metric that regressed past threshold"""
+    regressions = []
+    for key, result in results.items():
+        previous = baseline.get(key)
+        if not previous:
+            continue
+        for metric, higher_is_better in METRICS.items():
+            old, new = previous.get(metric), result.get(metric)
+            if not old or new is None:
+                continue
+            change = (new - old) / old
+            if (higher_is_better and change < -threshold) or \
+               (not higher_is_better and change > threshold):
+                regressions.append(f"{key} {metric}: {old:.1f} -> {new:.1f} ({change:+.0%})")
+    return regressions
+
+def time_generation(cards_data, output_file, **kwargs):
+    """Generate a PDF with stdout silenced and return the elapsed seconds"""
+    generator = CardGeneratorAndroid()
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        result = generator.generate_pdf(cards_data, output_file, **kwargs)
+    elapsed = time.perf_counter() - start
+    if not result:
+        raise RuntimeError(f"PDF generation failed for {output_file}")
+    return elapsed
+
+def benchmark_profiles(card_count, kinds):
+    """Print output bytes/card for every output profile and deck kind"""
+    from output_profiles import PROFILES
+    print(f"Output profiles, {card_count} cards")
+    print(f"{'case':<18} " + ' '.join(f"{name:>10}" for name in PROFILES))
+
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        image_paths = make_images(tmp_dir) if 'images' in kinds else None
+        for kind in kinds:
+            cards_data = list(make_deck(card_count, kind, image_paths))
+            row = {}
+            for name in PROFILES:
+                output_file = os.path.join(tmp_dir, f'{kind}_{name}.pdf')
+                generator = CardGeneratorAndroid(profile=name)
+                with contextlib.redirect_stdout(io.StringIO()):
+                    if not generator.generate_pdf(cards_data, output_file):
+                        raise RuntimeError(f"PDF generation failed for {kind}/{name}")
+                row[name] = os.path.getsize(output_file) / card_count
+                os.remove(output_file)
+            results[kind] = row
+            print(f"{kind:<18} " + ' '.join(f"{row[name]:>10.1f}" for name in PROFILES))
+    return results
+
+def measure_startup(repeat=5):
+    """Import the startup modules in fresh interpreters
+    
+    Returns the best import time in ms over repeat runs and the deferred
+    modules that startup loaded anyway.
+    """
+    probe = STARTUP_PROBE.format(modules=', '.join(STARTUP_MODULES), deferred=DEFERRED_MODULES)
+    app_dir = os.path.dirname(os.path.abspath(__file__))
+    times = []
+    loaded = set()
+    for _ in range(repeat):
+        output = subprocess.run([sys.executable, '-c', probe], cwd=app_dir, check=True,
+                                capture_output=True, text=True).stdout.splitlines()
+        times.append(float(output[0]))
+        loaded.update(output[1].split() if len(output) > 1 else ())
+    return {'import_ms': min(times), 'deferred_loaded': sorted(loaded)}
+
+def benchmark_startup(budget_ms=STARTUP_BUDGET_MS):
+    """Print startup import time against the budget; returns True when within it"""
+    result = measure_startup()
+    print(f"Startup imports ({', '.join(STARTUP_MODULES)}): "
+          f"{result['import_ms']:.1f}ms, budget {budget_ms:.0f}ms")
+    ok = result['import_ms'] <= budget_ms
+    if not ok:
+        print("✗ Over the startup budget; see python -X importtime for the slowest imports")
+    if result['deferred_loaded']:
+        ok = False
+        print(f"✗ Loaded at startup instead of on first use: {', '.join(result['deferred_loaded'])}")
+    if ok:
+        print("✓ Startup within budget")
+    return ok
+
+def benchmark_parallel(card_count, worker_counts):
+    """Print cards/second and speedup for each worker count"""
+    cards_data = list(make_deck(card_count))
+    print(f"Parallel scaling, {card_count} cards ({os.cpu_count()} CPUs)")
+    print(f"{'workers':>8} {'seconds':>9} {'cards/s':>10} {'speedup':>8}")
+
+    results = []
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        baseline = None
+        for workers in worker_counts:
+            output_file = os.path.join(tmp_dir, f'parallel_{workers}.pdf')
+            elapsed = time_generation(cards_data, output_file, workers=workers)
+            baseline = baseline or elapsed
+            results.append({'workers': workers, 'seconds': elapsed,
+                            'cards_per_second': card_count / elapsed})
+            print(f"{workers:>8} {elapsed:>9.3f} {card_count / elapsed:>10.1f} "
+                  f"{baseline / elapsed:>7.2f}x")
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the card generator')
+    parser.add_argument('--sizes', default=','.join(str(s) for s in DEFAULT_SIZES),
+                        help='comma separated deck sizes (default: 10,1000,100000)')
+    parser.add_argument('--kinds', default=','.join(DECK_KINDS),
+                        help='comma separated deck kinds: icons, images, long_text')
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE,
+                        help=f'baseline JSON file (default: {DEFAULT_BASELINE})')
+    parser.add_argument('--save-baseline', action='store_true',
+                        help='store this run as the new baseline')
+    parser.add_argument('--threshold', type=float, default=0.15,
+                        help='allowed relative regression per metric (default: 0.15)')
+    parser.add_argument('--parallel', metavar='CARDS', type=int,
+                        help='only run the parallel scaling benchmark with CARDS cards')
+    parser.add_argument('--workers', default='1,2,4',
+                        help='comma separated worker counts for --parallel (default: 1,2,4)')
+    parser.add_argument('--profiles', metavar='CARDS', type=int,
+                        help='only compare output bytes/card per output profile with CARDS cards')
+    parser.add_argument('--startup', action='store_true',
+                        help='only check app startup import time against the budget')
+    parser.add_argument('--startup-budget', type=float, default=STARTUP_BUDGET_MS,
+                        help=f'startup import budget in ms (default: {STARTUP_BUDGET_MS:.0f})')
+    args = parser.parse_args()
+
+    if args.startup:
+        return 0 if benchmark_startup(args.startup_budget) else 1
+
+    if args.parallel:
+        benchmark_parallel(args.parallel, [int(w) for w in args.workers.split(',')])
+        return 0
+
+    sizes = [int(s) for s in args.sizes.split(',')]
+    kinds = [k for k in args.kinds.split(',') if k]
+    unknown = set(kinds) - set(DECK_KINDS)
+    if unknown:
+        parser.error(f"unknown deck kinds: {', '.join(sorted(unknown))}")
+
+    if args.profiles:
+        benchmark_profiles(args.profiles, kinds)
+        return 0
+
+    results = run_suite(sizes, kinds)
+
+    if args.save_baseline:
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+        print(f"\nBaseline saved: {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print(f"\nNo baseline at {args.baseline}; run with --save-baseline to create one")
+        return 0
+
+    with open(args.baseline, encoding='utf-8') as f:
+        baseline = json.load(f)
+    regressions = compare_to_baseline(results, baseline, args.threshold)
+    if regressions:
+        print(f"\n✗ {len(regressions)} regression(s) beyond {args.threshold:.0%}:")
+        for line in regressions:
+            print(f"   - {line}")
+        return 1
+
+    print(f"\n✓ No regressions beyond {args.threshold:.0%} against {args.baseline}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
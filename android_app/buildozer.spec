@@ -12,7 +12,7 @@ source.include_exts = py,png,jpg,jpeg,kv,atlas,json
 version = 1.0
 
 # App requirements
-requirements = python3,kivy,reportlab,pillow,pandas,openpyxl
+requirements = python3,kivy,reportlab==5.0.1,pillow,numpy,pandas,openpyxl
 
 # App main module
 source.main = main.py
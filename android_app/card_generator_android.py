@@ -1,269 +1,553 @@
-from reportlab.lib.pagesizes import letter, A4
+import reportlab
+from reportlab import rl_config
 from reportlab.pdfgen import canvas
-from reportlab.lib.units import inch, mm
-from reportlab.lib.colors import black, red, blue, green
-from reportlab.graphics.shapes import Drawing, Rect, Circle, Polygon
-from reportlab.graphics import renderPDF
+from reportlab.lib.units import mm
 from reportlab.lib import colors
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer
-from reportlab.lib.styles import getSampleStyleSheet
 from reportlab.lib.utils import ImageReader
 from PIL import Image as PILImage
+from image_cache import ImageCache
+from render_cache import RenderCache
+from text_layout import fit_text
+from card_template import CardTemplate, icon_color
+from card_record import IconColor, as_record, as_suit, expand_copies
+from suit_registry import SuitRegistry
+from instrumentation import NULL_STATS
+from image_source import BLOB_PREFIX, is_blob, open_source
+from output_profiles import DEFAULT_PROFILE, get_profile, font_names
+from collections import OrderedDict
+import hashlib
+import io
+import json
 import os
-import sys
+import re
+
+GLYPH_UNIT = 100  # Suit glyph forms are drawn in a 100pt box and scaled on placement
+MAX_FILE_DIGESTS = 1024  # Remembered image file hashes (LRU)
+DEFAULT_CARDS_PER_PAGE = 10  # Receipt page length used by generate_pdf_stream
+FORM_USE = re.compile(r'/FormXob\.(\S+) Do')  # Form placements in a content stream
+REDUCING_GAP = 2.0  # Cheap integer reduction down to this multiple of the target, then LANCZOS
+REPORTLAB_CHECKED = '3.6 - 5.0'  # Releases whose private page state page_operators relies on
+
+# Binary rather than ASCII85 streams, for every output profile: a quarter
+# smaller, and every PDF reader accepts them
+rl_config.useA85 = 0
+
+def page_operators(canvas):
+    """The current page's drawing operators, as reportlab's private Canvas._code
+    
+    Operator recording and splicing (render cache, parallel shards) is the
+    only code that reaches into reportlab internals, all through this and
+    page_forms; checked against REPORTLAB_CHECKED.
+    """
+    return _canvas_internal(canvas, '_code')
+
+def page_forms(canvas):
+    """Names of the forms listed in the current page's resources (Canvas._formsinuse)"""
+    return _canvas_internal(canvas, '_formsinuse')
+
+def _canvas_internal(canvas, name):
+    value = getattr(canvas, name, None)
+    if not isinstance(value, list):
+        raise RuntimeError(f"reportlab {reportlab.Version} has no list Canvas.{name}; "
+                           f"operator replay was checked against reportlab {REPORTLAB_CHECKED}")
+    return value
+
+def crop_box(source_size, target_size):
+    """Centered box of source_size with the aspect ratio of target_size"""
+    source_width, source_height = source_size
+    target_width, target_height = target_size
+    if source_width * target_height > source_height * target_width:
+        # Wider than the target: trim the sides
+        width = source_height * target_width / target_height
+        left = (source_width - width) / 2
+        return (left, 0, left + width, source_height)
+    height = source_width * target_height / target_width
+    top = (source_height - height) / 2
+    return (0, top, source_width, top + height)
+
+def read_output(output_file):
+    """Bytes of a finished PDF written to a path or a file-like object"""
+    if hasattr(output_file, 'getvalue'):
+        return output_file.getvalue()
+    with open(output_file, 'rb') as f:
+        return f.read()
+
+def write_output(output_file, data):
+    if hasattr(output_file, 'write'):
+        output_file.write(data)
+    else:
+        with open(output_file, 'wb') as f:
+            f.write(data)
 
 class CardGeneratorAndroid:
-    def __init__(self):
+    def __init__(self, shrink_text=False, render_cache_dir=None, stats=None, verbose=False,
+                 image_dpi=None, profile=DEFAULT_PROFILE, deterministic=False, icon_packs=()):
         # Updated dimensions for 26mm card width
         self.card_width = 26 * mm  # 26mm card width as requested
         self.card_height = 36.4 * mm  # Maintaining 2.5:3.5 aspect ratio (26 * 3.5/2.5)
         self.print_width = 30 * mm  # 30mm print paper width
         self.margin = 2 * mm  # Smaller margins for 26mm card on 30mm paper
+        self.form_recipes = {}  # Form name -> how to rebuild it, for the current document
+        self.text_width = self.card_width - 2 * mm  # 1mm padding on each side
+        self.text_size = 4  # Task/Rules font size in points
+        # Shrink Task/Rules text (down to min_text_size) so it fits on two lines
+        self.min_text_size = 2.5 if shrink_text else None
+        # Image encoding and fonts (output_profiles.PROFILES)
+        self.profile = get_profile(profile)
+        self.font_name, self.bold_font_name = font_names(self.profile)
+        # Text in an embedded (subsetted) font is encoded per document, so
+        # drawing operators cannot be replayed into another PDF
+        self.replay_operators = not self.profile.embed_fonts
+        # Custom images are decoded to their printed size at this resolution
+        self.image_dpi = image_dpi or self.profile.image_dpi
+        # Offsets and static chrome compiled once for this card size
+        self.template = CardTemplate(self.card_width, self.card_height, self.bold_font_name)
+        self.form_recipes[self.template.form_name] = ('frame',)
+        # Directories of SVG suit icons, loaded into this generator's own suit
+        # registry so other generators keep their outlines
+        self.icon_packs = tuple(icon_packs)
+        self.load_icon_packs()
+        # Everything besides the card data and suit outlines that changes how a card is drawn
+        self._layout = [self.card_width, self.card_height, self.text_width,
+                        self.text_size, self.min_text_size, self.template.form_name,
+                        self.image_dpi, self.font_name, self.bold_font_name]
+        # Optional on-disk cache of rendered cards, reused across runs
+        self.render_cache_dir = render_cache_dir
+        # Fixed timestamps and document IDs: the same deck gives the same bytes,
+        # and with a render cache generate_pdf reuses whole documents
+        self.deterministic = deterministic
+        self._file_digests = OrderedDict()  # (path, mtime, size) -> content hash, LRU
+        # Phase timers and counters (instrumentation.Stats); off by default
+        self.stats = stats if stats is not None else NULL_STATS
+        # Print a line per card as well as the run summary
+        self.verbose = verbose
+        self._make_caches()
+    
+    def _make_caches(self):
+        self.render_cache = RenderCache(self.render_cache_dir) if self.render_cache_dir else None
+        # Resized custom images shared across cards (and runs, with a render cache)
+        self.image_cache = ImageCache(disk_cache=self.render_cache)
+        # In-memory images by content hash, for form recipes read back from the render cache
+        self.image_blobs = {}
+    
+    def __getstate__(self):
+        # In-memory caches are per process; parallel workers start with empty ones
+        state = self.__dict__.copy()
+        del state['image_cache']
+        del state['render_cache']
+        del state['image_blobs']
+        del state['suit_shapes']
+        # Worker timings are not collected (the hook may not pickle); the parent
+        # times the parallel render as a whole
+        state['stats'] = NULL_STATS
+        return state
+    
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        # A spawned worker knows only the built-in suits until it loads the packs
+        self.load_icon_packs()
+        self._make_caches()
+    
+    def load_icon_packs(self):
+        self.suit_shapes = SuitRegistry()
+        for directory in self.icon_packs:
+            self.suit_shapes.load_icon_pack(directory)
+    
+    @property
+    def layout_signature(self):
+        """Everything besides the card data that changes how a card is drawn"""
+        return self._layout + [self.suit_shapes.signature()]
         
-    def resize_custom_image(self, image_path, target_size=(20*mm, 20*mm)):
-        """Resize uploaded image to 20mm x 20mm"""
-        try:
-            with PILImage.open(image_path) as img:
-                # Convert to RGB if needed
+    def image_pixels(self, target_size):
+        """Pixel size of an image printed at target_size (points) at image_dpi"""
+        scale = self.image_dpi / 72
+        return (max(1, round(target_size[0] * scale)), max(1, round(target_size[1] * scale)))
+    
+    def _resize_image(self, source, pixel_size):
+        """Decode an image (path or ImageBlob) straight to pixel_size, center-cropped
+        to its aspect ratio
+        
+        JPEGs are decoded at 1/2, 1/4 or 1/8 scale when that still leaves
+        REDUCING_GAP times the pixels needed, and large factors are taken with
+        a cheap integer reduce() before the final LANCZOS pass.
+        """
+        stats = self.stats
+        width, height = int(pixel_size[0]), int(pixel_size[1])
+        # The source is read once, by the decoder; blobs are read in place
+        with open_source(source) as f, PILImage.open(f) as img:
+            with stats.phase('image_decode'):
+                full_width, full_height = img.size
+                box = crop_box(img.size, (width, height))
+                # Smallest whole-image size that keeps the crop REDUCING_GAP x the target
+                needed = (full_width * width * REDUCING_GAP / (box[2] - box[0]),
+                          full_height * height * REDUCING_GAP / (box[3] - box[1]))
+                img.draft('RGB', (int(needed[0]), int(needed[1])))
+                img.load()
                 if img.mode != 'RGB':
                     img = img.convert('RGB')
-                
-                # Resize to target size (maintaining aspect ratio with crop)
-                img_resized = img.resize((int(target_size[0]), int(target_size[1])), PILImage.Resampling.LANCZOS)
-                
-                # Save temporary resized image
-                temp_path = 'temp_resized_image.png'
-                img_resized.save(temp_path, 'PNG')
-                return temp_path
+                # Draft mode shrank the decoded image; scale the crop box with it
+                scale = img.size[0] / full_width
+                box = tuple(edge * scale for edge in box)
+            
+            with stats.phase('image_resize'):
+                return img.resize((width, height), PILImage.Resampling.LANCZOS, box=box,
+                                  reducing_gap=REDUCING_GAP)
+    
+    def resize_custom_image(self, image_path, target_size=(20*mm, 20*mm)):
+        """Resize uploaded image to 20mm x 20mm (at image_dpi)"""
+        try:
+            img_resized = self._resize_image(image_path, self.image_pixels(target_size))
+            
+            # Save temporary resized image
+            temp_path = 'temp_resized_image.png'
+            img_resized.save(temp_path, 'PNG')
+            return temp_path
+        except Exception as e:
+            self.stats.count('errors')
+            print(f"Error resizing image: {e}")
+            return None
+    
+    def load_custom_image(self, image_path, target_size=None):
+        """Return the image resized for target_size points (default: the card's
+        image box) from the cache, decoding it on first use"""
+        if target_size is None:
+            target_size = (self.template.layout.image_size, self.template.layout.image_size)
+        return self.load_image_pixels(image_path, self.image_pixels(target_size))
+    
+    def load_image_pixels(self, source, pixel_size):
+        """Return the image (path or ImageBlob) resized to pixel_size from the cache
+        
+        A missing file gives None without an error, like a card without an image.
+        """
+        try:
+            if not self.stats.enabled:
+                return self.image_cache.get(source, pixel_size, self._resize_image)
+            misses = self.image_cache.misses
+            cached_image = self.image_cache.get(source, pixel_size, self._resize_image)
+            self.stats.count('images')
+            self.stats.count('image_cache_misses' if self.image_cache.misses > misses
+                             else 'image_cache_hits')
+            return cached_image
+        except FileNotFoundError:
+            return None
         except Exception as e:
+            self.stats.count('errors')
             print(f"Error resizing image: {e}")
             return None
     
+    def image_form(self, canvas, cached_image):
+        """Return the form name for a cached image, embedding it on first use"""
+        form_name = f'img_{cached_image.pixels_digest}'
+        if not canvas.hasForm(form_name):
+            # Unit-sized form so the same image can be placed at any size
+            canvas.beginForm(form_name, 0, 0, 1, 1)
+            canvas.drawImage(self.image_reader(cached_image), 0, 0, width=1, height=1)
+            canvas.endForm()
+            self.form_recipes[form_name] = ('image', cached_image.source, cached_image.target_size)
+        return form_name
+    
+    def image_reader(self, cached_image):
+        """The image as the output profile embeds it: lossless, or re-encoded as JPEG"""
+        if self.profile.image_format != 'jpeg':
+            return cached_image.reader
+        data = io.BytesIO()
+        cached_image.image.save(data, 'JPEG', quality=self.profile.jpeg_quality, optimize=True)
+        data.seek(0)
+        # A JPEG-backed reader is embedded as-is (DCTDecode)
+        return ImageReader(data)
+    
+    def draw_cached_image(self, canvas, cached_image, x, y, size):
+        """Place a cached image; it is embedded once per PDF as a form"""
+        form_name = self.image_form(canvas, cached_image)
+        canvas.saveState()
+        canvas.translate(x, y)
+        canvas.scale(size, size)
+        canvas.doForm(form_name)
+        canvas.restoreState()
+    
     def draw_suit_icon(self, canvas, x, y, suit, color, size=4):
         """Draw suit icon on the card - scaled for mobile cards"""
         canvas.saveState()
+        canvas.setFillColor(icon_color(color))
+        # Outlines are precomputed in a unit box (suit_registry) and only scaled here
+        self.suit_shapes.shape(suit).draw(canvas, x, y, size)
+        canvas.restoreState()
+    
+    def suit_form(self, canvas, suit, color):
+        """Return the form name for a (Suit, IconColor) glyph, building it on first use"""
+        form_name = f'suit_{suit.name.lower()}_{color.value}'
+        if not canvas.hasForm(form_name):
+            canvas.beginForm(form_name, 0, 0, GLYPH_UNIT, GLYPH_UNIT)
+            self.draw_suit_icon(canvas, 0, 0, suit, color, size=GLYPH_UNIT)
+            canvas.endForm()
+            # Recipes travel as JSON (render cache), so store the plain names
+            self.form_recipes[form_name] = ('suit', suit.value, color.value)
+        return form_name
+    
+    def ensure_forms(self, canvas, recipes):
+        """Rebuild forms recorded by another canvas (e.g. a parallel worker)"""
+        for form_name, recipe in recipes.items():
+            if canvas.hasForm(form_name):
+                continue
+            if recipe[0] == 'frame':
+                self.template.frame_form(canvas)
+            elif recipe[0] == 'suit':
+                self.suit_form(canvas, as_suit(recipe[1]), IconColor(recipe[2]))
+            elif recipe[0] == 'card':
+                self.card_form(canvas, as_record(recipe[1]))
+            elif recipe[0] == 'image':
+                source = recipe[1]
+                if isinstance(source, str) and source.startswith(BLOB_PREFIX):
+                    source = self.image_blobs[source[len(BLOB_PREFIX):]]
+                cached_image = self.load_image_pixels(source, recipe[2])
+                if cached_image is None:
+                    raise ValueError(f"Cannot rebuild image form {form_name}")
+                self.image_form(canvas, cached_image)
+    
+    def record_operators(self, canvas, first_op):
+        """Return the operators drawn since first_op and recipes for the forms they use"""
+        operators = '\n'.join(page_operators(canvas)[first_op:])
+        # In order of first use, so rebuilding them elsewhere creates the
+        # form objects in the same order as drawing the cards directly
+        used_forms = dict.fromkeys(FORM_USE.findall(operators))
+        return operators, {name: self.form_recipes[name] for name in used_forms}
+    
+    def splice_operators(self, canvas, operators, recipes):
+        """Insert operators recorded by record_operators, possibly in another canvas"""
+        self.ensure_forms(canvas, recipes)
+        canvas.addLiteral(operators)
+        # addLiteral bypasses doForm, so list the forms in the page resources
+        page_forms(canvas).extend(recipes)
+    
+    def new_canvas(self, output_file, pagesize):
+        """Canvas for an output file, set up for the output profile"""
+        # Form recipes and in-memory images only matter within one document;
+        # a long-lived generator (render service) would otherwise keep every deck's
+        self.form_recipes = {self.template.form_name: ('frame',)}
+        self.image_blobs = {}
+        new_canvas = canvas.Canvas(output_file, pagesize=pagesize,
+                                   pageCompression=1,
+                                   initialFontName=self.font_name,
+                                   invariant=int(self.deterministic))
+        self.prepare_canvas(new_canvas)
+        return new_canvas
+    
+    def prepare_canvas(self, canvas):
+        """Register fonts in a fixed order so their PDF names match across canvases"""
+        canvas.setFont(self.bold_font_name, 7)
+        canvas.setFont(self.font_name, 4)
+    
+    def page_capacity(self, cards_per_page=None, max_page_length_mm=None):
+        """Number of cards per receipt page, from a card count or a page length"""
+        if cards_per_page:
+            return cards_per_page
+        if max_page_length_mm:
+            usable = max_page_length_mm * mm - self.margin
+            return max(1, int(usable // (self.card_height + self.margin)))
+        return DEFAULT_CARDS_PER_PAGE
+    
+    def card_y(self, page_height, index):
+        """Vertical position of the index-th card on a strip page"""
+        return page_height - self.margin - (index + 1) * (self.card_height + self.margin)
+    
+    def draw_suit_glyph(self, canvas, x, y, suit, color, size=4):
+        """Place a suit glyph; its geometry is emitted once per PDF"""
+        form_name = self.suit_form(canvas, suit, color)
+        canvas.saveState()
+        canvas.translate(x, y)
+        canvas.scale(size / GLYPH_UNIT, size / GLYPH_UNIT)
+        canvas.doForm(form_name)
+        canvas.restoreState()
+    
+    def draw_card(self, canvas, x, y, card_data):
+        """Draw a single card optimized for 26mm width
         
-        if color == 'red':
-            canvas.setFillColor(colors.red)
-        elif color == 'blue':
-            canvas.setFillColor(colors.blue)
-        elif color == 'green':
-            canvas.setFillColor(colors.green)
-        elif color == 'purple':
-            canvas.setFillColor(colors.purple)
-        elif color == 'orange':
-            canvas.setFillColor(colors.orange)
-        else:
-            canvas.setFillColor(colors.black)
-        
-        if suit.lower() == 'diamond':
-            # Draw diamond shape
-            path = canvas.beginPath()
-            path.moveTo(x + size/2, y)
-            path.lineTo(x, y + size/2)
-            path.lineTo(x + size/2, y + size)
-            path.lineTo(x + size, y + size/2)
-            path.close()
-            canvas.drawPath(path, fill=1)
-            
-        elif suit.lower() == 'heart':
-            # Draw heart shape
-            canvas.circle(x + size/3, y + 2*size/3, size/4, fill=1)
-            canvas.circle(x + 2*size/3, y + 2*size/3, size/4, fill=1)
-            path = canvas.beginPath()
-            path.moveTo(x + size/6, y + size/2)
-            path.lineTo(x + 5*size/6, y + size/2)
-            path.lineTo(x + size/2, y)
-            path.close()
-            canvas.drawPath(path, fill=1)
-            
-        elif suit.lower() == 'spade':
-            # Draw spade shape
-            canvas.circle(x + size/2, y + 2*size/3, size/3, fill=1)
-            canvas.rect(x + 2*size/5, y, size/5, size/2, fill=1)
-            
-        elif suit.lower() == 'club':
-            # Draw club shape
-            canvas.circle(x + size/2, y + 2*size/3, size/6, fill=1)
-            canvas.circle(x + size/3, y + size/2, size/6, fill=1)
-            canvas.circle(x + 2*size/3, y + size/2, size/6, fill=1)
-            canvas.rect(x + 2*size/5, y, size/5, size/2, fill=1)
-            
-        elif suit.lower() == 'star':
-            # Draw star shape
-            star_points = []
-            for i in range(10):
-                angle = i * 36 * 3.14159 / 180
-                if i % 2 == 0:
-                    radius = size/2
-                else:
-                    radius = size/4
-                px = x + size/2 + radius * cos(angle - 3.14159/2)
-                py = y + size/2 + radius * sin(angle - 3.14159/2)
-                star_points.extend([px, py])
-            
-            path = canvas.beginPath()
-            path.moveTo(star_points[0], star_points[1])
-            for i in range(2, len(star_points), 2):
-                path.lineTo(star_points[i], star_points[i+1])
-            path.close()
-            canvas.drawPath(path, fill=1)
+        With a render cache, unchanged cards are replayed from their stored
+        operators; the canvas must have been set up with prepare_canvas.
+        Cards with a Quantity above 1 are drawn once per PDF as a form and
+        every copy just places that form.
+        """
+        card = as_record(card_data)
+        with self.stats.phase('draw'):
+            canvas.saveState()
+            canvas.translate(x, y)
             
-        elif suit.lower() == 'crown':
-            # Draw crown shape
-            canvas.rect(x, y, size, size/3, fill=1)
-            for i in range(3):
-                canvas.rect(x + i*size/3, y + size/3, size/6, size/2, fill=1)
-                
-        elif suit.lower() == 'shield':
-            # Draw shield shape
-            path = canvas.beginPath()
-            path.moveTo(x + size/2, y)
-            path.lineTo(x, y + size/3)
-            path.lineTo(x, y + 2*size/3)
-            path.lineTo(x + size/2, y + size)
-            path.lineTo(x + size, y + 2*size/3)
-            path.lineTo(x + size, y + size/3)
-            path.close()
-            canvas.drawPath(path, fill=1)
+            if card.quantity > 1:
+                canvas.doForm(self.card_form(canvas, card))
+            else:
+                self._draw_card_cached(canvas, card)
             
-        elif suit.lower() == 'lightning':
-            # Draw lightning bolt
-            path = canvas.beginPath()
-            path.moveTo(x + size/3, y)
-            path.lineTo(x, y + size/2)
-            path.lineTo(x + size/3, y + size/2)
-            path.lineTo(x, y + size)
-            path.lineTo(x + 2*size/3, y + size/2)
-            path.lineTo(x + size/3, y + size/2)
-            path.close()
-            canvas.drawPath(path, fill=1)
+            canvas.restoreState()
+        self.stats.count('cards')
+    
+    def _draw_card_cached(self, canvas, card):
+        """Draw a card at the origin, through the render cache if there is one"""
+        if self.render_cache is None or not self.replay_operators:
+            self._draw_card_body(canvas, card)
+            return
         
-        canvas.restoreState()
+        key = self.render_cache.make_key(card.face(), self.layout_signature)
+        cached = self.render_cache.get(key)
+        if cached is not None:
+            self.stats.count('render_cache_hits')
+            if is_blob(card.image):
+                # Stored recipes refer to the card's image by content hash
+                self.image_blobs[card.image.digest] = card.image
+            self.splice_operators(canvas, *cached)
+        else:
+            self.stats.count('render_cache_misses')
+            first_op = len(page_operators(canvas))
+            self._draw_card_body(canvas, card)
+            self.render_cache.put(key, *self.record_operators(canvas, first_op))
     
-    def draw_card(self, canvas, x, y, card_data):
-        """Draw a single card optimized for 26mm width"""
-        # Draw card border
-        canvas.setStrokeColor(colors.black)
-        canvas.setLineWidth(0.5)
-        canvas.roundRect(x, y, self.card_width, self.card_height, 2)
+    def card_form(self, canvas, card):
+        """Return the form name for a card's face, rendering it on first use"""
+        face = card.face()
+        digest = hashlib.sha1(json.dumps(face, sort_keys=True, default=str).encode('utf-8')).hexdigest()
+        form_name = f'face_{digest[:16]}'
+        if not canvas.hasForm(form_name):
+            layout = self.template.layout
+            canvas.beginForm(form_name, -1, -1, layout.width + 1, layout.height + 1)
+            self._draw_card_cached(canvas, card)
+            canvas.endForm()
+            self.form_recipes[form_name] = ('card', face)
+        return form_name
+    
+    def _draw_card_body(self, canvas, card):
+        """Draw a CardRecord's content at the origin"""
+        layout = self.template.layout
         
-        # Fill card background
-        canvas.setFillColor(colors.white)
-        canvas.roundRect(x, y, self.card_width, self.card_height, 2, fill=1)
-        canvas.setFillColor(colors.black)
+        # Border, background and section labels come from the shared frame form
+        canvas.doForm(self.template.frame_form(canvas))
         
         # Draw card name at top
-        canvas.setFont("Helvetica-Bold", 7)
-        canvas.drawCentredString(x + self.card_width/2, y + self.card_height - 7*mm, 
-                                card_data['Card_Name'])
+        canvas.setFillColor(colors.black)
+        canvas.setFont(self.bold_font_name, 7)
+        canvas.drawCentredString(layout.name_x, layout.name_y, card.name)
         
-        # Draw suit and value in corners
-        canvas.setFont("Helvetica-Bold", 6)
-        if card_data['Icon_Color'] == 'red':
-            canvas.setFillColor(colors.red)
-        elif card_data['Icon_Color'] == 'blue':
-            canvas.setFillColor(colors.blue)
-        elif card_data['Icon_Color'] == 'green':
-            canvas.setFillColor(colors.green)
-        elif card_data['Icon_Color'] == 'purple':
-            canvas.setFillColor(colors.purple)
-        elif card_data['Icon_Color'] == 'orange':
-            canvas.setFillColor(colors.orange)
-        else:
-            canvas.setFillColor(colors.black)
+        # Draw value in corners
+        canvas.setFont(self.bold_font_name, 6)
+        canvas.setFillColor(icon_color(card.color))
+        value = card.value
         
         # Top-left corner
-        canvas.drawString(x + 1*mm, y + self.card_height - 9*mm, str(card_data['Value']))
+        canvas.drawString(layout.value_x, layout.value_y, value)
         
         # Bottom-right corner (upside down)
         canvas.saveState()
-        canvas.translate(x + self.card_width - 1*mm, y + 4*mm)
+        canvas.translate(layout.value_rot_x, layout.value_rot_y)
         canvas.rotate(180)
-        canvas.drawString(0, 0, str(card_data['Value']))
+        canvas.drawString(0, 0, value)
         canvas.restoreState()
         
-        # Draw custom image if provided
-        if card_data.get('Custom_Image') and os.path.exists(card_data['Custom_Image']):
+        # Resize (or reuse) the custom image; None when there is none or it is missing
+        cached_image = self.load_custom_image(card.image) if card.image else None
+        if cached_image is not None:
             try:
-                # Resize and draw custom image
-                resized_image_path = self.resize_custom_image(card_data['Custom_Image'])
-                if resized_image_path and os.path.exists(resized_image_path):
-                    # Draw image in center-top area
-                    image_size = 8*mm
-                    img_x = x + (self.card_width - image_size) / 2
-                    img_y = y + self.card_height - 18*mm
-                    
-                    canvas.drawImage(resized_image_path, img_x, img_y, 
-                                   width=image_size, height=image_size)
-                    
-                    # Clean up temp file
-                    os.remove(resized_image_path)
+                # Draw custom image in center-top area
+                self.draw_cached_image(canvas, cached_image, layout.image_x, layout.image_y,
+                                       layout.image_size)
             except Exception as e:
+                self.stats.count('errors')
                 print(f"Error drawing custom image: {e}")
         else:
             # Draw suit icons if no custom image
-            icon_size = 3*mm
-            self.draw_suit_icon(canvas, x + 1*mm, y + self.card_height - 14*mm, 
-                               card_data['Suit'], card_data['Icon_Color'], size=icon_size)
+            suit = card.suit
+            color = card.color
+            self.draw_suit_glyph(canvas, layout.icon_x, layout.icon_y, suit, color,
+                                 size=layout.icon_size)
             
             # Draw suit icon in bottom-right (upside down)
             canvas.saveState()
-            canvas.translate(x + self.card_width - 4*mm, y + 7*mm)
+            canvas.translate(layout.icon_rot_x, layout.icon_rot_y)
             canvas.rotate(180)
-            self.draw_suit_icon(canvas, 0, 0, card_data['Suit'], 
-                               card_data['Icon_Color'], size=icon_size)
+            self.draw_suit_glyph(canvas, 0, 0, suit, color, size=layout.icon_size)
             canvas.restoreState()
             
             # Draw central suit icon (larger)
-            central_icon_size = 5*mm
-            self.draw_suit_icon(canvas, x + self.card_width/2 - central_icon_size/2, 
-                               y + self.card_height/2 + 3*mm, 
-                               card_data['Suit'], card_data['Icon_Color'], size=central_icon_size)
+            self.draw_suit_glyph(canvas, layout.center_icon_x, layout.center_icon_y, suit, color,
+                                 size=layout.center_icon_size)
         
-        # Draw task section
+        # Task and rules text (labels are part of the frame)
         canvas.setFillColor(colors.black)
-        canvas.setFont("Helvetica-Bold", 5)
-        canvas.drawString(x + 1*mm, y + self.card_height/2 - 1*mm, "Task:")
-        
-        canvas.setFont("Helvetica", 4)
-        # Wrap text for task
-        task_lines = self.wrap_text(card_data['Task'], 15)
-        for i, line in enumerate(task_lines[:2]):  # Limit to 2 lines
-            canvas.drawString(x + 1*mm, y + self.card_height/2 - 4*mm - (i * 4*mm), line)
-        
-        # Draw rules section
-        canvas.setFont("Helvetica-Bold", 5)
-        canvas.drawString(x + 1*mm, y + 10*mm, "Rules:")
-        
-        canvas.setFont("Helvetica", 4)
-        # Wrap text for rules
-        rules_lines = self.wrap_text(card_data['Rules'], 15)
-        for i, line in enumerate(rules_lines[:2]):  # Limit to 2 lines
-            canvas.drawString(x + 1*mm, y + 7*mm - (i * 4*mm), line)
-    
-    def wrap_text(self, text, max_chars):
-        """Wrap text to fit within card width"""
-        words = text.split()
-        lines = []
-        current_line = ""
+        task_lines, task_size = self.layout_text(card.task)
+        canvas.setFont(self.font_name, task_size)
+        for i, line in enumerate(task_lines):
+            canvas.drawString(layout.text_x, layout.task_y - i * layout.line_step, line)
         
-        for word in words:
-            if len(current_line + word + " ") <= max_chars:
-                current_line += word + " "
-            else:
-                if current_line:
-                    lines.append(current_line.strip())
-                current_line = word + " "
-        
-        if current_line:
-            lines.append(current_line.strip())
-        
-        return lines
+        rules_lines, rules_size = self.layout_text(card.rules)
+        canvas.setFont(self.font_name, rules_size)
+        for i, line in enumerate(rules_lines):
+            canvas.drawString(layout.text_x, layout.rules_y - i * layout.line_step, line)
+    
+    def layout_text(self, text, max_lines=2):
+        """Wrap Task/Rules text to the card width; returns (lines, font_size)"""
+        with self.stats.phase('text_layout'):
+            return fit_text(text, self.font_name, self.text_size, self.text_width,
+                            max_lines, self.min_text_size)
     
-    def generate_pdf(self, cards_data, output_file="android_cards.pdf"):
-        """Generate PDF file optimized for Android app and 26mm cards"""
+    def file_digest(self, path):
+        """Content hash of a file, remembered until the file changes"""
+        stat = os.stat(path)
+        key = (os.path.abspath(path), stat.st_mtime_ns, stat.st_size)
+        digest = self._file_digests.get(key)
+        if digest is not None:
+            self._file_digests.move_to_end(key)
+            return digest
+        from thumbnails import file_digest
+        digest = self._file_digests[key] = file_digest(path)
+        if len(self._file_digests) > MAX_FILE_DIGESTS:
+            self._file_digests.popitem(last=False)
+        return digest
+    
+    def document_key(self, records):
+        """Canonical hash of a deck, the image contents it uses and the output settings"""
+        # In-memory images already appear in the records as their content hash
+        images = {}
+        for card in records:
+            if isinstance(card.image, str) and card.image not in images:
+                images[card.image] = self.file_digest(card.image) if os.path.exists(card.image) else None
+        payload = json.dumps([self.layout_signature, self.profile, self.print_width, self.margin,
+                              [card.to_dict() for card in records], images],
+                             sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+    
+    def remove_partial_output(self, files):
+        """Delete files left behind by a cancelled run"""
+        for name in files:
+            if os.path.exists(name):
+                os.remove(name)
+    
+    def generate_pdf(self, cards_data, output_file="android_cards.pdf", workers=1,
+                     progress=None, cancel_event=None):
+        """Generate PDF file optimized for Android app and 26mm cards
+        
+        workers > 1 renders shards of the deck in separate processes
+        (None uses every CPU); the output is the same single strip.  Profiles
+        that embed fonts always render in this process.
+        progress(done, total) is called as cards are drawn; setting
+        cancel_event (a threading.Event) stops the run, removes any partial
+        file and returns False.  cards_data holds card dicts, CardRecords or
+        a CardColumns deck; every card is validated before drawing starts.
+        A card with a Quantity of N fills N positions on the strip.  A
+        deterministic generator with a render cache serves a deck it has
+        rendered before (same cards, image contents and settings) from disk.
+        """
         try:
+            records = [as_record(card) for card in cards_data]
+            document_key = None
+            if self.deterministic and self.render_cache is not None:
+                document_key = self.document_key(records)
+                data = self.render_cache.load_document(document_key)
+                if data is not None:
+                    write_output(output_file, data)
+                    self.stats.count('document_cache_hits')
+                    print(f"PDF served from cache: {output_file}")
+                    return True
+            
+            # One entry per printed copy; copies share the same record
+            cards_data = list(expand_copies(records))
+            
             # Custom page size for 30mm receipt paper
             paper_width = 30 * mm
             cards_needed = len(cards_data)
@@ -276,7 +560,6 @@ class CardGeneratorAndroid:
                 paper_height = min_height
             
             custom_page_size = (paper_width, paper_height)
-            c = canvas.Canvas(output_file, pagesize=custom_page_size)
             page_width, page_height = custom_page_size
             
             print(f"Generating PDF...")
@@ -284,31 +567,211 @@ class CardGeneratorAndroid:
             print(f"Card dimensions: {self.card_width/mm:.1f}mm x {self.card_height/mm:.1f}mm")
             print(f"Total cards: {len(cards_data)}")
             
-            # Calculate horizontal centering
-            x_center = (page_width - self.card_width) / 2
+            c = self.new_canvas(output_file, custom_page_size)
+            
+            if (workers is None or workers > 1) and len(cards_data) > 1 and self.replay_operators:
+                from parallel_render import render_parallel
+                with self.stats.phase('draw'):
+                    shard_count = render_parallel(self, c, cards_data, custom_page_size, workers,
+                                                  progress, cancel_event)
+                if shard_count is None:
+                    print("PDF generation cancelled")
+                    self.remove_partial_output([output_file])
+                    return False
+                self.stats.count('cards', len(cards_data))
+                print(f"Rendered {shard_count} shards in parallel")
+            else:
+                # Calculate horizontal centering
+                x_center = (page_width - self.card_width) / 2
+                
+                for index, card in enumerate(cards_data):
+                    if cancel_event is not None and cancel_event.is_set():
+                        print("PDF generation cancelled")
+                        self.remove_partial_output([output_file])
+                        return False
+                    
+                    # Calculate vertical position (from top to bottom)
+                    y_position = self.card_y(page_height, index)
+                    
+                    # Draw the card centered horizontally
+                    self.draw_card(c, x_center, y_position, card)
+                    
+                    if self.verbose:
+                        print(f"Card {index + 1}: {card.name} - Done")
+                    if progress is not None:
+                        progress(index + 1, cards_needed)
+            
+            with self.stats.phase('save'):
+                c.save()
+            if document_key is not None:
+                self.render_cache.store_document(document_key, read_output(output_file))
+            self.stats.flush()
+            print(f"PDF generated successfully: {output_file}")
+            return True
+            
+        except Exception as e:
+            self.stats.count('errors')
+            print(f"Error generating PDF: {e}")
+            return False
+    
+    def generate_pdf_stream(self, cards, output_file="android_cards.pdf", cards_per_page=None,
+                            max_page_length_mm=None, pages_per_file=None,
+                            progress=None, cancel_event=None):
+        """Generate fixed-length receipt pages from any iterable of cards
+        
+        Cards are drawn as they arrive and each page is finished once full,
+        so the deck is never held in memory.  reportlab keeps finished pages
+        until save(); pages_per_file rolls over to numbered part files
+        (name_part001.pdf, ...) to keep memory flat on very long runs.
+        progress(done, None) and cancel_event work as in generate_pdf.
+        Returns the list of files written, or an empty list on error.
+        """
+        try:
+            per_page = self.page_capacity(cards_per_page, max_page_length_mm)
+            page_size = (self.print_width, per_page * (self.card_height + self.margin) + self.margin)
+            x_center = (self.print_width - self.card_width) / 2
+            base, ext = os.path.splitext(output_file)
+            
+            files = []
+            c = None
+            page_cards = 0
+            file_pages = 0
+            total_cards = 0
+            total_pages = 0
+            
+            def open_canvas():
+                name = f"{base}_part{len(files) + 1:03d}{ext}" if pages_per_file else output_file
+                files.append(name)
+                return self.new_canvas(name, page_size)
+            
+            print(f"Generating PDF pages of {per_page} cards ({page_size[1]/mm:.1f}mm)...")
+            
+            for card_data in expand_copies(cards):
+                if cancel_event is not None and cancel_event.is_set():
+                    print("PDF generation cancelled")
+                    self.remove_partial_output(files)
+                    return []
+                
+                if c is None:
+                    c = open_canvas()
+                elif page_cards == per_page:
+                    # Finish the full page before starting the next one
+                    c.showPage()
+                    total_pages += 1
+                    file_pages += 1
+                    page_cards = 0
+                    if pages_per_file and file_pages == pages_per_file:
+                        with self.stats.phase('save'):
+                            c.save()
+                        c = open_canvas()
+                        file_pages = 0
+                
+                self.draw_card(c, x_center, self.card_y(page_size[1], page_cards), card_data)
+                page_cards += 1
+                total_cards += 1
+                if progress is not None:
+                    progress(total_cards, None)
+            
+            if c is None:
+                # Empty deck still produces a (blank) document
+                c = open_canvas()
+            c.showPage()
+            total_pages += 1
+            with self.stats.phase('save'):
+                c.save()
+            self.stats.flush()
+            
+            print(f"PDF generated successfully: {total_cards} cards on {total_pages} pages "
+                  f"in {len(files)} file(s)")
+            return files
+            
+        except Exception as e:
+            self.stats.count('errors')
+            print(f"Error generating PDF: {e}")
+            return []
+    
+    def generate_sheets(self, cards, output_file="android_cards_sheets.pdf", sheet='a4',
+                        gutter_mm=2, bleed_mm=0, margin_mm=10, cut_marks=True, backs=False,
+                        back_image=None, progress=None, cancel_event=None):
+        """Impose cards in a grid on office sheets (A4, Letter or (w, h) in mm)
+        
+        Every card's sheet and slot is computed before drawing starts and each
+        sheet is drawn in one pass.  backs=True follows each sheet with a back
+        page mirrored for long-edge duplex; back_image fills the card backs.
+        progress(done, total) and cancel_event work as in generate_pdf.
+        """
+        try:
+            from imposition import SheetLayout, sheet_size, draw_cut_marks, back_form
             
-            for index, card_data in enumerate(cards_data):
-                # Calculate vertical position (from top to bottom)
-                y_position = page_height - self.margin - (index + 1) * (self.card_height + self.margin)
+            placements = list(expand_copies(cards))
+            layout = SheetLayout(sheet_size(sheet), self.card_width, self.card_height,
+                                 gutter=gutter_mm * mm, bleed=bleed_mm * mm, margin=margin_mm * mm)
+            positions = layout.place(len(placements))
+            page_count = positions[-1][0] + 1 if positions else 1
+            
+            print(f"Imposing {len(placements)} cards on {page_count} sheet(s), "
+                  f"{layout.columns}x{layout.rows} per sheet")
+            
+            c = self.new_canvas(output_file, (layout.page_width, layout.page_height))
+            
+            start = 0
+            for page in range(page_count):
+                if cancel_event is not None and cancel_event.is_set():
+                    print("PDF generation cancelled")
+                    self.remove_partial_output([output_file])
+                    return False
+                
+                end = min(start + layout.per_page, len(placements))
+                for card, (_, x, y) in zip(placements[start:end], positions[start:end]):
+                    self.draw_card(c, x, y, card)
+                if cut_marks:
+                    draw_cut_marks(c, layout)
+                c.showPage()
                 
-                # Draw the card centered horizontally
-                self.draw_card(c, x_center, y_position, card_data)
+                if backs:
+                    form_name = back_form(self, c, layout, back_image)
+                    for x, y in layout.back_slots[:end - start]:
+                        c.saveState()
+                        c.translate(x, y)
+                        c.doForm(form_name)
+                        c.restoreState()
+                    if cut_marks:
+                        draw_cut_marks(c, layout)
+                    c.showPage()
                 
-                print(f"Card {index + 1}: {card_data['Card_Name']} - Done")
+                start = end
+                if progress is not None:
+                    progress(end, len(placements))
             
-            c.save()
+            with self.stats.phase('save'):
+                c.save()
+            self.stats.flush()
             print(f"PDF generated successfully: {output_file}")
             return True
             
         except Exception as e:
+            self.stats.count('errors')
             print(f"Error generating PDF: {e}")
             return False
+    
+    def generate_escpos(self, cards, output=None, host=None, port=9100, dpi=203, dots_wide=240):
+        """Print cards as ESC/POS raster data to a file or a raw TCP printer port
 
-# Helper function for trigonometry (missing import)
-def cos(angle):
-    import math
-    return math.cos(angle)
-
-def sin(angle):
-    import math
-    return math.sin(angle)
+        Skips PDF entirely: each card is rasterized at the printer's resolution,
+        dithered and streamed, so only one card bitmap is in memory at a time.
+        """
+        try:
+            import escpos_raster
+            if host:
+                count = escpos_raster.send_escpos(self, cards, host, port, dpi=dpi, dots_wide=dots_wide)
+                print(f"Sent {count} cards to {host}:{port}")
+            else:
+                output = output or "android_cards.bin"
+                count = escpos_raster.write_escpos_file(self, cards, output, dpi=dpi, dots_wide=dots_wide)
+                print(f"ESC/POS data written: {count} cards to {output}")
+            return True
+            
+        except Exception as e:
+            self.stats.count('errors')
+            print(f"Error generating ESC/POS data: {e}")
+            return False
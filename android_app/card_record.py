@@ -0,0 +1,246 @@
+"""
+Card records for the Android Card Generator
+A compact card type whose suit and color are validated and normalized once,
+when the record is built, plus a columnar container for very large decks
+"""
+
+from array import array
+from collections import namedtuple
+from enum import Enum
+import hashlib
+import re
+
+from image_source import as_image_source
+
+
+class Suit(Enum):
+    DIAMOND = 'Diamond'
+    HEART = 'Heart'
+    SPADE = 'Spade'
+    CLUB = 'Club'
+    STAR = 'Star'
+    CROWN = 'Crown'
+    SHIELD = 'Shield'
+    LIGHTNING = 'Lightning'
+
+    @classmethod
+    def _missing_(cls, value):
+        # Accept any capitalization and stray whitespace: Suit(' heart ')
+        if isinstance(value, str):
+            return _SUIT_NAMES.get(value.strip().lower())
+        return None
+
+
+class IconColor(Enum):
+    RED = 'red'
+    BLACK = 'black'
+    BLUE = 'blue'
+    GREEN = 'green'
+    PURPLE = 'purple'
+    ORANGE = 'orange'
+
+    @classmethod
+    def _missing_(cls, value):
+        if isinstance(value, str):
+            return _COLOR_NAMES.get(value.strip().lower())
+        return None
+
+
+class CustomSuit(namedtuple('CustomSuit', ('name', 'value'))):
+    """A suit added at runtime (by an icon pack); has a Suit member's name and value"""
+    __slots__ = ()
+
+
+_SUIT_NAMES = {suit.value.lower(): suit for suit in Suit}
+_CUSTOM_SUITS = {}  # Lowercase name -> CustomSuit
+_COLOR_NAMES = {color.value: color for color in IconColor}
+SUIT_LIST = list(Suit)  # Column index -> member (custom suits are appended)
+COLOR_LIST = list(IconColor)
+_SUIT_INDEX = {suit: i for i, suit in enumerate(SUIT_LIST)}
+_COLOR_INDEX = {color: i for i, color in enumerate(COLOR_LIST)}
+
+
+def as_suit(value):
+    """Return the Suit or registered CustomSuit for a suit or its name
+
+    Raises ValueError for a name that is neither.
+    """
+    if isinstance(value, (Suit, CustomSuit)):
+        return value
+    try:
+        return Suit(value)
+    except ValueError:
+        suit = _CUSTOM_SUITS.get(value.strip().lower()) if isinstance(value, str) else None
+        if suit is None:
+            raise
+        return suit
+
+
+def register_suit(value):
+    """Make value a valid suit name; returns the existing Suit or a new CustomSuit"""
+    try:
+        return as_suit(value)
+    except ValueError:
+        pass
+    value = value.strip()
+    # Also used in PDF form names, which must be plain ASCII; names that lose
+    # characters get a hash of the original so they stay distinct
+    name = re.sub(r'[^A-Za-z0-9]+', '_', value, flags=re.ASCII).strip('_').upper()
+    if name.replace('_', ' ') != value.upper():
+        digest = hashlib.sha1(value.encode('utf-8')).hexdigest()[:8].upper()
+        name = f'{name}_{digest}' if name else f'SUIT_{digest}'
+    suit = CustomSuit(name, value)
+    _CUSTOM_SUITS[value.lower()] = suit
+    _SUIT_INDEX[suit] = len(SUIT_LIST)
+    SUIT_LIST.append(suit)
+    return suit
+
+
+def suit_names():
+    """Display names of every suit, built-in ones first"""
+    return [suit.value for suit in SUIT_LIST]
+
+REQUIRED_FIELDS = ('Card_Name', 'Suit', 'Value', 'Task', 'Rules')
+
+_CardFields = namedtuple('CardRecord', ('name', 'suit', 'value', 'task', 'rules', 'color', 'image',
+                                         'quantity'))
+
+
+class CardRecord(_CardFields):
+    """One validated card; suit and color are Suit (or CustomSuit) / IconColor members
+
+    quantity is the number of identical copies in the deck.  image is a
+    path or an ImageBlob (bytes, memoryviews and mmaps are wrapped in one).
+    Raises ValueError for an unknown suit or color or a quantity that is not
+    a whole number of at least 1.
+    """
+    __slots__ = ()
+
+    def __new__(cls, name, suit, value, task, rules, color=IconColor.BLACK, image=None,
+                quantity=1):
+        try:
+            quantity = int(quantity)
+        except (TypeError, ValueError):
+            raise ValueError(f"Quantity must be a whole number, got {quantity!r}") from None
+        if quantity < 1:
+            raise ValueError(f"quantity must be at least 1, got {quantity}")
+        return super().__new__(cls, str(name), as_suit(suit), str(value), str(task), str(rules),
+                               IconColor(color), as_image_source(image), quantity)
+
+    @classmethod
+    def from_dict(cls, card_data):
+        """Build a record from the app's card dict (Card_Name, Suit, ...)
+
+        Raises ValueError naming the card for a missing field or a bad value.
+        """
+        missing = [field for field in REQUIRED_FIELDS if field not in card_data]
+        if missing:
+            raise ValueError(f"Card '{card_data.get('Card_Name')}': missing {', '.join(missing)}")
+        try:
+            return cls(card_data['Card_Name'], card_data['Suit'], card_data['Value'],
+                       card_data['Task'], card_data['Rules'],
+                       card_data.get('Icon_Color') or IconColor.BLACK,
+                       card_data.get('Custom_Image'), card_data.get('Quantity') or 1)
+        except (TypeError, ValueError) as e:
+            raise ValueError(f"Card '{card_data.get('Card_Name')}': {e}") from None
+
+    def face(self):
+        """Everything that decides how the card looks (all fields but Quantity)"""
+        return {
+            'Card_Name': self.name,
+            'Suit': self.suit.value,
+            'Value': self.value,
+            'Task': self.task,
+            'Rules': self.rules,
+            'Icon_Color': self.color.value,
+            'Custom_Image': self.image,
+        }
+
+    def to_dict(self):
+        card = self.face()
+        card['Quantity'] = self.quantity
+        return card
+
+
+def as_record(card):
+    """Return card as a CardRecord, converting a card dict if needed"""
+    if isinstance(card, CardRecord):
+        return card
+    return CardRecord.from_dict(card)
+
+
+def expand_copies(cards):
+    """Yield each card as a record, once per copy"""
+    for card in cards:
+        card = as_record(card)
+        for _ in range(card.quantity):
+            yield card
+
+
+class CardColumns:
+    """Columnar deck: one shared string table plus small-int arrays per field
+
+    Repeated text (suit-wide rules, image paths, ...) is stored once, and a
+    card costs a few array slots instead of a dict.  Iterating yields
+    CardRecords built straight from the columns, without re-validation.
+    """
+
+    def __init__(self, cards=()):
+        self.strings = [None]  # Id 0 is "no value" (cards without an image)
+        self._string_ids = {None: 0}
+        self.names = array('I')
+        self.values = array('I')
+        self.tasks = array('I')
+        self.rules = array('I')
+        self.images = array('I')
+        self.suits = array('B')
+        self.colors = array('B')
+        self.quantities = array('I')
+        self.extend(cards)
+
+    def __len__(self):
+        return len(self.names)
+
+    def _intern(self, text):
+        string_id = self._string_ids.get(text)
+        if string_id is None:
+            string_id = self._string_ids[text] = len(self.strings)
+            self.strings.append(text)
+        return string_id
+
+    def append(self, card):
+        card = as_record(card)
+        self.names.append(self._intern(card.name))
+        self.values.append(self._intern(card.value))
+        self.tasks.append(self._intern(card.task))
+        self.rules.append(self._intern(card.rules))
+        self.images.append(self._intern(card.image))
+        self.suits.append(_SUIT_INDEX[card.suit])
+        self.colors.append(_COLOR_INDEX[card.color])
+        self.quantities.append(card.quantity)
+
+    def extend(self, cards):
+        for card in cards:
+            self.append(card)
+
+    def __getitem__(self, index):
+        strings = self.strings
+        return CardRecord._make((strings[self.names[index]], SUIT_LIST[self.suits[index]],
+                                 strings[self.values[index]], strings[self.tasks[index]],
+                                 strings[self.rules[index]], COLOR_LIST[self.colors[index]],
+                                 strings[self.images[index]], self.quantities[index]))
+
+    def __iter__(self):
+        strings = self.strings
+        make = CardRecord._make
+        for name, suit, value, task, rules, color, image, quantity in zip(
+                self.names, self.suits, self.values, self.tasks, self.rules,
+                self.colors, self.images, self.quantities):
+            yield make((strings[name], SUIT_LIST[suit], strings[value], strings[task],
+                        strings[rules], COLOR_LIST[color], strings[image], quantity))
+
+    def nbytes(self):
+        """Approximate size of the column arrays (string table excluded)"""
+        return sum(column.itemsize * len(column) for column in (
+            self.names, self.values, self.tasks, self.rules, self.images,
+            self.suits, self.colors, self.quantities))
@@ -0,0 +1,107 @@
+"""
+Compiled card template for the Android Card Generator
+Resolves every layout offset once per card size and renders the static card
+chrome (border, background, section labels) as a single reusable form
+"""
+
+from reportlab.lib import colors
+from reportlab.lib.units import mm
+
+from card_record import IconColor
+
+# Icon/value colors offered by the app
+ICON_COLORS = {
+    IconColor.RED: colors.red,
+    IconColor.BLACK: colors.black,
+    IconColor.BLUE: colors.blue,
+    IconColor.GREEN: colors.green,
+    IconColor.PURPLE: colors.purple,
+    IconColor.ORANGE: colors.orange,
+}
+
+
+def icon_color(color):
+    """reportlab color for an IconColor (or its name)"""
+    return ICON_COLORS[IconColor(color)]
+
+
+class CardLayout:
+    """Every per-card offset, relative to the card's lower-left corner"""
+    __slots__ = (
+        'width', 'height', 'corner_radius',
+        'name_x', 'name_y',
+        'value_x', 'value_y', 'value_rot_x', 'value_rot_y',
+        'image_x', 'image_y', 'image_size',
+        'icon_size', 'icon_x', 'icon_y', 'icon_rot_x', 'icon_rot_y',
+        'center_icon_size', 'center_icon_x', 'center_icon_y',
+        'text_x', 'line_step', 'task_label_y', 'task_y', 'rules_label_y', 'rules_y',
+    )
+
+    def __init__(self, width, height):
+        self.width = width
+        self.height = height
+        self.corner_radius = 2
+
+        # Card name at top
+        self.name_x = width / 2
+        self.name_y = height - 7*mm
+
+        # Value in the top-left and (upside down) bottom-right corners
+        self.value_x = 1*mm
+        self.value_y = height - 9*mm
+        self.value_rot_x = width - 1*mm
+        self.value_rot_y = 4*mm
+
+        # Custom image in the center-top area
+        self.image_size = 8*mm
+        self.image_x = (width - self.image_size) / 2
+        self.image_y = height - 18*mm
+
+        # Corner suit icons and the larger central one
+        self.icon_size = 3*mm
+        self.icon_x = 1*mm
+        self.icon_y = height - 14*mm
+        self.icon_rot_x = width - 4*mm
+        self.icon_rot_y = 7*mm
+        self.center_icon_size = 5*mm
+        self.center_icon_x = width/2 - self.center_icon_size/2
+        self.center_icon_y = height/2 + 3*mm
+
+        # Task and rules sections
+        self.text_x = 1*mm
+        self.line_step = 4*mm
+        self.task_label_y = height/2 - 1*mm
+        self.task_y = height/2 - 4*mm
+        self.rules_label_y = 10*mm
+        self.rules_y = 7*mm
+
+
+class CardTemplate:
+    """Precomputed layout plus the static chrome shared by every card"""
+
+    def __init__(self, width, height, bold_font="Helvetica-Bold"):
+        self.layout = CardLayout(width, height)
+        self.bold_font = bold_font
+        self.form_name = f'card_frame_{round(width * 100)}x{round(height * 100)}'
+
+    def frame_form(self, canvas):
+        """Return the frame form name, rendering it into canvas on first use"""
+        if canvas.hasForm(self.form_name):
+            return self.form_name
+
+        layout = self.layout
+        # Pad the box so the outer half of the border stroke is not clipped
+        canvas.beginForm(self.form_name, -1, -1, layout.width + 1, layout.height + 1)
+        # Border and white background in one pass
+        canvas.setStrokeColor(colors.black)
+        canvas.setFillColor(colors.white)
+        canvas.setLineWidth(0.5)
+        canvas.roundRect(0, 0, layout.width, layout.height, layout.corner_radius,
+                         stroke=1, fill=1)
+
+        canvas.setFillColor(colors.black)
+        canvas.setFont(self.bold_font, 5)
+        canvas.drawString(layout.text_x, layout.task_label_y, "Task:")
+        canvas.drawString(layout.text_x, layout.rules_label_y, "Rules:")
+        canvas.endForm()
+        return self.form_name
@@ -0,0 +1,262 @@
+#!/usr/bin/env python3
+"""
+Headless deck import for the Android Card Generator
+Reads CSV, XLSX, JSON-lines or packed decks in chunks and streams the rows into
+CardGeneratorAndroid.generate_pdf_stream, so large sheets are never loaded
+into memory at once
+"""
+
+import argparse
+import json
+import os
+import sys
+
+from image_source import ImageBlob
+
+CARD_FIELDS = ('Card_Name', 'Suit', 'Value', 'Task', 'Rules', 'Icon_Color', 'Custom_Image',
+               'Quantity')
+
+# Same fallbacks the app uses for empty inputs (DeckModel.card_data)
+DEFAULTS = {
+    'Suit': 'Diamond',
+    'Value': '1',
+    'Task': 'No special action',
+    'Rules': 'Play normally',
+    'Icon_Color': 'black',
+    'Custom_Image': None,
+    'Quantity': '1',
+}
+
+# Normalized column header -> card field
+COLUMN_ALIASES = {
+    'cardname': 'Card_Name',
+    'name': 'Card_Name',
+    'suit': 'Suit',
+    'value': 'Value',
+    'cardvalue': 'Value',
+    'task': 'Task',
+    'action': 'Task',
+    'taskaction': 'Task',
+    'rules': 'Rules',
+    'iconcolor': 'Icon_Color',
+    'color': 'Icon_Color',
+    'colour': 'Icon_Color',
+    'customimage': 'Custom_Image',
+    'image': 'Custom_Image',
+    'quantity': 'Quantity',
+    'qty': 'Quantity',
+    'copies': 'Quantity',
+    'count': 'Quantity',
+}
+
+FORMATS = {
+    '.csv': 'csv',
+    '.xlsx': 'xlsx',
+    '.xlsm': 'xlsx',
+    '.jsonl': 'jsonl',
+    '.ndjson': 'jsonl',
+    '.json': 'json',
+    '.cardpack': 'pack',
+}
+
+DEFAULT_CHUNK_SIZE = 1000
+
+def normalize_header(header):
+    return ''.join(ch for ch in str(header).lower() if ch.isalnum())
+
+def build_column_map(headers, overrides=None):
+    """Map source column names to card fields; overrides win over aliases"""
+    column_map = {}
+    for header in headers:
+        if header is None:
+            continue
+        field = COLUMN_ALIASES.get(normalize_header(header))
+        if field:
+            column_map[header] = field
+    for column, field in (overrides or {}).items():
+        if field not in CARD_FIELDS:
+            raise ValueError(f"Unknown card field '{field}' (expected one of {', '.join(CARD_FIELDS)})")
+        column_map[column] = field
+    return column_map
+
+def is_blank(value):
+    # NaN is the only value that is not equal to itself
+    return value is None or value != value or str(value).strip() == ''
+
+def normalize_card(row, column_map, index, base_dir='.'):
+    """Turn one source row into the card dict the generator expects"""
+    card = {}
+    for column, field in column_map.items():
+        value = row.get(column)
+        if isinstance(value, ImageBlob):
+            card[field] = value
+        elif not is_blank(value):
+            # Whole numbers from spreadsheets (7.0) should print as 7
+            if isinstance(value, float) and value.is_integer():
+                value = int(value)
+            card[field] = str(value).strip()
+
+    card.setdefault('Card_Name', f'Card {index}')
+    for field, default in DEFAULTS.items():
+        card.setdefault(field, default)
+
+    image = card['Custom_Image']
+    if isinstance(image, str) and image and not os.path.isabs(image):
+        # Image paths in a deck file are relative to the deck file
+        card['Custom_Image'] = os.path.join(base_dir, image)
+    return card
+
+def read_csv_rows(path, chunk_size):
+    import pandas as pd
+    for chunk in pd.read_csv(path, chunksize=chunk_size, dtype=str, keep_default_na=False):
+        yield from chunk.to_dict('records')
+
+def read_xlsx_rows(path, chunk_size, sheet=None):
+    from openpyxl import load_workbook
+    # read_only streams rows from the sheet XML instead of building the whole workbook
+    workbook = load_workbook(path, read_only=True, data_only=True)
+    try:
+        worksheet = workbook[sheet] if sheet else workbook.active
+        rows = worksheet.iter_rows(values_only=True)
+        headers = next(rows, None) or ()
+        for values in rows:
+            if all(is_blank(value) for value in values):
+                continue
+            yield dict(zip(headers, values))
+    finally:
+        workbook.close()
+
+def read_jsonl_rows(path, chunk_size):
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                yield json.loads(line)
+
+def read_json_rows(path, chunk_size):
+    # A plain JSON array (as saved by the app) has to be parsed in one go
+    with open(path, encoding='utf-8') as f:
+        yield from json.load(f)
+
+def read_pack_rows(path, chunk_size):
+    # Images stay in the mmapped pack (as ImageBlobs) instead of being extracted;
+    # the blobs keep the mapping alive for as long as any card refers to them
+    from deck_pack import PackedDeck
+    yield from PackedDeck(path)
+
+READERS = {
+    'csv': read_csv_rows,
+    'xlsx': read_xlsx_rows,
+    'jsonl': read_jsonl_rows,
+    'json': read_json_rows,
+    'pack': read_pack_rows,
+}
+
+def detect_format(path):
+    ext = os.path.splitext(path)[1].lower()
+    if ext not in FORMATS:
+        raise ValueError(f"Cannot tell the format of '{path}'; use --format")
+    return FORMATS[ext]
+
+def iter_cards(path, fmt=None, overrides=None, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Yield normalized card dicts from a deck file, one chunk at a time"""
+    fmt = fmt or detect_format(path)
+    base_dir = os.path.dirname(os.path.abspath(path))
+    # Sheets share one header row; JSON-lines records may vary in their keys
+    column_maps = {}
+    for index, row in enumerate(READERS[fmt](path, chunk_size), start=1):
+        headers = tuple(row)
+        column_map = column_maps.get(headers)
+        if column_map is None:
+            column_map = column_maps[headers] = build_column_map(headers, overrides)
+        yield normalize_card(row, column_map, index, base_dir)
+
+def parse_mapping(pairs):
+    """Parse repeated --map COLUMN=FIELD options"""
+    overrides = {}
+    for pair in pairs or ():
+        column, sep, field = pair.partition('=')
+        if not sep:
+            raise ValueError(f"Invalid --map '{pair}', expected COLUMN=FIELD")
+        if field not in CARD_FIELDS:
+            raise ValueError(f"Unknown card field '{field}' (expected one of {', '.join(CARD_FIELDS)})")
+        overrides[column] = field
+    return overrides
+
+def parse_sheet(value):
+    """'a4', 'letter' or a custom WIDTHxHEIGHT size in mm"""
+    width, sep, height = value.lower().partition('x')
+    if not sep:
+        return value
+    try:
+        return (float(width), float(height))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"Invalid sheet size '{value}', expected e.g. 210x297")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Generate a card PDF from a CSV, XLSX, JSON-lines or packed deck')
+    parser.add_argument('deck', help='deck file (.csv, .xlsx, .jsonl, .json or .cardpack)')
+    parser.add_argument('-o', '--output', help='output PDF (default: deck name with .pdf)')
+    parser.add_argument('--format', choices=sorted(READERS), help='override format detection')
+    parser.add_argument('--map', action='append', metavar='COLUMN=FIELD',
+                        help='map a source column onto a card field (repeatable)')
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE,
+                        help=f'rows read per chunk (default: {DEFAULT_CHUNK_SIZE})')
+    parser.add_argument('--cards-per-page', type=int, help='cards per receipt page')
+    parser.add_argument('--max-page-length', type=float, metavar='MM',
+                        help='maximum receipt page length in mm')
+    parser.add_argument('--pages-per-file', type=int,
+                        help='roll over to a new part file after this many pages')
+    parser.add_argument('--suits', action='append', default=[], metavar='DIR',
+                        help='icon pack: a directory of SVG suit icons named after their suits')
+    parser.add_argument('--stats', metavar='FILE',
+                        help='append timing/counter snapshots to FILE as JSON lines')
+    parser.add_argument('--stats-every', type=int, default=1000, metavar='CARDS',
+                        help='cards between stats snapshots (default: 1000)')
+    sheets = parser.add_argument_group('office sheets (instead of a receipt strip)')
+    sheets.add_argument('--sheet', type=parse_sheet,
+                        help='impose cards on a4, letter or WIDTHxHEIGHT (mm) sheets')
+    sheets.add_argument('--gutter', type=float, default=2, metavar='MM',
+                        help='space between cards (default: 2)')
+    sheets.add_argument('--bleed', type=float, default=0, metavar='MM',
+                        help='bleed around each card (default: 0)')
+    sheets.add_argument('--no-cut-marks', dest='cut_marks', action='store_false',
+                        help='leave out the trim marks')
+    sheets.add_argument('--backs', action='store_true',
+                        help='add a duplex back page after each sheet')
+    sheets.add_argument('--back-image', help='image for the card backs (implies --backs)')
+    args = parser.parse_args(argv)
+
+    from card_generator_android import CardGeneratorAndroid
+
+    try:
+        overrides = parse_mapping(args.map)
+        output_file = args.output or os.path.splitext(args.deck)[0] + '.pdf'
+        cards = iter_cards(args.deck, args.format, overrides, args.chunk_size)
+        stats = None
+        if args.stats:
+            from instrumentation import Stats, json_lines_hook
+            stats = Stats(json_lines_hook(args.stats), sample_every=args.stats_every)
+        generator = CardGeneratorAndroid(stats=stats, icon_packs=args.suits)
+        if args.sheet:
+            ok = generator.generate_sheets(
+                cards, output_file, sheet=args.sheet, gutter_mm=args.gutter,
+                bleed_mm=args.bleed, cut_marks=args.cut_marks,
+                backs=args.backs or bool(args.back_image), back_image=args.back_image)
+            files = [output_file] if ok else []
+        else:
+            files = generator.generate_pdf_stream(
+                cards, output_file, cards_per_page=args.cards_per_page,
+                max_page_length_mm=args.max_page_length, pages_per_file=args.pages_per_file)
+    except (OSError, ValueError) as e:
+        print(f"Error importing deck: {e}")
+        return 1
+
+    if not files:
+        return 1
+    for name in files:
+        print(f"Wrote {name}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
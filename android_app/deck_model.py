@@ -0,0 +1,84 @@
+"""
+Editor data model for the Android Card Generator
+Card state lives here as a list of plain records (one dict per card, exactly
+as typed), independent of any widget.  The editor's recycled rows read from
+and write to these records, so a deck of thousands of cards costs a list of
+small dicts rather than thousands of widget trees.  With a DeckProject
+attached, every change is also appended to the project's journal.
+"""
+
+from card_record import IconColor
+from deck_import import CARD_FIELDS, DEFAULTS
+
+ICON_COLOR_NAMES = [color.value for color in IconColor]
+
+
+def new_record():
+    """An empty card as the editor shows it: every field blank"""
+    return {field: '' for field in CARD_FIELDS}
+
+
+class DeckModel:
+    """Ordered list of card records; a card's number is its position + 1"""
+
+    def __init__(self, records=None, project=None):
+        self.records = list(records) if records else []
+        self.project = project
+
+    def _log(self, op, **fields):
+        if self.project is not None:
+            self.project.log(op, **fields)
+            if self.project.needs_compaction():
+                self.project.compact(self.records)
+
+    def __len__(self):
+        return len(self.records)
+
+    def add(self, record=None):
+        """Append a card and return its index"""
+        record = record if record is not None else new_record()
+        self.records.append(record)
+        self._log('add', card=record)
+        return len(self.records) - 1
+
+    def remove(self, index):
+        # Numbers are derived from positions, so nothing needs renumbering
+        del self.records[index]
+        self._log('remove', index=index)
+
+    def update(self, index, field, value):
+        if field not in CARD_FIELDS:
+            raise ValueError(f"Unknown card field '{field}'")
+        self.records[index][field] = value
+        self._log('set', index=index, field=field, value=value)
+
+    def set_image(self, index, image_path):
+        """Attach an image, keeping a copy in the project's asset store"""
+        if self.project is not None:
+            image_path = self.project.add_asset(image_path)
+        self.update(index, 'Custom_Image', image_path)
+        return image_path
+
+    def clear(self):
+        self.records.clear()
+        self._log('clear')
+
+    def save(self):
+        """Fold the journal into a fresh snapshot"""
+        if self.project is not None:
+            self.project.compact(self.records)
+
+    def card_data(self, index):
+        """The card dict the generator expects, with the app's fallbacks"""
+        record = self.records[index]
+        card = {}
+        for field in CARD_FIELDS:
+            value = record.get(field)
+            if isinstance(value, str):
+                value = value.strip()
+            card[field] = value or DEFAULTS.get(field)
+        card['Card_Name'] = card['Card_Name'] or f'Card {index + 1}'
+        return card
+
+    def cards(self):
+        return [self.card_data(index) for index in range(len(self.records))]
@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+Packed deck files for the Android Card Generator
+One file holding the card records and every image they use, so a deck can
+be shipped and printed without a folder of loose images:
+
+    CARDPACK magic (8 bytes)
+    header length (8 bytes, little-endian)
+    header JSON    {"version": 1, "cards": [...], "blobs": [[offset, length], ...]}
+    image data     each distinct image once, offsets relative to this area
+
+A card's Custom_Image is stored as "blob:<index>".  Reading mmaps the file
+and hands each card a zero-copy ImageBlob slice of the mapping.
+"""
+
+import argparse
+import json
+import mmap
+import os
+import struct
+import sys
+import tempfile
+
+from image_source import BLOB_PREFIX, ImageBlob
+
+MAGIC = b'CARDPACK'
+PACK_VERSION = 1
+_LENGTH = struct.Struct('<Q')
+
+
+def write_packed_deck(path, cards):
+    """Write card dicts (images as paths or in-memory data) to a packed deck
+
+    Identical images are stored once.  Returns the number of cards written.
+    """
+    from card_record import as_record
+
+    records = []
+    blobs = []  # (offset, length)
+    blob_index = {}  # content hash -> index
+    data_parts = []
+    offset = 0
+    for card_data in cards:
+        card = as_record(card_data).to_dict()
+        image = card['Custom_Image']
+        if image is not None:
+            if not isinstance(image, ImageBlob):
+                with open(image, 'rb') as f:
+                    image = ImageBlob(f.read())
+            index = blob_index.get(image.digest)
+            if index is None:
+                index = blob_index[image.digest] = len(blobs)
+                blobs.append((offset, len(image)))
+                data_parts.append(image.data)
+                offset += len(image)
+            card['Custom_Image'] = f'{BLOB_PREFIX}{index}'
+        records.append(card)
+
+    header = json.dumps({'version': PACK_VERSION, 'cards': records, 'blobs': blobs},
+                        ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+    # Write then rename so a half-written pack never replaces a good one
+    fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), suffix='.tmp')
+    with os.fdopen(fd, 'wb') as f:
+        f.write(MAGIC)
+        f.write(_LENGTH.pack(len(header)))
+        f.write(header)
+        for data in data_parts:
+            f.write(data)
+    os.replace(temp_path, path)
+    return len(records)
+
+
+class PackedDeck:
+    """Read-only view of a packed deck through a memory map"""
+
+    def __init__(self, path):
+        with open(path, 'rb') as f:
+            # The mapping stays valid after the file is closed
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        view = memoryview(self._map)
+        if view[:len(MAGIC)] != MAGIC:
+            raise ValueError(f"'{path}' is not a packed deck")
+        start = len(MAGIC) + _LENGTH.size
+        header_length, = _LENGTH.unpack(view[len(MAGIC):start])
+        header = json.loads(bytes(view[start:start + header_length]))
+        if header.get('version') != PACK_VERSION:
+            raise ValueError(f"Unsupported packed deck version {header.get('version')}")
+        data_start = start + header_length
+        self.cards = header['cards']
+        self.blobs = [ImageBlob(view[data_start + offset:data_start + offset + length])
+                      for offset, length in header['blobs']]
+
+    def __len__(self):
+        return len(self.cards)
+
+    def __iter__(self):
+        """Yield card dicts whose Custom_Image is an ImageBlob into the mapping"""
+        for card in self.cards:
+            image = card.get('Custom_Image')
+            if image:
+                card = dict(card, Custom_Image=self.blobs[int(image[len(BLOB_PREFIX):])])
+            yield card
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Pack a deck and its images into one file')
+    parser.add_argument('deck', help='deck file (.csv, .xlsx, .jsonl or .json)')
+    parser.add_argument('output', help='packed deck to write (.cardpack)')
+    args = parser.parse_args(argv)
+
+    from deck_import import iter_cards
+    try:
+        count = write_packed_deck(args.output, iter_cards(args.deck))
+    except (OSError, ValueError) as e:
+        print(f"Error packing deck: {e}")
+        return 1
+    print(f"Packed {count} cards into {args.output}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
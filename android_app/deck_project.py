@@ -0,0 +1,185 @@
+"""
+Deck project files for the Android Card Generator
+A project is a directory holding a compacted snapshot of the deck, an
+append-only journal of edits made since, and the custom images stored by
+content hash:
+
+    my_deck.deck/
+        deck.json       {"version": 1, "seq": N, "cards": [...]}
+        journal.jsonl   one edit per line, replayed on top of deck.json
+        assets/         <sha1>.<ext> image files
+
+Autosave appends a single journal line per edit; the snapshot is only
+rewritten when the journal is compacted.  Journal entries are numbered and
+the snapshot records the last one it includes, so entries left behind by a
+crash during compaction are skipped rather than applied twice.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+
+PROJECT_VERSION = 1
+SNAPSHOT_NAME = 'deck.json'
+JOURNAL_NAME = 'journal.jsonl'
+ASSETS_DIR = 'assets'
+COMPACT_EVERY = 500  # Journal entries before the snapshot is rewritten
+
+
+class DeckProject:
+    """Snapshot + journal + asset store for one deck"""
+
+    def __init__(self, path, compact_every=COMPACT_EVERY):
+        self.path = path
+        self.compact_every = compact_every
+        self.pending_ops = 0  # Journal entries since the last compaction
+        self.seq = None  # Number of the last journal entry, known once loaded
+        self.assets_dir = os.path.join(path, ASSETS_DIR)
+        os.makedirs(self.assets_dir, exist_ok=True)
+        self._journal = None
+
+    def _file(self, name):
+        return os.path.join(self.path, name)
+
+    def _portable(self, image):
+        # Assets are stored relative to the project so it can be moved
+        if image and os.path.dirname(os.path.abspath(image)) == os.path.abspath(self.assets_dir):
+            return f'{ASSETS_DIR}/{os.path.basename(image)}'
+        return image
+
+    def _resolve(self, image):
+        if image and not os.path.isabs(image):
+            return os.path.join(self.path, image)
+        return image
+
+    def _stored_card(self, card):
+        card = dict(card)
+        card['Custom_Image'] = self._portable(card.get('Custom_Image'))
+        return card
+
+    def load(self):
+        """Return the deck's card records: the snapshot with the journal replayed"""
+        cards = []
+        snapshot_seq = 0
+        try:
+            with open(self._file(SNAPSHOT_NAME), encoding='utf-8') as f:
+                snapshot = json.load(f)
+            if not isinstance(snapshot, dict):
+                raise ValueError(f"Snapshot {SNAPSHOT_NAME} is not a deck")
+            if snapshot.get('version') != PROJECT_VERSION:
+                raise ValueError(f"Unsupported deck version {snapshot.get('version')}")
+            cards = snapshot.get('cards')
+            if not isinstance(cards, list):
+                raise ValueError(f"Snapshot {SNAPSHOT_NAME} has no card list")
+            # Snapshots from before journal numbering include no entries
+            snapshot_seq = snapshot.get('seq', 0)
+        except FileNotFoundError:
+            pass
+
+        self.pending_ops = 0
+        self.seq = snapshot_seq
+        try:
+            with open(self._file(JOURNAL_NAME), 'rb') as f:
+                intact = 0
+                for number, line in enumerate(f, 1):
+                    try:
+                        if not line.endswith(b'\n'):
+                            raise ValueError('unterminated entry')
+                        entry = json.loads(line)
+                    except ValueError:
+                        # Torn write from a crash: keep everything before it and
+                        # cut it off so new entries start on a fresh line
+                        f.close()
+                        os.truncate(self._file(JOURNAL_NAME), intact)
+                        break
+                    intact += len(line)
+                    try:
+                        seq = entry.get('seq')
+                        if seq is not None and seq <= snapshot_seq:
+                            continue  # Already in the snapshot (crash mid-compaction)
+                        self._apply(cards, entry)
+                    except (AttributeError, KeyError, IndexError, TypeError) as e:
+                        raise ValueError(f"Corrupt journal entry on line {number}: {e!r}") from None
+                    self.pending_ops += 1
+                    if seq is not None:
+                        self.seq = seq
+        except FileNotFoundError:
+            pass
+
+        for card in cards:
+            card['Custom_Image'] = self._resolve(card.get('Custom_Image'))
+        return cards
+
+    def _apply(self, cards, entry):
+        op = entry['op']
+        if op == 'add':
+            cards.append(entry['card'])
+        elif op == 'set':
+            cards[entry['index']][entry['field']] = entry['value']
+        elif op == 'remove':
+            del cards[entry['index']]
+        elif op == 'clear':
+            cards.clear()
+        else:
+            raise ValueError(f"Unknown journal entry '{op}'")
+
+    def log(self, op, **fields):
+        """Append one edit to the journal"""
+        if op == 'add':
+            fields['card'] = self._stored_card(fields['card'])
+        elif op == 'set' and fields['field'] == 'Custom_Image':
+            fields['value'] = self._portable(fields['value'])
+
+        if self.seq is None:
+            self.load()  # Numbering continues from what is on disk
+        if self._journal is None:
+            self._journal = open(self._file(JOURNAL_NAME), 'a', encoding='utf-8')
+        self.seq += 1
+        self._journal.write(json.dumps(dict(fields, op=op, seq=self.seq), ensure_ascii=False) + '\n')
+        self._journal.flush()
+        self.pending_ops += 1
+
+    def needs_compaction(self):
+        return self.pending_ops >= self.compact_every
+
+    def compact(self, cards):
+        """Write cards as the new snapshot and start an empty journal"""
+        if self.seq is None:
+            self.load()
+        snapshot = {'version': PROJECT_VERSION, 'seq': self.seq,
+                    'cards': [self._stored_card(card) for card in cards]}
+        # Write then rename: a crash leaves either the old or the new snapshot
+        fd, temp_path = tempfile.mkstemp(dir=self.path, suffix='.tmp')
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(snapshot, f, ensure_ascii=False, separators=(',', ':'))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, self._file(SNAPSHOT_NAME))
+
+        # The journal only holds edits newer than the snapshot, so drop it; if
+        # a crash comes first, load() skips entries numbered up to snapshot seq
+        self.close()
+        open(self._file(JOURNAL_NAME), 'w').close()
+        self.pending_ops = 0
+
+    def add_asset(self, image_path):
+        """Copy an image into the asset store (once per content); returns its path"""
+        digest = hashlib.sha1()
+        with open(image_path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                digest.update(chunk)
+        ext = os.path.splitext(image_path)[1].lower()
+        asset_path = os.path.join(self.assets_dir, digest.hexdigest() + ext)
+        if not os.path.exists(asset_path):
+            fd, temp_path = tempfile.mkstemp(dir=self.assets_dir, suffix='.tmp')
+            os.close(fd)
+            shutil.copyfile(image_path, temp_path)
+            os.replace(temp_path, asset_path)
+        return asset_path
+
+    def close(self):
+        if self._journal is not None:
+            self._journal.close()
+            self._journal = None
@@ -0,0 +1,280 @@
+"""
+ESC/POS raster output for the Android Card Generator
+Renders the same card layout as the PDF backend straight to 1-bit bitmaps at
+the thermal printer's resolution and streams them as GS v 0 raster blocks.
+Only one card is held in memory at a time, however long the deck.
+"""
+
+import os
+import socket
+
+import numpy as np
+from PIL import Image as PILImage, ImageChops, ImageDraw, ImageFont
+
+from card_record import IconColor, as_record
+
+DEFAULT_DPI = 203
+DEFAULT_DOTS_WIDE = 240  # 30mm paper at 203 dpi
+MAX_BLOCK_ROWS = 128  # Rows per GS v 0 block; keeps printer buffers happy
+
+ESC_INIT = b'\x1b@'
+GS_CUT = b'\x1dV\x42\x00'  # Feed to the cutter and partial cut
+
+# 8x8 Bayer matrix, scaled to 0-255 thresholds
+_BAYER_8 = np.array([
+    [0, 32, 8, 40, 2, 34, 10, 42],
+    [48, 16, 56, 24, 50, 18, 58, 26],
+    [12, 44, 4, 36, 14, 46, 6, 38],
+    [60, 28, 52, 20, 62, 30, 54, 22],
+    [3, 35, 11, 43, 1, 33, 9, 41],
+    [51, 19, 59, 27, 49, 17, 57, 25],
+    [15, 47, 7, 39, 13, 45, 5, 37],
+    [63, 31, 55, 23, 61, 29, 53, 21],
+], dtype=np.float32)
+BAYER_THRESHOLDS = (_BAYER_8 + 0.5) * (255.0 / 64.0)
+
+FONT_CANDIDATES = {
+    False: ('DejaVuSans.ttf', 'Roboto-Regular.ttf', '/system/fonts/Roboto-Regular.ttf', 'arial.ttf'),
+    True: ('DejaVuSans-Bold.ttf', 'Roboto-Bold.ttf', '/system/fonts/Roboto-Bold.ttf', 'arialbd.ttf'),
+}
+# Shipped inside reportlab, so there is always a TrueType font to fall back on
+# (current Android has no Roboto-Bold.ttf)
+REPORTLAB_FONTS = {False: 'Vera.ttf', True: 'VeraBd.ttf'}
+
+
+def reportlab_font_path(bold):
+    import reportlab
+    return os.path.join(os.path.dirname(reportlab.__file__), 'fonts', REPORTLAB_FONTS[bold])
+
+
+def default_font(size):
+    """PIL's built-in font; scalable only on Pillow 10.1+, fixed size before"""
+    try:
+        return ImageFont.load_default(size)
+    except TypeError:
+        return ImageFont.load_default()
+
+
+def dither(gray):
+    """Ordered (Bayer) dithering of a 0-255 grayscale array; True = black dot"""
+    height, width = gray.shape
+    reps = (-(-height // 8), -(-width // 8))
+    thresholds = np.tile(BAYER_THRESHOLDS, reps)[:height, :width]
+    return gray < thresholds
+
+
+def raster_blocks(bits, max_rows=MAX_BLOCK_ROWS):
+    """Yield GS v 0 commands for a boolean bitmap, max_rows rows at a time"""
+    packed = np.packbits(bits, axis=1)  # Width is padded to whole bytes
+    width_bytes = packed.shape[1]
+    for top in range(0, packed.shape[0], max_rows):
+        block = packed[top:top + max_rows]
+        rows = block.shape[0]
+        header = b'\x1dv0\x00' + bytes((width_bytes & 0xFF, width_bytes >> 8,
+                                        rows & 0xFF, rows >> 8))
+        yield header + block.tobytes()
+
+
+class RasterCanvas:
+    """The subset of the reportlab canvas API used by draw_suit_icon
+
+    Lets the suit geometry be drawn into a PIL image; to_px maps suit
+    coordinates (points, y up) to pixel coordinates.
+    """
+
+    def __init__(self, draw, to_px, scale):
+        self.draw = draw
+        self.to_px = to_px
+        self.scale = scale
+
+    def saveState(self):
+        pass
+
+    def restoreState(self):
+        pass
+
+    def setFillColor(self, color):
+        pass  # Thermal output is one color
+
+    def beginPath(self):
+        return _RasterPath()
+
+    def drawPath(self, path, fill=1, fillMode=None):
+        polygons = [[self.to_px(x, y) for x, y in points]
+                    for points in path.polygons if len(points) > 2]
+        if len(polygons) == 1:
+            self.draw.polygon(polygons[0], fill=0)
+        elif polygons:
+            # Subpaths share one fill, so holes (e.g. in SVG suit icons) stay
+            # open; overlaps are combined even-odd
+            xs = [x for points in polygons for x, _ in points]
+            ys = [y for points in polygons for _, y in points]
+            left, top = int(min(xs)), int(min(ys))
+            size = (int(max(xs)) - left + 2, int(max(ys)) - top + 2)
+            mask = PILImage.new('1', size, 0)
+            for points in polygons:
+                layer = PILImage.new('1', size, 0)
+                ImageDraw.Draw(layer).polygon([(x - left, y - top) for x, y in points], fill=1)
+                mask = ImageChops.logical_xor(mask, layer)
+            self.draw.bitmap((left, top), mask, fill=0)
+
+    def circle(self, x, y, r, fill=1):
+        cx, cy = self.to_px(x, y)
+        radius = r * self.scale
+        self.draw.ellipse((cx - radius, cy - radius, cx + radius, cy + radius), fill=0)
+
+    def rect(self, x, y, width, height, fill=1):
+        (x0, y0), (x1, y1) = self.to_px(x, y), self.to_px(x + width, y + height)
+        self.draw.rectangle((min(x0, x1), min(y0, y1), max(x0, x1), max(y0, y1)), fill=0)
+
+
+class _RasterPath:
+    def __init__(self):
+        self.polygons = []
+
+    def moveTo(self, x, y):
+        self.polygons.append([(x, y)])
+
+    def lineTo(self, x, y):
+        self.polygons[-1].append((x, y))
+
+    def close(self):
+        pass
+
+
+class EscPosRasterRenderer:
+    """Draws cards with a generator's layout as 1-bit thermal printer bands"""
+
+    def __init__(self, generator, dpi=DEFAULT_DPI, dots_wide=DEFAULT_DOTS_WIDE):
+        self.generator = generator
+        self.layout = generator.template.layout
+        self.dpi = dpi
+        self.dots_wide = dots_wide
+        self.scale = dpi / 72.0  # Points to dots
+        self.card_width = round(self.layout.width * self.scale)
+        self.card_height = round(self.layout.height * self.scale)
+        self.margin = round(generator.margin * self.scale)
+        self.left = (dots_wide - self.card_width) // 2
+        self._fonts = {}
+
+    def font(self, size_pt, bold=False):
+        """Load (once) the closest available font at size_pt"""
+        key = (round(size_pt * self.scale), bold)
+        if key not in self._fonts:
+            font = None
+            for name in FONT_CANDIDATES[bold] + (reportlab_font_path(bold),):
+                try:
+                    font = ImageFont.truetype(name, key[0])
+                    break
+                except OSError:
+                    continue
+            self._fonts[key] = font or default_font(key[0])
+        return self._fonts[key]
+
+    def px(self, x, y):
+        """Card coordinates (points, y up) to band pixels (y down)"""
+        return (self.left + x * self.scale, self.margin + self.card_height - y * self.scale)
+
+    def text(self, draw, x, y, value, size_pt, bold=False, anchor='ls', max_width=None):
+        font = self.font(size_pt, bold)
+        if max_width is not None:
+            # Lines are wrapped on Helvetica metrics; step down if the
+            # substitute font runs wider than the text box
+            while font.getlength(value) > max_width * self.scale and size_pt > 1:
+                size_pt -= 0.25
+                font = self.font(size_pt, bold)
+        draw.text(self.px(x, y), value, font=font, fill=0, anchor=anchor)
+
+    def draw_suit(self, draw, x, y, suit, size, rotated=False):
+        if rotated:
+            # Matches translate(x, y) + rotate(180) in the PDF backend
+            to_px = lambda sx, sy: self.px(x - sx, y - sy)
+        else:
+            to_px = lambda sx, sy: self.px(x + sx, y + sy)
+        self.generator.draw_suit_icon(RasterCanvas(draw, to_px, self.scale),
+                                      0, 0, suit, IconColor.BLACK, size=size)
+
+    def render_card(self, card_data):
+        """Return one card (with the gap above it) as a grayscale PIL image"""
+        card = as_record(card_data)
+        layout = self.layout
+        band = PILImage.new('L', (self.dots_wide, self.card_height + self.margin), 255)
+        draw = ImageDraw.Draw(band)
+        draw.fontmode = '1'  # No anti-aliasing: crisp dots on a thermal head
+
+        x0, y0 = self.px(0, layout.height)
+        x1, y1 = self.px(layout.width, 0)
+        draw.rounded_rectangle((x0, y0, x1 - 1, y1 - 1), radius=layout.corner_radius * self.scale,
+                               outline=0, width=max(1, round(0.5 * self.scale)))
+        self.text(draw, layout.text_x, layout.task_label_y, 'Task:', 5, bold=True)
+        self.text(draw, layout.text_x, layout.rules_label_y, 'Rules:', 5, bold=True)
+
+        self.text(draw, layout.name_x, layout.name_y, card.name, 7, bold=True, anchor='ms')
+        value = card.value
+        self.text(draw, layout.value_x, layout.value_y, value, 6, bold=True)
+        # Upside-down corner value: render, rotate and paste
+        value_font = self.font(6, bold=True)
+        left, top, right, bottom = value_font.getbbox(value, anchor='ls')
+        label = PILImage.new('L', (max(1, right - left), max(1, bottom - top)), 255)
+        label_draw = ImageDraw.Draw(label)
+        label_draw.fontmode = '1'
+        label_draw.text((-left, -top), value, font=value_font, fill=0, anchor='ls')
+        rx, ry = self.px(layout.value_rot_x, layout.value_rot_y)
+        band.paste(label.rotate(180), (round(rx - right), round(ry + top)))
+
+        image = self.load_image(card)
+        if image is not None:
+            ix, iy = self.px(layout.image_x, layout.image_y + layout.image_size)
+            band.paste(image, (round(ix), round(iy)))
+        else:
+            suit = card.suit
+            self.draw_suit(draw, layout.icon_x, layout.icon_y, suit, layout.icon_size)
+            self.draw_suit(draw, layout.icon_rot_x, layout.icon_rot_y, suit, layout.icon_size,
+                           rotated=True)
+            self.draw_suit(draw, layout.center_icon_x, layout.center_icon_y, suit,
+                           layout.center_icon_size)
+
+        for first_y, text in ((layout.task_y, card.task), (layout.rules_y, card.rules)):
+            lines, size = self.generator.layout_text(text)
+            for i, line in enumerate(lines):
+                self.text(draw, layout.text_x, first_y - i * layout.line_step, line, size,
+                          max_width=self.generator.text_width)
+        return band
+
+    def load_image(self, card):
+        """Custom image resized to its printed size in dots, as grayscale"""
+        if not card.image:
+            return None
+        size = round(self.layout.image_size * self.scale)
+        cached = self.generator.load_image_pixels(card.image, (size, size))
+        return cached.image.convert('L') if cached is not None else None
+
+    def write(self, cards, stream, cut=True):
+        """Stream ESC/POS raster data for cards to a binary file-like object"""
+        stream.write(ESC_INIT)
+        count = 0
+        for card_data in cards:
+            card = as_record(card_data)
+            bits = dither(np.asarray(self.render_card(card), dtype=np.float32))
+            # Copies of a card reuse its dithered bands
+            blocks = list(raster_blocks(bits))
+            for _ in range(card.quantity):
+                for block in blocks:
+                    stream.write(block)
+                count += 1
+        if cut:
+            stream.write(GS_CUT)
+        return count
+
+
+def write_escpos_file(generator, cards, path, **kwargs):
+    """Write an ESC/POS job for cards to a file; returns the card count"""
+    with open(path, 'wb') as f:
+        return EscPosRasterRenderer(generator, **kwargs).write(cards, f)
+
+
+def send_escpos(generator, cards, host='127.0.0.1', port=9100, **kwargs):
+    """Send an ESC/POS job to a raw TCP printer port (or a local stand-in)"""
+    with socket.create_connection((host, port)) as conn:
+        with conn.makefile('wb') as stream:
+            return EscPosRasterRenderer(generator, **kwargs).write(cards, stream)
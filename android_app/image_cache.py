@@ -0,0 +1,90 @@
+"""
+Image cache for the Android Card Generator
+Keeps resized custom images in memory so repeated artwork is decoded only once
+"""
+
+from collections import OrderedDict
+import hashlib
+
+from reportlab.lib.utils import ImageReader
+
+from image_source import source_key
+
+
+class CachedImage:
+    """A resized image ready to be handed to reportlab (or a raster backend)"""
+    __slots__ = ('image', 'reader', 'nbytes', 'digest', 'source', 'target_size', 'pixels_digest')
+
+    def __init__(self, image, reader, nbytes, digest, source, target_size):
+        self.image = image
+        self.reader = reader
+        self.nbytes = nbytes
+        self.digest = digest  # Of the cache key (path, mtime, size)
+        self.source = source
+        self.target_size = target_size
+        # Of the pixels, so the same picture gets the same name in any run
+        self.pixels_digest = hashlib.sha1(image.tobytes()).hexdigest()[:16]
+
+
+class ImageCache:
+    """LRU cache of resized images keyed by source and target size
+
+    A path source is keyed by its path and mtime, an in-memory ImageBlob by
+    its content hash.
+
+    disk_cache (a RenderCache) adds a persistent tier so resized images
+    survive between runs.
+    """
+
+    def __init__(self, max_bytes=16 * 1024 * 1024, disk_cache=None):
+        self.max_bytes = max_bytes
+        self.disk_cache = disk_cache
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def make_key(self, source, target_size):
+        """Build the cache key; a touched file gets a fresh entry"""
+        return source_key(source) + (int(target_size[0]), int(target_size[1]))
+
+    def get(self, source, target_size, loader):
+        """Return the CachedImage for a path or ImageBlob, calling loader on a miss
+
+        loader(source, target_size) must return a PIL image.
+        """
+        key = self.make_key(source, target_size)
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+        self.misses += 1
+        digest = hashlib.sha1(repr(key).encode('utf-8')).hexdigest()[:16]
+        image = self.disk_cache.load_image(digest) if self.disk_cache is not None else None
+        if image is None:
+            image = loader(source, target_size)
+            if self.disk_cache is not None:
+                self.disk_cache.store_image(digest, image)
+        width, height = image.size
+        nbytes = width * height * len(image.getbands())
+        entry = CachedImage(image, ImageReader(image), nbytes, digest, source, target_size)
+
+        self._entries[key] = entry
+        self.current_bytes += nbytes
+        self._evict()
+        return entry
+
+    def _evict(self):
+        # Always keep the most recent entry, even if it is over budget on its own
+        while self.current_bytes > self.max_bytes and len(self._entries) > 1:
+            _, old = self._entries.popitem(last=False)
+            self.current_bytes -= old.nbytes
+
+    def clear(self):
+        self._entries.clear()
+        self.current_bytes = 0
@@ -0,0 +1,118 @@
+"""
+Image sources for the Android Card Generator
+A card image is either a file path or the file's bytes held in memory
+(bytes, memoryview or a slice of an mmapped packed deck).  In-memory images
+are wrapped in an ImageBlob, which the decoder reads through a zero-copy
+file object and which is identified by a hash of its contents.
+"""
+
+import hashlib
+import io
+import mmap
+import os
+
+BLOB_PREFIX = 'blob:'
+BUFFER_TYPES = (bytes, bytearray, memoryview, mmap.mmap)
+
+
+class BufferFile(io.RawIOBase):
+    """Read-only, seekable file over a memoryview; reads copy only what is asked for"""
+
+    def __init__(self, view):
+        self.view = view
+        self.position = 0
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def readinto(self, buffer):
+        chunk = self.view[self.position:self.position + len(buffer)]
+        buffer[:len(chunk)] = chunk
+        self.position += len(chunk)
+        return len(chunk)
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        if whence == io.SEEK_CUR:
+            offset += self.position
+        elif whence == io.SEEK_END:
+            offset += len(self.view)
+        self.position = max(0, offset)
+        return self.position
+
+    def tell(self):
+        return self.position
+
+
+class ImageBlob:
+    """An image file's contents in memory, compared and hashed by content"""
+    __slots__ = ('data', '_digest')
+
+    def __init__(self, data):
+        view = memoryview(data)
+        self.data = view if view.format == 'B' and view.ndim == 1 else view.cast('B')
+        self._digest = None
+
+    @property
+    def digest(self):
+        # Hashed on first use, straight from the buffer
+        if self._digest is None:
+            self._digest = hashlib.sha1(self.data).hexdigest()
+        return self._digest
+
+    def __len__(self):
+        return len(self.data)
+
+    def __str__(self):
+        return BLOB_PREFIX + self.digest
+
+    __repr__ = __str__
+
+    def __eq__(self, other):
+        return isinstance(other, ImageBlob) and other.digest == self.digest
+
+    def __hash__(self):
+        return hash(self.digest)
+
+    def __reduce__(self):
+        # mmap slices cannot be pickled; parallel workers get a copy of the bytes
+        return (ImageBlob, (bytes(self.data),))
+
+    def open(self):
+        return BufferFile(self.data)
+
+
+def as_image_source(image):
+    """Normalize a card image: None, a path string or an ImageBlob"""
+    if not image:
+        return None
+    if isinstance(image, ImageBlob):
+        return image
+    if isinstance(image, BUFFER_TYPES):
+        return ImageBlob(image)
+    return str(image)
+
+
+def is_blob(image):
+    return isinstance(image, ImageBlob)
+
+
+def source_key(image):
+    """Identity of an image source: (path, mtime, size) or the content hash
+
+    Only stats a path, never reads it; raises FileNotFoundError for a
+    missing file.
+    """
+    if isinstance(image, ImageBlob):
+        return (BLOB_PREFIX, image.digest)
+    stat = os.stat(image)
+    return (os.path.abspath(image), stat.st_mtime_ns, stat.st_size)
+
+
+def open_source(image):
+    """File object to decode an image source from"""
+    if isinstance(image, ImageBlob):
+        return image.open()
+    return open(image, 'rb')
@@ -0,0 +1,148 @@
+"""
+Multi-up imposition for the Android Card Generator
+Packs cards into a grid on office sheets (A4, Letter or a custom size) with
+gutters, bleed, cut marks and duplex-aligned back pages.  Every card's page
+and position is computed up front, then each sheet is drawn in one pass.
+"""
+
+from reportlab.lib import colors
+from reportlab.lib.pagesizes import A4, letter
+from reportlab.lib.units import mm
+
+SHEET_SIZES = {
+    'a4': A4,
+    'letter': letter,
+}
+
+CUT_MARK_LENGTH = 4 * mm
+CUT_MARK_OFFSET = 1 * mm  # Gap between the grid and the start of a mark
+BACK_FORM = 'card_back'
+
+
+def sheet_size(sheet):
+    """Page size in points for a sheet name or a (width_mm, height_mm) pair"""
+    if isinstance(sheet, str):
+        try:
+            return SHEET_SIZES[sheet.lower()]
+        except KeyError:
+            raise ValueError(f"Unknown sheet '{sheet}' (expected {', '.join(SHEET_SIZES)} "
+                             f"or WIDTHxHEIGHT in mm)") from None
+    width, height = sheet
+    return (width * mm, height * mm)
+
+
+class SheetLayout:
+    """Grid of card slots on one sheet, centered within the margins"""
+    __slots__ = (
+        'page_width', 'page_height', 'card_width', 'card_height', 'gutter', 'bleed',
+        'columns', 'rows', 'pitch_x', 'pitch_y', 'grid_left', 'grid_top', 'slots', 'back_slots',
+    )
+
+    def __init__(self, page_size, card_width, card_height, gutter=2*mm, bleed=0, margin=10*mm):
+        self.page_width, self.page_height = page_size
+        self.card_width = card_width
+        self.card_height = card_height
+        self.gutter = gutter
+        self.bleed = bleed
+
+        # Each slot is the trimmed card plus bleed on every side
+        self.pitch_x = card_width + 2 * bleed + gutter
+        self.pitch_y = card_height + 2 * bleed + gutter
+        usable_width = self.page_width - 2 * margin + gutter
+        usable_height = self.page_height - 2 * margin + gutter
+        self.columns = int(usable_width // self.pitch_x)
+        self.rows = int(usable_height // self.pitch_y)
+        if self.columns < 1 or self.rows < 1:
+            raise ValueError("Card does not fit on the sheet with these margins")
+
+        grid_width = self.columns * self.pitch_x - gutter
+        grid_height = self.rows * self.pitch_y - gutter
+        self.grid_left = (self.page_width - grid_width) / 2
+        self.grid_top = (self.page_height + grid_height) / 2
+
+        # Lower-left corner of each trimmed card, row by row from the top
+        self.slots = []
+        for row in range(self.rows):
+            for column in range(self.columns):
+                x = self.grid_left + column * self.pitch_x + bleed
+                y = self.grid_top - row * self.pitch_y - bleed - card_height
+                self.slots.append((x, y))
+        # Backs mirror left-right so they line up when the sheet is flipped on its long edge
+        self.back_slots = [(self.page_width - x - card_width, y) for x, y in self.slots]
+
+    @property
+    def per_page(self):
+        return len(self.slots)
+
+    def place(self, count):
+        """Assign every card a (page, x, y), all in one go"""
+        per_page = self.per_page
+        slots = self.slots
+        return [(index // per_page,) + slots[index % per_page] for index in range(count)]
+
+    def trim_lines(self):
+        """x positions of vertical and y positions of horizontal trim edges"""
+        xs = sorted({x for x, _ in self.slots} | {x + self.card_width for x, _ in self.slots})
+        ys = sorted({y for _, y in self.slots} | {y + self.card_height for _, y in self.slots})
+        return xs, ys
+
+
+def draw_cut_marks(canvas, layout):
+    """Short trim marks outside the grid, aligned with every card edge, as one path"""
+    xs, ys = layout.trim_lines()
+    left = layout.grid_left - CUT_MARK_OFFSET
+    right = layout.page_width - layout.grid_left + CUT_MARK_OFFSET
+    top = layout.grid_top + CUT_MARK_OFFSET
+    bottom = layout.page_height - layout.grid_top - CUT_MARK_OFFSET
+
+    path = canvas.beginPath()
+    for x in xs:
+        path.moveTo(x, top)
+        path.lineTo(x, top + CUT_MARK_LENGTH)
+        path.moveTo(x, bottom)
+        path.lineTo(x, bottom - CUT_MARK_LENGTH)
+    for y in ys:
+        path.moveTo(left, y)
+        path.lineTo(left - CUT_MARK_LENGTH, y)
+        path.moveTo(right, y)
+        path.lineTo(right + CUT_MARK_LENGTH, y)
+
+    canvas.saveState()
+    canvas.setStrokeColor(colors.black)
+    canvas.setLineWidth(0.25)
+    canvas.drawPath(path, stroke=1, fill=0)
+    canvas.restoreState()
+
+
+def back_form(generator, canvas, layout, back_image=None):
+    """Return the card back form, rendering it on first use
+
+    The back is the image (extended into the bleed) when given, otherwise
+    a plain double border.
+    """
+    if canvas.hasForm(BACK_FORM):
+        return BACK_FORM
+    card_layout = generator.template.layout
+    bleed = layout.bleed
+    canvas.beginForm(BACK_FORM, -bleed - 1, -bleed - 1,
+                     layout.card_width + bleed + 1, layout.card_height + bleed + 1)
+    cached_image = None
+    if back_image:
+        cached_image = generator.load_custom_image(
+            back_image, (layout.card_width + 2 * bleed, layout.card_height + 2 * bleed))
+    if cached_image is not None:
+        canvas.saveState()
+        canvas.translate(-bleed, -bleed)
+        canvas.scale(layout.card_width + 2 * bleed, layout.card_height + 2 * bleed)
+        canvas.drawImage(generator.image_reader(cached_image), 0, 0, width=1, height=1)
+        canvas.restoreState()
+    else:
+        canvas.setStrokeColor(colors.black)
+        canvas.setLineWidth(0.5)
+        canvas.roundRect(0, 0, layout.card_width, layout.card_height,
+                         card_layout.corner_radius, stroke=1, fill=0)
+        inset = 1.5 * mm
+        canvas.roundRect(inset, inset, layout.card_width - 2 * inset,
+                         layout.card_height - 2 * inset, card_layout.corner_radius, stroke=1, fill=0)
+    canvas.endForm()
+    return BACK_FORM
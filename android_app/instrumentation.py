@@ -0,0 +1,114 @@
+"""
+Instrumentation for the Android Card Generator
+Per-phase timers and counters for the rendering hot path.  The generator
+uses NULL_STATS unless given a Stats instance, so with instrumentation off
+every hook is a no-op method call and nothing is measured or stored.
+"""
+
+from contextlib import nullcontext
+import json
+import time
+
+# Phases timed by CardGeneratorAndroid (they may nest: draw includes text_layout)
+PHASES = ('image_decode', 'image_resize', 'draw', 'text_layout', 'save')
+
+
+class _PhaseTimer:
+    __slots__ = ('stats', 'name', 'start')
+
+    def __init__(self, stats, name):
+        self.stats = stats
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stats.add_time(self.name, time.perf_counter() - self.start)
+        return False
+
+
+class Stats:
+    """Collects phase timings and counters
+
+    hook(snapshot) is called every sample_every cards and on flush(), e.g.
+    with json_lines_hook(path) to export a time series of snapshots.
+    """
+    enabled = True
+
+    def __init__(self, hook=None, sample_every=None):
+        self.hook = hook
+        self.sample_every = sample_every
+        self.timers = {}  # phase -> [calls, seconds]
+        self.counters = {}
+        self.started = time.perf_counter()
+
+    def phase(self, name):
+        """Context manager timing one run of a phase"""
+        return _PhaseTimer(self, name)
+
+    def add_time(self, name, seconds):
+        timer = self.timers.get(name)
+        if timer is None:
+            timer = self.timers[name] = [0, 0.0]
+        timer[0] += 1
+        timer[1] += seconds
+
+    def count(self, name, amount=1):
+        value = self.counters[name] = self.counters.get(name, 0) + amount
+        if name == 'cards' and self.sample_every and value % self.sample_every == 0:
+            self.flush()
+
+    def snapshot(self):
+        return {
+            'elapsed': time.perf_counter() - self.started,
+            'timers': {name: {'calls': calls, 'seconds': seconds}
+                       for name, (calls, seconds) in self.timers.items()},
+            'counters': dict(self.counters),
+        }
+
+    def flush(self):
+        """Hand the current snapshot to the hook"""
+        if self.hook is not None:
+            self.hook(self.snapshot())
+
+    def to_json(self):
+        return json.dumps(self.snapshot(), sort_keys=True)
+
+    def reset(self):
+        self.timers.clear()
+        self.counters.clear()
+        self.started = time.perf_counter()
+
+
+class NullStats:
+    """Stand-in used when instrumentation is off; records nothing"""
+    enabled = False
+    _phase = nullcontext()
+
+    def phase(self, name):
+        return self._phase
+
+    def add_time(self, name, seconds):
+        pass
+
+    def count(self, name, amount=1):
+        pass
+
+    def snapshot(self):
+        return {}
+
+    def flush(self):
+        pass
+
+
+NULL_STATS = NullStats()
+
+
+def json_lines_hook(path):
+    """Hook that appends each snapshot to path as one JSON line"""
+    def write(snapshot):
+        with open(path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(snapshot, sort_keys=True) + '\n')
+    return write
@@ -1,38 +1,52 @@
 import kivy
 from kivy.app import App
 from kivy.uix.boxlayout import BoxLayout
-from kivy.uix.gridlayout import GridLayout
-from kivy.uix.scrollview import ScrollView
+from kivy.uix.recycleview import RecycleView
+from kivy.uix.recycleview.views import RecycleDataViewBehavior
+from kivy.uix.recycleboxlayout import RecycleBoxLayout
 from kivy.uix.label import Label
 from kivy.uix.textinput import TextInput
 from kivy.uix.button import Button
-from kivy.uix.checkbox import CheckBox
 from kivy.uix.spinner import Spinner
 from kivy.uix.popup import Popup
-from kivy.uix.filechooser import FileChooserIconView
+from kivy.uix.progressbar import ProgressBar
 from kivy.uix.image import Image
 from kivy.uix.widget import Widget
 from kivy.clock import Clock
 from kivy.metrics import dp
 from kivy.core.window import Window
+from kivy.graphics.texture import Texture
 
 import os
-import json
+import threading
 from datetime import datetime
-from card_generator_android import CardGeneratorAndroid
+from thumbnails import ThumbnailService
+from deck_model import DeckModel, ICON_COLOR_NAMES
+from card_record import as_record, suit_names
+from deck_project import DeckProject
 
 kivy.require('2.0.0')
 
-class CardInputWidget(BoxLayout):
-    def __init__(self, card_number, on_delete_callback, **kwargs):
+class CardInputWidget(RecycleDataViewBehavior, BoxLayout):
+    """One editor row; the RecycleView rebinds it to whichever card scrolls into view"""
+    
+    def __init__(self, **kwargs):
         super().__init__(orientation='vertical', size_hint_y=None, height=dp(400), **kwargs)
-        self.card_number = card_number
-        self.on_delete_callback = on_delete_callback
+        self.index = None
+        self.record = None
         self.uploaded_image_path = None
+        self._refreshing = False
         
         # Card header with delete button
         header = BoxLayout(orientation='horizontal', size_hint_y=None, height=dp(40))
-        header.add_widget(Label(text=f'Card {card_number}', font_size='16sp', bold=True))
+        self.title_label = Label(text='Card', font_size='16sp', bold=True)
+        header.add_widget(self.title_label)
+        
+        # Identical copies are one row with a quantity, rendered once
+        header.add_widget(Label(text='Copies:', size_hint_x=None, width=dp(60)))
+        self.quantity_input = TextInput(hint_text='1', input_filter='int', multiline=False,
+                                        size_hint_x=None, width=dp(50))
+        header.add_widget(self.quantity_input)
         
         delete_btn = Button(text='Delete', size_hint_x=None, width=dp(80))
         delete_btn.bind(on_press=self.delete_card)
@@ -48,7 +62,7 @@ class CardInputWidget(BoxLayout):
         self.add_widget(Label(text='Suit:', size_hint_y=None, height=dp(30)))
         self.suit_spinner = Spinner(
             text='Select Suit',
-            values=['Diamond', 'Heart', 'Spade', 'Club', 'Star', 'Crown', 'Shield', 'Lightning'],
+            values=suit_names(),  # Built-in suits plus any from icon packs
             size_hint_y=None, height=dp(40)
         )
         self.add_widget(self.suit_spinner)
@@ -74,7 +88,7 @@ class CardInputWidget(BoxLayout):
         self.add_widget(Label(text='Icon Color:', size_hint_y=None, height=dp(30)))
         self.color_spinner = Spinner(
             text='Select Color',
-            values=['red', 'black', 'blue', 'green', 'purple', 'orange'],
+            values=ICON_COLOR_NAMES,
             size_hint_y=None, height=dp(40)
         )
         self.add_widget(self.color_spinner)
@@ -94,11 +108,54 @@ class CardInputWidget(BoxLayout):
         
         # Separator
         self.add_widget(Widget(size_hint_y=None, height=dp(10)))
+        
+        # Edits go straight into the bound record
+        for widget, field, placeholder in (
+                (self.card_name_input, 'Card_Name', None),
+                (self.suit_spinner, 'Suit', 'Select Suit'),
+                (self.value_input, 'Value', None),
+                (self.task_input, 'Task', None),
+                (self.rules_input, 'Rules', None),
+                (self.color_spinner, 'Icon_Color', 'Select Color'),
+                (self.quantity_input, 'Quantity', None)):
+            widget.bind(text=lambda w, text, field=field, placeholder=placeholder:
+                        self.on_field_changed(field, '' if text == placeholder else text))
+    
+    def refresh_view_attrs(self, rv, index, data):
+        """Show the card at index; called whenever this row is (re)used"""
+        self.index = index
+        self.record = data
+        self._refreshing = True
+        self.title_label.text = f'Card {index + 1}'
+        self.card_name_input.text = data['Card_Name']
+        self.suit_spinner.text = data['Suit'] or 'Select Suit'
+        self.value_input.text = data['Value']
+        self.task_input.text = data['Task']
+        self.rules_input.text = data['Rules']
+        self.color_spinner.text = data['Icon_Color'] or 'Select Color'
+        self.quantity_input.text = data.get('Quantity', '')
+        self._refreshing = False
+        
+        if data['Custom_Image'] != self.uploaded_image_path:
+            self.uploaded_image_path = data['Custom_Image'] or None
+            if self.uploaded_image_path:
+                self.show_preview(self.uploaded_image_path)
+            else:
+                self.image_preview.texture = None
+        # Not calling super(): it would copy every record key onto the widget
+    
+    def on_field_changed(self, field, value):
+        if not self._refreshing and self.record is not None:
+            # Updates the record in place and autosaves the edit
+            App.get_running_app().deck.update(self.index, field, value)
     
     def delete_card(self, instance):
-        self.on_delete_callback(self)
+        App.get_running_app().remove_card(self.index)
     
     def open_image_chooser(self, instance):
+        # Loaded on first use; the file chooser is not needed to start the app
+        from kivy.uix.filechooser import FileChooserIconView
+        
         content = BoxLayout(orientation='vertical')
         
         filechooser = FileChooserIconView(
@@ -115,10 +172,17 @@ class CardInputWidget(BoxLayout):
         
         popup = Popup(title='Choose Image', content=content, size_hint=(0.9, 0.9))
         
+        # This row may be recycled while the popup is open
+        record = self.record
+        index = self.index
+        
         def select_image(instance):
             if filechooser.selection:
-                self.uploaded_image_path = filechooser.selection[0]
-                self.image_preview.source = self.uploaded_image_path
+                # The deck keeps its own copy of the image in the project
+                App.get_running_app().deck.set_image(index, filechooser.selection[0])
+                if record is self.record:
+                    self.uploaded_image_path = record['Custom_Image']
+                    self.show_preview(self.uploaded_image_path)
                 popup.dismiss()
         
         def cancel_selection(instance):
@@ -129,21 +193,27 @@ class CardInputWidget(BoxLayout):
         
         popup.open()
     
-    def get_card_data(self):
-        return {
-            'Card_Name': self.card_name_input.text.strip() or f'Card {self.card_number}',
-            'Suit': self.suit_spinner.text if self.suit_spinner.text != 'Select Suit' else 'Diamond',
-            'Value': self.value_input.text.strip() or '1',
-            'Task': self.task_input.text.strip() or 'No special action',
-            'Rules': self.rules_input.text.strip() or 'Play normally',
-            'Icon_Color': self.color_spinner.text if self.color_spinner.text != 'Select Color' else 'black',
-            'Custom_Image': self.uploaded_image_path
-        }
+    def show_preview(self, image_path):
+        # Decode and shrink off the UI thread; the full photo never becomes a texture
+        self.image_preview.texture = None
+        App.get_running_app().thumbnails.request(image_path, lambda path, thumb: Clock.schedule_once(
+            lambda dt: self._apply_thumbnail(path, thumb)))
+    
+    def _apply_thumbnail(self, image_path, thumb):
+        if thumb is None or image_path != self.uploaded_image_path:
+            return  # Failed, or another image was picked meanwhile
+        texture = Texture.create(size=thumb.size, colorfmt='rgba')
+        texture.blit_buffer(thumb.tobytes(), colorfmt='rgba', bufferfmt='ubyte')
+        texture.flip_vertical()  # PIL rows run top-down, GL textures bottom-up
+        self.image_preview.texture = texture
 
 class CardGameApp(App):
     def build(self):
         Window.clearcolor = (0.95, 0.95, 0.95, 1)
         
+        # Extra suits: SVG icons dropped in <user data>/suits, parsed once here
+        self.icon_packs = self.load_icon_packs()
+        
         main_layout = BoxLayout(orientation='vertical', padding=dp(10), spacing=dp(10))
         
         # App header
@@ -156,12 +226,18 @@ class CardGameApp(App):
         header.add_widget(subtitle)
         main_layout.add_widget(header)
         
-        # Scroll view for cards
-        scroll = ScrollView()
-        self.cards_layout = BoxLayout(orientation='vertical', spacing=dp(10), size_hint_y=None)
-        self.cards_layout.bind(minimum_height=self.cards_layout.setter('height'))
-        scroll.add_widget(self.cards_layout)
-        main_layout.add_widget(scroll)
+        # Recycled card list: only the rows on screen are real widgets
+        self.deck = self.open_last_session()
+        self.card_list = RecycleView(viewclass=CardInputWidget)
+        cards_layout = RecycleBoxLayout(orientation='vertical', spacing=dp(10), size_hint_y=None,
+                                        default_size=(None, dp(400)), default_size_hint=(1, None))
+        cards_layout.bind(minimum_height=cards_layout.setter('height'))
+        self.card_list.add_widget(cards_layout)
+        main_layout.add_widget(self.card_list)
+        
+        # Generation progress
+        self.progress_bar = ProgressBar(max=1, value=0, size_hint_y=None, height=dp(20))
+        main_layout.add_widget(self.progress_bar)
         
         # Control buttons
         button_layout = BoxLayout(orientation='horizontal', size_hint_y=None, height=dp(60), spacing=dp(10))
@@ -170,9 +246,13 @@ class CardGameApp(App):
         add_card_btn.bind(on_press=self.add_card)
         button_layout.add_widget(add_card_btn)
         
-        generate_btn = Button(text='Generate PDF')
-        generate_btn.bind(on_press=self.generate_pdf)
-        button_layout.add_widget(generate_btn)
+        self.generate_btn = Button(text='Generate PDF')
+        self.generate_btn.bind(on_press=self.generate_pdf)
+        button_layout.add_widget(self.generate_btn)
+        
+        self.cancel_btn = Button(text='Cancel', disabled=True)
+        self.cancel_btn.bind(on_press=self.cancel_generation)
+        button_layout.add_widget(self.cancel_btn)
         
         clear_all_btn = Button(text='Clear All')
         clear_all_btn.bind(on_press=self.clear_all_cards)
@@ -180,79 +260,163 @@ class CardGameApp(App):
         
         main_layout.add_widget(button_layout)
         
-        # Add first card by default
-        self.card_widgets = []
-        self.add_card()
+        # Background generation state
+        self.generation_thread = None
+        self.cancel_event = None
+        self._progress_done = 0
+        self._progress_pending = False
+        
+        # Small previews for picked images, cached in memory and on disk
+        self.thumbnails = ThumbnailService(os.path.join(self.user_data_dir, 'thumbnails'))
+        
+        if len(self.deck):
+            self.refresh_cards()
+        else:
+            # Add first card by default
+            self.add_card()
         
         return main_layout
     
-    def add_card(self, instance=None):
-        card_number = len(self.card_widgets) + 1
-        card_widget = CardInputWidget(card_number, self.remove_card)
-        self.card_widgets.append(card_widget)
-        self.cards_layout.add_widget(card_widget)
+    def load_icon_packs(self):
+        suits_dir = os.path.join(self.user_data_dir, 'suits')
+        if not os.path.isdir(suits_dir):
+            return []
+        from suit_registry import load_icon_pack
+        load_icon_pack(suits_dir)
+        return [suits_dir]
     
-    def remove_card(self, card_widget):
-        if len(self.card_widgets) > 1:  # Keep at least one card
-            self.card_widgets.remove(card_widget)
-            self.cards_layout.remove_widget(card_widget)
-            self.renumber_cards()
+    def open_last_session(self):
+        """Load the autosaved deck, or start a new one"""
+        project_path = os.path.join(self.user_data_dir, 'last_session.deck')
+        try:
+            project = DeckProject(project_path)
+            return DeckModel(project.load(), project)
+        except (OSError, ValueError) as e:
+            # Keep the unreadable session for inspection rather than overwrite it
+            print(f"Error restoring last session: {e}")
+            os.replace(project_path, f"{project_path}.broken_{datetime.now():%Y%m%d_%H%M%S}")
+            return DeckModel(project=DeckProject(project_path))
     
-    def renumber_cards(self):
-        for i, card_widget in enumerate(self.card_widgets):
-            card_widget.card_number = i + 1
-            # Update the header label
-            if card_widget.children:
-                header = card_widget.children[-1]  # First child (added last)
-                if isinstance(header, BoxLayout) and header.children:
-                    label = header.children[-1]  # First child in header
-                    if isinstance(label, Label):
-                        label.text = f'Card {i + 1}'
+    def refresh_cards(self):
+        # Rows hold references to the records, so edits never need a refresh
+        self.card_list.data = self.deck.records
+    
+    def add_card(self, instance=None):
+        self.deck.add()
+        self.refresh_cards()
+        # Show the new card once the list has been laid out
+        Clock.schedule_once(lambda dt: setattr(self.card_list, 'scroll_y', 0))
+    
+    def remove_card(self, index):
+        if len(self.deck) > 1:  # Keep at least one card
+            self.deck.remove(index)
+            self.refresh_cards()
     
     def clear_all_cards(self, instance):
         # Clear all cards and add one empty card
-        for card_widget in self.card_widgets[:]:
-            self.cards_layout.remove_widget(card_widget)
-        self.card_widgets.clear()
+        self.deck.clear()
         self.add_card()
     
     def generate_pdf(self, instance):
+        if self.generation_thread is not None and self.generation_thread.is_alive():
+            return  # A job is already running
+        
         try:
-            # Collect all card data
-            cards_data = []
-            for card_widget in self.card_widgets:
-                card_data = card_widget.get_card_data()
-                cards_data.append(card_data)
+            # Snapshot the records on the UI thread before handing them off
+            cards_data = self.deck.cards()
             
             if not cards_data:
                 self.show_popup('Error', 'No cards to generate!')
                 return
             
-            # Generate PDF using the card generator
-            generator = CardGeneratorAndroid()
             timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
             output_file = f'custom_cards_{timestamp}.pdf'
             
-            # Save cards data temporarily
-            temp_data_file = 'temp_cards_data.json'
-            with open(temp_data_file, 'w', encoding='utf-8') as f:
-                json.dump(cards_data, f, indent=2, ensure_ascii=False)
-            
-            # Generate PDF
-            result = generator.generate_pdf(cards_data, output_file)
-            
-            # Clean up temp file
-            if os.path.exists(temp_data_file):
-                os.remove(temp_data_file)
+            # Progress counts printed copies; a bad card is reported here,
+            # before the buttons are locked for the job
+            copies = sum(as_record(card).quantity for card in cards_data)
+
+            self.cancel_event = threading.Event()
+            self.generate_btn.disabled = True
+            self.cancel_btn.disabled = False
+            self.progress_bar.max = copies
+            self.progress_bar.value = 0
             
-            if result:
-                self.show_popup('Success', f'PDF generated successfully!\nFile: {output_file}\n\nCards: {len(cards_data)}\nSize: 26mm x 36.4mm each')
-            else:
-                self.show_popup('Error', 'Failed to generate PDF. Please check your input data.')
+            # Render off the UI thread so the app stays responsive
+            self.generation_thread = threading.Thread(
+                target=self._run_generation,
+                args=(cards_data, copies, output_file, self.cancel_event),
+                daemon=True)
+            self.generation_thread.start()
                 
         except Exception as e:
             self.show_popup('Error', f'An error occurred:\n{str(e)}')
     
+    def _run_generation(self, cards_data, copies, output_file, cancel_event):
+        """Worker thread: generate the PDF and report back to the UI thread"""
+        error = None
+        try:
+            # The PDF stack (reportlab, PIL) is loaded on the first Generate, not at startup
+            from card_generator_android import CardGeneratorAndroid
+            
+            # Rendered cards are cached between runs so edits only redo changed cards
+            generator = CardGeneratorAndroid(
+                render_cache_dir=os.path.join(self.user_data_dir, 'render_cache'),
+                icon_packs=self.icon_packs)
+            result = generator.generate_pdf(cards_data, output_file,
+                                            progress=self._report_progress,
+                                            cancel_event=cancel_event)
+        except Exception as e:
+            result = False
+            error = str(e)
+        
+        Clock.schedule_once(lambda dt: self._generation_finished(
+            result, error, output_file, copies, cancel_event))
+    
+    def _report_progress(self, done, total):
+        # Called on the worker thread; only the latest count is pushed to the UI
+        self._progress_done = done
+        if not self._progress_pending:
+            self._progress_pending = True
+            Clock.schedule_once(self._apply_progress)
+    
+    def _apply_progress(self, dt):
+        self._progress_pending = False
+        self.progress_bar.value = self._progress_done
+    
+    def cancel_generation(self, instance):
+        if self.cancel_event is not None:
+            self.cancel_event.set()
+            self.cancel_btn.disabled = True
+    
+    def _generation_finished(self, result, error, output_file, card_count, cancel_event):
+        self.generation_thread = None
+        self.cancel_event = None
+        self.generate_btn.disabled = False
+        self.cancel_btn.disabled = True
+        self.progress_bar.value = 0
+        
+        if result:
+            self.show_popup('Success', f'PDF generated successfully!\nFile: {output_file}\n\nCards: {card_count}\nSize: 26mm x 36.4mm each')
+        elif cancel_event.is_set():
+            # The generator removes its own partial file; make sure nothing is left
+            if os.path.exists(output_file):
+                os.remove(output_file)
+            self.show_popup('Cancelled', 'PDF generation was cancelled.')
+        elif error:
+            self.show_popup('Error', f'An error occurred:\n{error}')
+        else:
+            self.show_popup('Error', 'Failed to generate PDF. Please check your input data.')
+    
+    def on_stop(self):
+        # Let a running job stop cleanly when the app closes
+        if self.cancel_event is not None:
+            self.cancel_event.set()
+        self.thumbnails.shutdown()
+        # Edits are already journaled; fold them in so the next start reads one file
+        self.deck.save()
+        self.deck.project.close()
+    
     def show_popup(self, title, message):
         content = BoxLayout(orientation='vertical', padding=dp(10), spacing=dp(10))
         content.add_widget(Label(text=message, text_size=(None, None)))
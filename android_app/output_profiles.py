@@ -0,0 +1,71 @@
+"""
+Output profiles for the Android Card Generator
+A profile trades PDF size against fidelity: how embedded art is encoded
+(lossless Flate or JPEG at a given quality and resolution) and whether text
+uses a subsetted TrueType font embedded in the file or the printer's built-in
+Helvetica.  Page streams are always Flate compressed and written binary
+(card_generator_android); profiles differ only in their image and font settings.
+"""
+
+from collections import namedtuple
+
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfbase.ttfonts import TTFont
+
+BASE_FONTS = ('Helvetica', 'Helvetica-Bold')
+EMBEDDED_FONTS = ('CardSans', 'CardSans-Bold')
+# Vera ships with reportlab, so an embeddable font is always available
+TTF_CANDIDATES = (
+    ('Vera.ttf', 'VeraBd.ttf'),
+    ('DejaVuSans.ttf', 'DejaVuSans-Bold.ttf'),
+    ('/system/fonts/Roboto-Regular.ttf', '/system/fonts/Roboto-Bold.ttf'),
+)
+
+OutputProfile = namedtuple('OutputProfile', ('name', 'image_format', 'jpeg_quality',
+                                             'image_dpi', 'embed_fonts'))
+
+PROFILES = {
+    # Self-contained and lossless: fonts travel with the file
+    'archive': OutputProfile('archive', 'flate', None, 300, True),
+    # Lossless art, printer fonts
+    'print': OutputProfile('print', 'flate', None, 300, False),
+    # Smallest file for phones and Bluetooth printers
+    'transfer': OutputProfile('transfer', 'jpeg', 60, 200, False),
+}
+DEFAULT_PROFILE = 'print'
+
+
+def get_profile(profile):
+    """Return the OutputProfile for a profile or its name"""
+    if isinstance(profile, OutputProfile):
+        return profile
+    try:
+        return PROFILES[profile]
+    except KeyError:
+        raise ValueError(f"Unknown output profile '{profile}' "
+                         f"(expected {', '.join(PROFILES)})") from None
+
+
+def register_fonts():
+    """Register the embeddable regular/bold pair; returns their names or None"""
+    if EMBEDDED_FONTS[0] in pdfmetrics.getRegisteredFontNames():
+        return EMBEDDED_FONTS
+    for regular, bold in TTF_CANDIDATES:
+        try:
+            fonts = (TTFont(EMBEDDED_FONTS[0], regular), TTFont(EMBEDDED_FONTS[1], bold))
+        except Exception:
+            continue
+        for font in fonts:
+            pdfmetrics.registerFont(font)
+        return EMBEDDED_FONTS
+    return None
+
+
+def font_names(profile):
+    """(regular, bold) font names for a profile, falling back to Helvetica"""
+    if profile.embed_fonts:
+        names = register_fonts()
+        if names is not None:
+            return names
+        print("No TrueType font found to embed, using Helvetica")
+    return BASE_FONTS
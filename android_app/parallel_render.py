@@ -0,0 +1,105 @@
+"""
+Parallel PDF rendering for the Android Card Generator
+Splits a deck into shards and draws each shard in its own process.  Workers
+return the PDF drawing operators for their cards plus the forms they use;
+the parent splices them into its canvas in the original card order.
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+import io
+import multiprocessing
+import os
+
+from reportlab.pdfgen import canvas
+
+from card_generator_android import page_operators
+
+CANCEL_POLL_SECONDS = 0.05  # How often a wait for a running shard checks for Cancel
+
+_stop_event = None  # Per worker process: set by the parent to abandon shards
+
+
+def _init_worker(stop_event):
+    global _stop_event
+    _stop_event = stop_event
+
+
+def split_shards(cards_data, shard_count):
+    """Split cards into contiguous, near-equal shards keeping their order"""
+    shard_count = max(1, min(shard_count, len(cards_data)))
+    size, extra = divmod(len(cards_data), shard_count)
+    shards = []
+    start = 0
+    for i in range(shard_count):
+        end = start + size + (1 if i < extra else 0)
+        shards.append(cards_data[start:end])
+        start = end
+    return shards
+
+
+def render_shard(generator, shard, start_index, page_size):
+    """Draw one shard at its final page positions; return (operators, form recipes)"""
+    page_width, page_height = page_size
+    x_center = (page_width - generator.card_width) / 2
+
+    c = canvas.Canvas(io.BytesIO(), pagesize=page_size)
+    generator.prepare_canvas(c)
+    # Everything after this point in the page stream belongs to the cards
+    first_op = len(page_operators(c))
+    for offset, card_data in enumerate(shard):
+        if _stop_event is not None and _stop_event.is_set():
+            return None  # Cancelled; the parent no longer wants this shard
+        y_position = generator.card_y(page_height, start_index + offset)
+        generator.draw_card(c, x_center, y_position, card_data)
+
+    return generator.record_operators(c, first_op)
+
+
+def render_parallel(generator, c, cards_data, page_size, workers=None,
+                    progress=None, cancel_event=None):
+    """Draw cards_data onto canvas c using a process pool
+
+    Returns the shard count, or None if cancel_event was set first.
+    """
+    workers = workers or os.cpu_count() or 1
+    shards = split_shards(list(cards_data), workers)
+    total = sum(len(shard) for shard in shards)
+
+    # Passed at worker start-up: synchronization objects cannot travel with a task
+    stop_event = multiprocessing.Event()
+    pool = ProcessPoolExecutor(max_workers=len(shards), initializer=_init_worker,
+                               initargs=(stop_event,))
+    cancelled = False
+    try:
+        futures = []
+        start = 0
+        for shard in shards:
+            futures.append(pool.submit(render_shard, generator, shard, start, page_size))
+            start += len(shard)
+
+        # Splice in submission order, so cards stay in deck order
+        done = 0
+        for future, shard in zip(futures, shards):
+            cancelled = wait_or_cancel(future, cancel_event)
+            if cancelled:
+                stop_event.set()
+                return None
+            generator.splice_operators(c, *future.result())
+            done += len(shard)
+            if progress is not None:
+                progress(done, total)
+    finally:
+        # A cancelled run drops queued shards and returns without waiting;
+        # shards still drawing stop at their next card
+        pool.shutdown(wait=not cancelled, cancel_futures=True)
+    return len(shards)
+
+
+def wait_or_cancel(future, cancel_event):
+    """Wait for future to finish; returns True if cancel_event was set first"""
+    if cancel_event is None:
+        return False
+    while not future.done():
+        if cancel_event.wait(CANCEL_POLL_SECONDS):
+            return True
+    return cancel_event.is_set()
@@ -0,0 +1,158 @@
+"""
+Persistent per-card render cache for the Android Card Generator
+Stores the PDF drawing operators of each rendered card on disk, keyed by a
+content hash of the card and the generator's layout, so unchanged cards are
+replayed instead of re-rendered on the next run.  Resized custom images and
+whole deterministic documents live in the same directory and share its byte
+budget.
+"""
+
+from collections import OrderedDict
+import hashlib
+import io
+import json
+import os
+import tempfile
+
+CACHE_VERSION = 2  # Bump when the drawing code changes what a card looks like
+
+
+class RenderCache:
+    """Directory of rendered cards and resized images with LRU eviction"""
+
+    def __init__(self, cache_dir, max_bytes=64 * 1024 * 1024):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(cache_dir, exist_ok=True)
+
+        # Index existing files oldest-first; access refreshes the file mtime
+        entries = []
+        for name in os.listdir(cache_dir):
+            if name.endswith(('.json', '.png', '.pdf')):
+                stat = os.stat(os.path.join(cache_dir, name))
+                entries.append((stat.st_mtime, name, stat.st_size))
+        entries.sort()
+        self._index = OrderedDict((name, size) for _, name, size in entries)
+        self.current_bytes = sum(self._index.values())
+
+    def __len__(self):
+        return len(self._index)
+
+    def _path(self, name):
+        return os.path.join(self.cache_dir, name)
+
+    def _read(self, name):
+        """Return the bytes of a cached file, refreshing its LRU position"""
+        if name not in self._index:
+            # Written by another generator or process sharing the directory
+            try:
+                size = os.stat(self._path(name)).st_size
+            except OSError:
+                return None
+            self._index[name] = size
+            self.current_bytes += size
+        try:
+            with open(self._path(name), 'rb') as f:
+                data = f.read()
+            os.utime(self._path(name))
+        except OSError:
+            # File vanished behind our back; forget it
+            self.current_bytes -= self._index.pop(name)
+            return None
+        self._index.move_to_end(name)
+        self._evict()
+        return data
+
+    def _write(self, name, data):
+        # Write then rename so a crash (or a parallel worker) never leaves half a file
+        fd, temp_path = tempfile.mkstemp(dir=self.cache_dir, suffix='.tmp')
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(temp_path, self._path(name))
+
+        self.current_bytes += len(data) - self._index.pop(name, 0)
+        self._index[name] = len(data)
+        self._evict()
+
+    def make_key(self, card_data, layout_signature):
+        """Content hash of a card plus everything that affects how it is drawn"""
+        card = dict(card_data)
+        image = card.get('Custom_Image')
+        if isinstance(image, str) and os.path.exists(image):
+            # An edited image file must invalidate the card
+            stat = os.stat(image)
+            card['_image_stamp'] = [os.path.abspath(image), stat.st_mtime_ns, stat.st_size]
+        payload = json.dumps([CACHE_VERSION, layout_signature, card], sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def get(self, key):
+        """Return (operators, form recipes) for a card key, or None"""
+        data = self._read(key + '.json')
+        try:
+            entry = json.loads(data) if data is not None else None
+        except ValueError:
+            entry = None
+        if entry is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return entry['operators'], entry['forms']
+
+    def put(self, key, operators, recipes):
+        # In-memory images are stored by reference ('blob:<sha1>')
+        data = json.dumps({'operators': operators, 'forms': recipes}, default=str)
+        self._write(key + '.json', data.encode('utf-8'))
+
+    def load_image(self, digest):
+        """Return a previously stored resized image as a PIL image, or None"""
+        data = self._read(f'img_{digest}.png')
+        if data is None:
+            return None
+        from PIL import Image as PILImage
+        image = PILImage.open(io.BytesIO(data))
+        image.load()
+        return image
+
+    def store_image(self, digest, image):
+        buffer = io.BytesIO()
+        image.save(buffer, 'PNG')
+        self._write(f'img_{digest}.png', buffer.getvalue())
+
+    def load_document(self, key):
+        """Return the bytes of a previously stored PDF, or None"""
+        data = self._read(f'doc_{key}.pdf')
+        if data is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return data
+
+    def store_document(self, key, data):
+        # A document too big for the budget would only push every card out
+        if len(data) <= self.max_bytes // 4:
+            self._write(f'doc_{key}.pdf', data)
+
+    def _evict(self):
+        while self.current_bytes > self.max_bytes and len(self._index) > 1:
+            name, size = self._index.popitem(last=False)
+            self.current_bytes -= size
+            try:
+                os.remove(self._path(name))
+            except OSError:
+                pass
+
+    def stats(self):
+        return {'entries': len(self._index), 'bytes': self.current_bytes,
+                'hits': self.hits, 'misses': self.misses}
+
+    def clear(self):
+        for name in list(self._index):
+            try:
+                os.remove(self._path(name))
+            except OSError:
+                pass
+        self._index.clear()
+        self.current_bytes = 0
@@ -0,0 +1,336 @@
+#!/usr/bin/env python3
+"""
+Local HTTP render service for the Android Card Generator
+Keeps warm generators in a pool of worker processes and renders decks
+posted as JSON, so callers pay the reportlab/PIL startup cost once.
+
+    POST /render      deck JSON -> PDF bytes (waits for the job)
+    POST /jobs        deck JSON -> 202 {"job_id": ...}
+    GET  /jobs/<id>   202 {"status": ...} while pending, then the PDF
+    GET  /stats       queue depth, job counts and latency percentiles
+
+A deck is a list of card dicts, or {"cards": [...], "profile": "transfer"}.
+When max_queue jobs are already pending, new ones get 503 with Retry-After,
+as do requests arriving while a crashed worker pool is being replaced.
+"""
+
+from collections import deque, OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import argparse
+import contextlib
+import io
+import json
+import sys
+import threading
+import time
+import uuid
+
+DEFAULT_PORT = 8765
+DEFAULT_WORKERS = 2
+DEFAULT_MAX_QUEUE = 16
+MAX_BODY_BYTES = 16 * 1024 * 1024
+MAX_FINISHED_JOBS = 256  # Unfetched results kept for polling clients
+LATENCY_WINDOW = 1000  # Recent jobs used for the latency percentiles
+
+_generators = {}  # Per worker process: profile name -> warm generator
+_generator_options = {}
+
+
+def _init_worker(generator_options):
+    global _generator_options
+    _generator_options = generator_options
+    # Pay the import cost when the pool starts, not on the first job
+    import card_generator_android  # noqa: F401
+
+
+def render_job(cards, profile):
+    """Render a deck in a worker process and return the PDF bytes"""
+    generator = _generators.get(profile)
+    if generator is None:
+        from card_generator_android import CardGeneratorAndroid
+        generator = _generators[profile] = CardGeneratorAndroid(profile=profile,
+                                                                **_generator_options)
+    output = io.BytesIO()
+    log = io.StringIO()
+    with contextlib.redirect_stdout(log):
+        success = generator.generate_pdf(cards, output)
+    if not success:
+        # The generator reports what went wrong on its last line
+        lines = log.getvalue().strip().splitlines()
+        raise RuntimeError(lines[-1] if lines else "PDF generation failed")
+    return output.getvalue()
+
+
+class QueueFull(Exception):
+    """Raised by RenderService.submit when max_queue jobs are pending"""
+
+
+class Job:
+    __slots__ = ('job_id', 'future', 'submitted', 'finished')
+
+    def __init__(self, job_id, future):
+        self.job_id = job_id
+        self.future = future
+        self.submitted = time.perf_counter()
+        self.finished = None
+
+    @property
+    def status(self):
+        if self.future.done():
+            return 'failed' if self.future.exception() is not None else 'done'
+        return 'running' if self.future.running() else 'queued'
+
+
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, max(0, round(fraction * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+class RenderService:
+    """Bounded job queue in front of a pool of warm generator processes"""
+
+    def __init__(self, workers=DEFAULT_WORKERS, max_queue=DEFAULT_MAX_QUEUE,
+                 generator_options=None):
+        self.max_queue = max_queue
+        self.workers = workers
+        self.generator_options = generator_options or {}
+        self.pool = self._new_pool()
+        self.jobs = OrderedDict()
+        self.pending = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        self.latencies = deque(maxlen=LATENCY_WINDOW)
+        self._lock = threading.Lock()
+
+    def _new_pool(self):
+        return ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker,
+                                   initargs=(self.generator_options,))
+
+    def _replace_pool(self, broken):
+        # A worker died and took the pool with it; later jobs get a fresh one
+        if self.pool is broken:
+            self.pool = self._new_pool()
+            broken.shutdown(wait=False, cancel_futures=True)
+
+    def submit(self, cards, profile='print'):
+        """Queue a deck; returns the Job or raises QueueFull
+
+        Raises BrokenProcessPool (after starting a new pool) if a worker died.
+        """
+        with self._lock:
+            if self.pending >= self.max_queue:
+                self.rejected += 1
+                raise QueueFull(f"{self.pending} jobs pending")
+            pool = self.pool
+            try:
+                future = pool.submit(render_job, cards, profile)
+            except BrokenProcessPool:
+                self.failed += 1
+                self._replace_pool(pool)
+                raise
+            self.pending += 1
+            job = Job(uuid.uuid4().hex, future)
+            self.jobs[job.job_id] = job
+            self._forget_finished()
+        job.future.add_done_callback(lambda future: self._finish(job, pool))
+        return job
+
+    def _finish(self, job, pool):
+        with self._lock:
+            job.finished = time.perf_counter()
+            self.pending -= 1
+            error = job.future.exception()
+            if error is None:
+                self.completed += 1
+                self.latencies.append(job.finished - job.submitted)
+            else:
+                self.failed += 1
+                if isinstance(error, BrokenProcessPool):
+                    self._replace_pool(pool)
+
+    def _forget_finished(self):
+        # Oldest finished jobs go first once too many results are waiting
+        finished = [job_id for job_id, job in self.jobs.items() if job.finished is not None]
+        for job_id in finished[:max(0, len(finished) - MAX_FINISHED_JOBS)]:
+            del self.jobs[job_id]
+
+    def job(self, job_id):
+        return self.jobs.get(job_id)
+
+    def release(self, job_id):
+        """Drop a job whose result has been delivered"""
+        with self._lock:
+            self.jobs.pop(job_id, None)
+
+    def stats(self):
+        with self._lock:
+            latencies = sorted(self.latencies)
+            return {
+                'queue_depth': self.pending,
+                'max_queue': self.max_queue,
+                'completed': self.completed,
+                'failed': self.failed,
+                'rejected': self.rejected,
+                'latency_ms': {name: (None if value is None else round(value * 1000, 1))
+                               for name, value in (('p50', percentile(latencies, 0.5)),
+                                                   ('p90', percentile(latencies, 0.9)),
+                                                   ('p99', percentile(latencies, 0.99)))},
+            }
+
+    def shutdown(self):
+        self.pool.shutdown(cancel_futures=True)
+
+
+def parse_deck(body):
+    """Validate a posted deck; returns (cards, profile) or raises ValueError"""
+    from card_record import as_record
+    from output_profiles import DEFAULT_PROFILE, get_profile
+
+    deck = json.loads(body)
+    profile = DEFAULT_PROFILE
+    if isinstance(deck, dict):
+        profile = deck.get('profile', DEFAULT_PROFILE)
+        deck = deck.get('cards')
+    if not isinstance(deck, list) or not all(isinstance(card, dict) for card in deck):
+        raise ValueError("Expected a list of card objects")
+    get_profile(profile)
+    # Bad cards are reported to the caller here rather than failing in a worker
+    for index, card in enumerate(deck):
+        try:
+            as_record(card)
+        except ValueError as e:
+            raise ValueError(f"cards[{index}]: {e}") from None
+    return deck, profile
+
+
+class RenderRequestHandler(BaseHTTPRequestHandler):
+    server_version = 'CardRenderService/1.0'
+
+    @property
+    def service(self):
+        return self.server.service
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+    def send_json(self, status, payload, headers=()):
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in headers:
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def send_pdf(self, data):
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/pdf')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def send_result(self, job):
+        self.service.release(job.job_id)
+        error = job.future.exception()
+        if error is not None:
+            self.send_json(500, {'job_id': job.job_id, 'status': 'failed', 'error': str(error)})
+        else:
+            self.send_pdf(job.future.result())
+
+    def do_POST(self):
+        if self.path not in ('/render', '/jobs'):
+            self.send_json(404, {'error': 'Not found'})
+            return
+        try:
+            length = int(self.headers.get('Content-Length') or 0)
+        except ValueError:
+            self.send_json(400, {'error': 'Bad Content-Length'})
+            return
+        if length > MAX_BODY_BYTES:
+            self.send_json(413, {'error': f'Deck larger than {MAX_BODY_BYTES} bytes'})
+            return
+        try:
+            cards, profile = parse_deck(self.rfile.read(length))
+            job = self.service.submit(cards, profile)
+        except ValueError as e:
+            self.send_json(400, {'error': str(e)})
+            return
+        except QueueFull as e:
+            self.send_json(503, {'error': f'Queue full ({e})'}, headers=[('Retry-After', '1')])
+            return
+        except BrokenProcessPool:
+            self.send_json(503, {'error': 'Render workers restarting'},
+                           headers=[('Retry-After', '1')])
+            return
+
+        if self.path == '/jobs':
+            self.send_json(202, {'job_id': job.job_id, 'status': job.status},
+                           headers=[('Location', f'/jobs/{job.job_id}')])
+        else:
+            self.send_result(job)  # Waits for the job to finish
+
+    def do_GET(self):
+        if self.path == '/stats':
+            self.send_json(200, self.service.stats())
+        elif self.path.startswith('/jobs/'):
+            job = self.service.job(self.path[len('/jobs/'):])
+            if job is None:
+                self.send_json(404, {'error': 'Unknown job'})
+            elif job.future.done():
+                self.send_result(job)
+            else:
+                self.send_json(202, {'job_id': job.job_id, 'status': job.status},
+                               headers=[('Retry-After', '1')])
+        else:
+            self.send_json(404, {'error': 'Not found'})
+
+
+def make_server(service, host='127.0.0.1', port=DEFAULT_PORT, verbose=False):
+    """HTTP server bound to host:port (port 0 picks a free one)"""
+    server = ThreadingHTTPServer((host, port), RenderRequestHandler)
+    server.daemon_threads = True
+    server.service = service
+    server.verbose = verbose
+    return server
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Serve card PDF rendering over local HTTP')
+    parser.add_argument('--host', default='127.0.0.1', help='address to bind (default: 127.0.0.1)')
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT,
+                        help=f'port to listen on (default: {DEFAULT_PORT})')
+    parser.add_argument('--workers', type=int, default=DEFAULT_WORKERS,
+                        help=f'render processes (default: {DEFAULT_WORKERS})')
+    parser.add_argument('--max-queue', type=int, default=DEFAULT_MAX_QUEUE,
+                        help=f'pending jobs before requests are refused (default: {DEFAULT_MAX_QUEUE})')
+    parser.add_argument('--render-cache', metavar='DIR',
+                        help='persistent cache of rendered cards and whole documents')
+    parser.add_argument('-v', '--verbose', action='store_true', help='log every request')
+    args = parser.parse_args(argv)
+
+    # Deterministic output lets a repeated deck be served from the render cache
+    options = {'deterministic': True}
+    if args.render_cache:
+        options['render_cache_dir'] = args.render_cache
+    service = RenderService(args.workers, args.max_queue, options)
+    server = make_server(service, args.host, args.port, args.verbose)
+    print(f"Render service listening on http://{args.host}:{server.server_address[1]}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.shutdown()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
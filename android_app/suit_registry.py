@@ -0,0 +1,461 @@
+"""
+Suit registry for the Android Card Generator
+Every suit's outline is computed once as a shape in a unit box (y up) and
+drawn by scaling it, so drawing a suit never recomputes its geometry.  The
+built-in suits are plain data below; icon packs (directories of SVG files,
+one suit per file, named after the suit) add suits or restyle built-in
+ones.  Each file is parsed, flattened and simplified once per process, however
+many registries load it: every generator keeps its own registry, so a pack
+loaded for one deck does not restyle another's.
+"""
+
+import hashlib
+import math
+import os
+import re
+
+from card_record import Suit, as_suit, register_suit
+
+CURVE_SEGMENTS = 16  # Line segments per curve or arc before simplification
+SIMPLIFY_TOLERANCE = 0.002  # Of the unit box: 0.2pt on a 100pt glyph form
+FILL_EVEN_ODD, FILL_NON_ZERO = 0, 1  # reportlab's fillMode values
+
+_PARSED = {}  # (path, mtime, size) -> SuitShape, shared by every registry
+
+
+class SuitShape:
+    """A suit outline in the unit box, as separately filled parts:
+
+        ('circle', cx, cy, r)
+        ('rect', x, y, width, height)
+        ('path', polygons, fill_mode)   # subpaths sharing one fill
+    """
+    __slots__ = ('parts',)
+
+    def __init__(self, parts):
+        self.parts = tuple(parts)
+
+    def draw(self, canvas, x, y, size):
+        """Draw the shape size points wide with its lower left corner at (x, y)"""
+        for part in self.parts:
+            kind = part[0]
+            if kind == 'path':
+                path = canvas.beginPath()
+                for polygon in part[1]:
+                    (px, py), rest = polygon[0], polygon[1:]
+                    path.moveTo(x + px * size, y + py * size)
+                    for px, py in rest:
+                        path.lineTo(x + px * size, y + py * size)
+                    path.close()
+                canvas.drawPath(path, fill=1, fillMode=part[2])
+            elif kind == 'circle':
+                canvas.circle(x + part[1] * size, y + part[2] * size, part[3] * size, fill=1)
+            elif kind == 'rect':
+                canvas.rect(x + part[1] * size, y + part[2] * size, part[3] * size,
+                            part[4] * size, fill=1)
+
+    def __eq__(self, other):
+        return isinstance(other, SuitShape) and other.parts == self.parts
+
+    def __hash__(self):
+        return hash(self.parts)
+
+
+def polygon(*points):
+    return ('path', (tuple(points),), FILL_EVEN_ODD)
+
+
+def star_points(count=5, inner=0.5):
+    """Points of a star in the unit box, starting at the bottom tip"""
+    points = []
+    for i in range(count * 2):
+        angle = i * math.pi / count - math.pi / 2
+        radius = 0.5 if i % 2 == 0 else 0.5 * inner
+        points.append((0.5 + radius * math.cos(angle), 0.5 + radius * math.sin(angle)))
+    return points
+
+
+BUILTIN_SHAPES = {
+    Suit.DIAMOND: [polygon((1/2, 0), (0, 1/2), (1/2, 1), (1, 1/2))],
+    Suit.HEART: [('circle', 1/3, 2/3, 1/4), ('circle', 2/3, 2/3, 1/4),
+                 polygon((1/6, 1/2), (5/6, 1/2), (1/2, 0))],
+    Suit.SPADE: [('circle', 1/2, 2/3, 1/3), ('rect', 2/5, 0, 1/5, 1/2)],
+    Suit.CLUB: [('circle', 1/2, 2/3, 1/6), ('circle', 1/3, 1/2, 1/6),
+                ('circle', 2/3, 1/2, 1/6), ('rect', 2/5, 0, 1/5, 1/2)],
+    Suit.STAR: [polygon(*star_points())],
+    Suit.CROWN: [('rect', 0, 0, 1, 1/3)] + [('rect', i/3, 1/3, 1/6, 1/2) for i in range(3)],
+    Suit.SHIELD: [polygon((1/2, 0), (0, 1/3), (0, 2/3), (1/2, 1), (1, 2/3), (1, 1/3))],
+    Suit.LIGHTNING: [polygon((1/3, 0), (0, 1/2), (1/3, 1/2), (0, 1), (2/3, 1/2), (1/3, 1/2))],
+}
+
+
+# SVG parsing
+
+_NUMBER = r'[-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?'
+_PATH_TOKENS = re.compile(r'[MmLlHhVvCcSsQqTtAaZz]|' + _NUMBER)
+_NUMBERS = re.compile(_NUMBER)
+_TRANSFORMS = re.compile(r'(matrix|translate|scale|rotate|skewX|skewY)\s*\(([^)]*)\)')
+_IDENTITY = (1.0, 0.0, 0.0, 1.0, 0.0, 0.0)
+_PATH_ARGS = {'M': 2, 'L': 2, 'H': 1, 'V': 1, 'C': 6, 'S': 4, 'Q': 4, 'T': 2, 'A': 7}
+
+
+def _multiply(m, n):
+    """Affine matrix product m * n, as SVG (a, b, c, d, e, f) tuples"""
+    return (m[0] * n[0] + m[2] * n[1], m[1] * n[0] + m[3] * n[1],
+            m[0] * n[2] + m[2] * n[3], m[1] * n[2] + m[3] * n[3],
+            m[0] * n[4] + m[2] * n[5] + m[4], m[1] * n[4] + m[3] * n[5] + m[5])
+
+
+def parse_transform(text):
+    matrix = _IDENTITY
+    for name, args in _TRANSFORMS.findall(text or ''):
+        values = [float(v) for v in _NUMBERS.findall(args)]
+        if name == 'matrix' and len(values) == 6:
+            step = tuple(values)
+        elif name == 'translate' and values:
+            step = (1, 0, 0, 1, values[0], values[1] if len(values) > 1 else 0)
+        elif name == 'scale' and values:
+            step = (values[0], 0, 0, values[1] if len(values) > 1 else values[0], 0, 0)
+        elif name == 'rotate' and values:
+            angle = math.radians(values[0])
+            cos, sin = math.cos(angle), math.sin(angle)
+            step = (cos, sin, -sin, cos, 0, 0)
+            if len(values) == 3:
+                cx, cy = values[1], values[2]
+                step = _multiply(_multiply((1, 0, 0, 1, cx, cy), step), (1, 0, 0, 1, -cx, -cy))
+        elif name == 'skewX' and values:
+            step = (1, 0, math.tan(math.radians(values[0])), 1, 0, 0)
+        elif name == 'skewY' and values:
+            step = (1, math.tan(math.radians(values[0])), 0, 1, 0, 0)
+        else:
+            continue
+        matrix = _multiply(matrix, step)
+    return matrix
+
+
+def _bezier(p0, p1, p2, p3):
+    """Points along a cubic Bezier, excluding p0"""
+    points = []
+    for i in range(1, CURVE_SEGMENTS + 1):
+        t = i / CURVE_SEGMENTS
+        u = 1 - t
+        points.append((u**3 * p0[0] + 3 * u*u*t * p1[0] + 3 * u*t*t * p2[0] + t**3 * p3[0],
+                       u**3 * p0[1] + 3 * u*u*t * p1[1] + 3 * u*t*t * p2[1] + t**3 * p3[1]))
+    return points
+
+
+def _arc(p0, rx, ry, rotation, large_arc, sweep, p1):
+    """Points along an SVG elliptical arc, excluding p0 (SVG spec F.6.5)"""
+    rx, ry = abs(rx), abs(ry)
+    if rx == 0 or ry == 0 or p0 == p1:
+        return [p1]
+    phi = math.radians(rotation)
+    cos, sin = math.cos(phi), math.sin(phi)
+    dx, dy = (p0[0] - p1[0]) / 2, (p0[1] - p1[1]) / 2
+    x1, y1 = cos * dx + sin * dy, -sin * dx + cos * dy
+    # Radii too small to reach the end point are scaled up
+    scale = (x1 / rx) ** 2 + (y1 / ry) ** 2
+    if scale > 1:
+        rx, ry = rx * math.sqrt(scale), ry * math.sqrt(scale)
+    numerator = rx*rx * ry*ry - rx*rx * y1*y1 - ry*ry * x1*x1
+    factor = math.sqrt(max(0.0, numerator / (rx*rx * y1*y1 + ry*ry * x1*x1)))
+    if large_arc == sweep:
+        factor = -factor
+    cx1, cy1 = factor * rx * y1 / ry, -factor * ry * x1 / rx
+    cx = cos * cx1 - sin * cy1 + (p0[0] + p1[0]) / 2
+    cy = sin * cx1 + cos * cy1 + (p0[1] + p1[1]) / 2
+    start = math.atan2((y1 - cy1) / ry, (x1 - cx1) / rx)
+    end = math.atan2((-y1 - cy1) / ry, (-x1 - cx1) / rx)
+    delta = end - start
+    if sweep and delta < 0:
+        delta += 2 * math.pi
+    elif not sweep and delta > 0:
+        delta -= 2 * math.pi
+    points = []
+    for i in range(1, CURVE_SEGMENTS + 1):
+        angle = start + delta * i / CURVE_SEGMENTS
+        ex, ey = rx * math.cos(angle), ry * math.sin(angle)
+        points.append((cos * ex - sin * ey + cx, sin * ex + cos * ey + cy))
+    points[-1] = p1
+    return points
+
+
+def parse_path(d):
+    """Flatten SVG path data into a list of polygons (lists of points)"""
+    tokens = _PATH_TOKENS.findall(d or '')
+    polygons = []
+    current = None
+    x = y = 0.0
+    start = (0.0, 0.0)
+    control = None  # ('C' or 'Q', last control point), reflected by S and T
+    command = None
+    i = 0
+    while i < len(tokens):
+        if tokens[i].isalpha():
+            command = tokens[i]
+            i += 1
+            if command in 'Zz':
+                x, y = start
+                current = None
+                control = None
+                continue
+        elif command is None or command in 'Zz':
+            raise ValueError(f"Path data without a command: {d[:40]!r}")
+        upper = command.upper()
+        count = _PATH_ARGS[upper]
+        if i + count > len(tokens):
+            break
+        args = [float(v) for v in tokens[i:i + count]]
+        i += count
+        relative = command.islower()
+        if upper == 'M':
+            x, y = (x + args[0], y + args[1]) if relative else args
+            start = (x, y)
+            current = [start]
+            polygons.append(current)
+            control = None
+            # Further coordinate pairs are implicit lineto commands
+            command = 'l' if relative else 'L'
+            continue
+        if current is None:
+            # Drawing straight after Z continues from the subpath's start
+            current = [(x, y)]
+            polygons.append(current)
+        previous = control
+        control = None
+        if upper == 'H':
+            x = x + args[0] if relative else args[0]
+            current.append((x, y))
+        elif upper == 'V':
+            y = y + args[0] if relative else args[0]
+            current.append((x, y))
+        elif upper == 'L':
+            x, y = (x + args[0], y + args[1]) if relative else args
+            current.append((x, y))
+        elif upper == 'A':
+            end = (x + args[5], y + args[6]) if relative else (args[5], args[6])
+            current.extend(_arc((x, y), args[0], args[1], args[2], bool(args[3]),
+                                bool(args[4]), end))
+            x, y = end
+        else:
+            offset = (x, y) if relative else (0.0, 0.0)
+            points = [(offset[0] + args[j], offset[1] + args[j + 1]) for j in range(0, count, 2)]
+            kind = 'Q' if upper in 'QT' else 'C'
+            if upper in 'ST':
+                # The first control point mirrors the previous curve's last one
+                if previous is not None and previous[0] == kind:
+                    points.insert(0, (2 * x - previous[1][0], 2 * y - previous[1][1]))
+                else:
+                    points.insert(0, (x, y))
+            if kind == 'Q':
+                # Quadratic to cubic: same curve, control points 2/3 of the way
+                (qx, qy), end = points
+                points = [(x + 2/3 * (qx - x), y + 2/3 * (qy - y)),
+                          (end[0] + 2/3 * (qx - end[0]), end[1] + 2/3 * (qy - end[1])), end]
+                control = (kind, (qx, qy))
+            else:
+                control = (kind, points[1])
+            current.extend(_bezier((x, y), *points))
+            x, y = points[-1]
+    return polygons
+
+
+def _ellipse(cx, cy, rx, ry):
+    steps = CURVE_SEGMENTS * 2
+    return [[(cx + rx * math.cos(2 * math.pi * i / steps), cy + ry * math.sin(2 * math.pi * i / steps))
+             for i in range(steps)]]
+
+
+def _number(element, name, default=0.0):
+    match = _NUMBERS.match((element.get(name) or '').strip())
+    return float(match.group()) if match else default
+
+
+def _element_polygons(element, tag):
+    if tag == 'path':
+        return parse_path(element.get('d'))
+    if tag in ('polygon', 'polyline'):
+        values = [float(v) for v in _NUMBERS.findall(element.get('points') or '')]
+        return [list(zip(values[0::2], values[1::2]))]
+    if tag == 'rect':
+        x, y = _number(element, 'x'), _number(element, 'y')
+        width, height = _number(element, 'width'), _number(element, 'height')
+        return [[(x, y), (x + width, y), (x + width, y + height), (x, y + height)]]
+    if tag == 'circle':
+        r = _number(element, 'r')
+        return _ellipse(_number(element, 'cx'), _number(element, 'cy'), r, r)
+    if tag == 'ellipse':
+        return _ellipse(_number(element, 'cx'), _number(element, 'cy'),
+                        _number(element, 'rx'), _number(element, 'ry'))
+    return []
+
+
+def _style(element, name):
+    """An attribute, or the same property in the element's style attribute"""
+    for declaration in (element.get('style') or '').split(';'):
+        key, _, value = declaration.partition(':')
+        if key.strip() == name:
+            return value.strip()
+    return element.get(name)
+
+
+def _filled_elements(element, matrix, fill_rule, found):
+    """Collect (polygons in user units, fill mode) for every filled element"""
+    matrix = _multiply(matrix, parse_transform(element.get('transform')))
+    fill_rule = _style(element, 'fill-rule') or fill_rule
+    tag = element.tag.rsplit('}', 1)[-1]
+    if tag in ('defs', 'clipPath', 'mask', 'symbol', 'title', 'desc', 'metadata'):
+        return
+    if _style(element, 'fill') != 'none':
+        polygons = []
+        for points in _element_polygons(element, tag):
+            polygons.append([(matrix[0] * px + matrix[2] * py + matrix[4],
+                              matrix[1] * px + matrix[3] * py + matrix[5]) for px, py in points])
+        if polygons:
+            found.append((polygons, FILL_EVEN_ODD if fill_rule == 'evenodd' else FILL_NON_ZERO))
+    for child in element:
+        _filled_elements(child, matrix, fill_rule, found)
+
+
+def simplify(points, tolerance=SIMPLIFY_TOLERANCE):
+    """Drop points closer than tolerance to the line through their neighbours
+    (Ramer-Douglas-Peucker on the closed outline)"""
+    if len(points) < 4:
+        return points
+    chain = list(points) + [points[0]]
+    keep = [False] * len(chain)
+    keep[0] = keep[-1] = True
+    stack = [(0, len(chain) - 1)]
+    while stack:
+        first, last = stack.pop()
+        (ax, ay), (bx, by) = chain[first], chain[last]
+        dx, dy = bx - ax, by - ay
+        length_sq = dx * dx + dy * dy
+        farthest, distance = None, tolerance
+        for index in range(first + 1, last):
+            px, py = chain[index]
+            if length_sq:
+                t = max(0.0, min(1.0, ((px - ax) * dx + (py - ay) * dy) / length_sq))
+                d = math.hypot(px - ax - t * dx, py - ay - t * dy)
+            else:
+                d = math.hypot(px - ax, py - ay)
+            if d > distance:
+                farthest, distance = index, d
+        if farthest is not None:
+            keep[farthest] = True
+            stack.append((first, farthest))
+            stack.append((farthest, last))
+    return [point for point, kept in zip(chain[:-1], keep[:-1]) if kept]
+
+
+def parse_svg(path):
+    """Load an SVG file as a SuitShape: filled elements, flattened, fitted
+    (centered, aspect kept) to the unit box and simplified"""
+    from xml.etree import ElementTree
+
+    root = ElementTree.parse(path).getroot()
+    found = []
+    _filled_elements(root, _IDENTITY, 'nonzero', found)
+    points = [point for polygons, _ in found for polygon in polygons for point in polygon]
+    if not points:
+        raise ValueError("no filled shapes")
+
+    view_box = [float(v) for v in _NUMBERS.findall(root.get('viewBox') or '')]
+    if len(view_box) == 4 and view_box[2] > 0 and view_box[3] > 0:
+        left, top, width, height = view_box
+    else:
+        xs, ys = [p[0] for p in points], [p[1] for p in points]
+        left, top = min(xs), min(ys)
+        width, height = max(xs) - left or 1, max(ys) - top or 1
+    scale = 1 / max(width, height)
+    pad_x, pad_y = (1 - width * scale) / 2, (1 - height * scale) / 2
+
+    parts = []
+    for polygons, fill_mode in found:
+        unit = []
+        for polygon in polygons:
+            # SVG y runs down, the unit box's up
+            points = [(round(pad_x + (px - left) * scale, 6),
+                       round(1 - pad_y - (py - top) * scale, 6)) for px, py in polygon]
+            points = simplify(points)
+            if len(points) > 2:
+                unit.append(tuple(points))
+        if unit:
+            parts.append(('path', tuple(unit), fill_mode))
+    if not parts:
+        raise ValueError("no filled shapes")
+    return SuitShape(parts)
+
+
+class SuitRegistry:
+    """Suit (or CustomSuit) -> SuitShape, with the built-in suits registered"""
+
+    def __init__(self):
+        self._shapes = {suit: SuitShape(parts) for suit, parts in BUILTIN_SHAPES.items()}
+        self._custom = {}  # Suits whose shape came from an icon pack
+        self._signature = ''
+
+    def __contains__(self, suit):
+        try:
+            return as_suit(suit) in self._shapes
+        except ValueError:
+            return False
+
+    def shape(self, suit):
+        """SuitShape of a suit or suit name; raises ValueError for an unknown suit"""
+        suit = as_suit(suit)
+        try:
+            return self._shapes[suit]
+        except KeyError:
+            raise ValueError(f"No outline registered for suit '{suit.value}'") from None
+
+    def register(self, name, shape):
+        """Add a suit (or replace a suit's outline); returns the suit"""
+        suit = register_suit(name)
+        self._shapes[suit] = shape
+        self._custom[suit] = shape
+        data = repr(sorted((suit.value, shape.parts) for suit, shape in self._custom.items()))
+        self._signature = hashlib.sha1(data.encode('utf-8')).hexdigest()[:16]
+        return suit
+
+    def load_svg(self, path, name=None):
+        """Register the suit drawn in an SVG file, named after the file by default"""
+        stat = os.stat(path)
+        key = (os.path.abspath(path), stat.st_mtime_ns, stat.st_size)
+        shape = _PARSED.get(key)
+        if shape is None:
+            shape = _PARSED[key] = parse_svg(path)
+        return self.register(name or os.path.splitext(os.path.basename(path))[0], shape)
+
+    def load_icon_pack(self, directory):
+        """Register every .svg in directory; returns the suits loaded
+
+        A file that cannot be parsed is reported and skipped.
+        """
+        suits = []
+        for entry in sorted(os.listdir(directory)):
+            if not entry.lower().endswith('.svg'):
+                continue
+            try:
+                suits.append(self.load_svg(os.path.join(directory, entry)))
+            except Exception as e:
+                print(f"Skipping suit icon {entry}: {e}")
+        return suits
+
+    def signature(self):
+        """Hash of the outlines loaded from icon packs ('' if there are none)"""
+        return self._signature
+
+
+# Suit names and outlines for code that is not drawing a particular deck
+# (the app's suit picker); generators draw from their own registries
+SUIT_SHAPES = SuitRegistry()
+
+
+def load_icon_pack(directory):
+    """Load an icon pack into the shared registry; returns the suits loaded
+
+    This makes the suit names valid everywhere; a generator draws the suits
+    of the packs passed as its icon_packs.
+    """
+    return SUIT_SHAPES.load_icon_pack(directory)
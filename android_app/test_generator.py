@@ -5,8 +5,11 @@ This script tests the PDF generation functionality without the GUI
 """
 
 from card_generator_android import CardGeneratorAndroid
+from reportlab.lib.units import mm
 import os
 import json
+import mmap
+import tempfile
 from datetime import datetime
 
 def create_sample_card_data():
@@ -144,21 +147,1476 @@ def test_image_processing():
         print(f"✗ Error testing image processing: {str(e)}")
         return False
 
+def test_image_cache():
+    """Test that repeated custom images are resized and embedded once"""
+    print(f"\n{'='*50}")
+    print("Testing Image Cache...")
+    print("="*50)
+    
+    try:
+        from PIL import Image as PILImage
+        
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            image_path = os.path.join(tmp_dir, 'art.png')
+            PILImage.new('RGB', (300, 200), color='blue').save(image_path)
+            
+            cards_data = create_sample_card_data()
+            for card in cards_data:
+                card['Custom_Image'] = image_path
+            
+            generator = CardGeneratorAndroid()
+            output_file = os.path.join(tmp_dir, 'cached_images.pdf')
+            if not generator.generate_pdf(cards_data, output_file):
+                print("✗ PDF generation failed")
+                return False
+            
+            cache = generator.image_cache
+            if cache.misses != 1 or cache.hits != len(cards_data) - 1:
+                print(f"✗ Unexpected cache stats: {cache.misses} misses, {cache.hits} hits")
+                return False
+            
+            with open(output_file, 'rb') as f:
+                embedded = f.read().count(b'/Subtype /Image')
+            if embedded != 1:
+                print(f"✗ Image embedded {embedded} times")
+                return False
+            
+            if os.path.exists('temp_resized_image.png'):
+                print("✗ Temporary resized image left on disk")
+                return False
+        
+        print("✓ Image decoded once and shared by all cards")
+        return True
+        
+    except ImportError:
+        print("⚠ PIL/Pillow not available, skipping image cache test")
+        return True
+    except Exception as e:
+        print(f"✗ Error testing image cache: {str(e)}")
+        return False
+
+def test_suit_glyph_forms():
+    """Test that suit glyphs are emitted once per (suit, color) pair"""
+    print(f"\n{'='*50}")
+    print("Testing Suit Glyph Forms...")
+    print("="*50)
+    
+    try:
+        sample_cards = create_sample_card_data()
+        cards_data = [dict(sample_cards[i % len(sample_cards)]) for i in range(40)]
+        
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            output_file = os.path.join(tmp_dir, 'glyphs.pdf')
+            if not CardGeneratorAndroid().generate_pdf(cards_data, output_file):
+                print("✗ PDF generation failed")
+                return False
+            
+            with open(output_file, 'rb') as f:
+                forms = f.read().count(b'/Subtype /Form')
+        
+        # One form per (suit, color) pair plus the shared card frame
+        if forms != len(sample_cards) + 1:
+            print(f"✗ Expected {len(sample_cards) + 1} forms, found {forms}")
+            return False
+        
+        print(f"✓ {len(cards_data)} cards share {forms - 1} glyph forms and one frame")
+        return True
+        
+    except Exception as e:
+        print(f"✗ Error testing suit glyph forms: {str(e)}")
+        return False
+
+def test_parallel_generation():
+    """Test that sharded parallel rendering matches the serial output"""
+    print(f"\n{'='*50}")
+    print("Testing Parallel Generation...")
+    print("="*50)
+    
+    try:
+        sample_cards = create_sample_card_data()
+        cards_data = [dict(sample_cards[i % len(sample_cards)]) for i in range(24)]
+        
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            serial_file = os.path.join(tmp_dir, 'serial.pdf')
+            parallel_file = os.path.join(tmp_dir, 'parallel.pdf')
+            generator = CardGeneratorAndroid()
+            if not (generator.generate_pdf(cards_data, serial_file) and
+                    generator.generate_pdf(cards_data, parallel_file, workers=3)):
+                print("✗ PDF generation failed")
+                return False
+            
+            with open(serial_file, 'rb') as f:
+                serial = f.read()
+            with open(parallel_file, 'rb') as f:
+                parallel = f.read()
+        
+        if len(serial) != len(parallel) or parallel.count(b'/Subtype /Form') != len(sample_cards) + 1:
+            print(f"✗ Parallel output differs: {len(serial)} vs {len(parallel)} bytes")
+            return False
+        
+        print(f"✓ 3 workers produced the same {len(parallel)} byte PDF as the serial path")
+        
+        # Cancel while both shards are still drawing: no wait for the batch
+        import threading
+        import time
+        from card_generator_android import page_operators
+        big_deck = [dict(sample_cards[i % len(sample_cards)], Card_Name=f'Card {i}')
+                    for i in range(20000)]
+        cancel_event = threading.Event()
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            threading.Timer(0.5, cancel_event.set).start()
+            start = time.perf_counter()
+            result = generator.generate_pdf(big_deck, os.path.join(tmp_dir, 'big.pdf'),
+                                            workers=2, cancel_event=cancel_event)
+            elapsed = time.perf_counter() - start
+        if result or elapsed > 3:
+            print(f"✗ Cancel took {elapsed:.1f}s to stop the parallel render")
+            return False
+        print(f"✓ Cancel stopped running shards after {elapsed:.1f}s")
+        
+        try:
+            page_operators(object())
+            print("✗ Missing reportlab canvas internals went unnoticed")
+            return False
+        except RuntimeError:
+            print("✓ Missing reportlab canvas internals fail loudly")
+        return True
+        
+    except Exception as e:
+        print(f"✗ Error testing parallel generation: {str(e)}")
+        return False
+
+def test_streaming_generation():
+    """Test paginated generation from a generator without len()"""
+    print(f"\n{'='*50}")
+    print("Testing Streaming Generation...")
+    print("="*50)
+    
+    try:
+        import re
+        sample_cards = create_sample_card_data()
+        
+        def card_stream(count):
+            for i in range(count):
+                yield dict(sample_cards[i % len(sample_cards)])
+        
+        generator = CardGeneratorAndroid()
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            output_file = os.path.join(tmp_dir, 'stream.pdf')
+            files = generator.generate_pdf_stream(card_stream(25), output_file, cards_per_page=10)
+            with open(output_file, 'rb') as f:
+                pages = len(re.findall(rb'/Type /Page\b', f.read()))
+            if files != [output_file] or pages != 3:
+                print(f"✗ Expected 3 pages in one file, got {pages} pages in {files}")
+                return False
+            print("✓ 25 streamed cards paginated onto 3 pages")
+            
+            files = generator.generate_pdf_stream(card_stream(25), output_file,
+                                                  max_page_length_mm=100, pages_per_file=4)
+            if len(files) != 4 or not all(os.path.exists(name) for name in files):
+                print(f"✗ Expected 4 part files, got {files}")
+                return False
+            print("✓ 100mm pages rolled over into 4 part files")
+        
+        return True
+        
+    except Exception as e:
+        print(f"✗ Error testing streaming generation: {str(e)}")
+        return False
+
+def test_benchmark_baseline():
+    """Test that the benchmark suite measures a case and flags regressions"""
+    print(f"\n{'='*50}")
+    print("Testing Benchmark Baseline...")
+    print("="*50)
+    
+    try:
+        from benchmark import run_case, compare_to_baseline
+        
+        result = run_case('icons', 10)
+        if result['cards_per_second'] <= 0 or result['bytes_per_card'] <= 0:
+            print(f"✗ Implausible benchmark result: {result}")
+            return False
+        print(f"✓ icons/10: {result['cards_per_second']:.0f} cards/s, "
+              f"{result['bytes_per_card']:.0f} bytes/card")
+        
+        results = {'icons/10': result}
+        faster = dict(result, cards_per_second=result['cards_per_second'] * 2)
+        if compare_to_baseline(results, {'icons/10': result}, 0.15):
+            print("✗ Identical run reported as a regression")
+            return False
+        if not compare_to_baseline(results, {'icons/10': faster}, 0.15):
+            print("✗ Halved throughput not reported as a regression")
+            return False
+        
+        print("✓ Baseline comparison flags regressions past the threshold")
+        return True
+        
+    except Exception as e:
+        print(f"✗ Error testing benchmark baseline: {str(e)}")
+        return False
+
+def test_deck_import():
+    """Test chunked CSV / JSON-lines import and column mapping"""
+    print(f"\n{'='*50}")
+    print("Testing Deck Import...")
+    print("="*50)
+    
+    try:
+        from deck_import import iter_cards
+        
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            jsonl_path = os.path.join(tmp_dir, 'deck.jsonl')
+            with open(jsonl_path, 'w', encoding='utf-8') as f:
+                f.write(json.dumps({'Name': 'Fire Dragon', 'Colour': 'red', 'Value': 7}) + '\n')
+                f.write(json.dumps({'Name': '', 'Suit': 'Star', 'Image': 'art.png'}) + '\n')
+            
+            cards = list(iter_cards(jsonl_path))
+            first, second = cards
+            if (first['Card_Name'], first['Icon_Color'], first['Value'], first['Suit']) != \
+                    ('Fire Dragon', 'red', '7', 'Diamond'):
+                print(f"✗ Unexpected first card: {first}")
+                return False
+            if second['Card_Name'] != 'Card 2' or \
+                    second['Custom_Image'] != os.path.join(tmp_dir, 'art.png'):
+                print(f"✗ Unexpected second card: {second}")
+                return False
+            print("✓ JSON-lines rows mapped onto the card schema")
+            
+            try:
+                import pandas  # noqa: F401
+            except ImportError:
+                print("⚠ pandas not available, skipping CSV import")
+                return True
+            
+            csv_path = os.path.join(tmp_dir, 'deck.csv')
+            with open(csv_path, 'w', encoding='utf-8') as f:
+                f.write('Title,Suit,Rules\n')
+                for i in range(25):
+                    f.write(f'Card {i},Heart,Rule {i}\n')
+            
+            cards = list(iter_cards(csv_path, overrides={'Title': 'Card_Name'}, chunk_size=10))
+            if len(cards) != 25 or cards[-1]['Card_Name'] != 'Card 24' or cards[3]['Rules'] != 'Rule 3':
+                print("✗ CSV chunks were not read in order")
+                return False
+            print("✓ CSV read in chunks with a custom column mapping")
+        
+        return True
+        
+    except Exception as e:
+        print(f"✗ Error testing deck import: {str(e)}")
+        return False
+
+def test_text_layout():
+    """Test measured-width wrapping, shrink-to-fit and layout memoization"""
+    print(f"\n{'='*50}")
+    print("Testing Text Layout...")
+    print("="*50)
+    
+    try:
+        from reportlab.pdfbase.pdfmetrics import stringWidth
+        from text_layout import fit_text, clear_layout_cache
+        
+        generator = CardGeneratorAndroid()
+        text = 'Deal 3 damage to any target and draw a card unless your opponent discards'
+        lines, size = generator.layout_text(text, max_lines=10)
+        if any(stringWidth(line, 'Helvetica', size) > generator.text_width for line in lines):
+            print("✗ A wrapped line overflows the card")
+            return False
+        if ' '.join(lines) != text:
+            print("✗ Wrapping lost or reordered words")
+            return False
+        print(f"✓ Wrapped into {len(lines)} lines within {generator.text_width/mm:.0f}mm")
+        
+        lines, size = CardGeneratorAndroid(shrink_text=True).layout_text(text + ' ' + text)
+        if len(lines) > 2 or size >= generator.text_size:
+            print(f"✗ Shrink-to-fit gave {len(lines)} lines at {size}pt")
+            return False
+        print(f"✓ Long text shrunk to {size}pt to fit two lines")
+        
+        clear_layout_cache()
+        cards_data = [dict(card) for card in create_sample_card_data() * 25]
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            generator.generate_pdf(cards_data, os.path.join(tmp_dir, 'layout.pdf'))
+        unique_texts = {card[field] for card in cards_data for field in ('Task', 'Rules')}
+        misses = fit_text.cache_info().misses
+        if misses != len(unique_texts):
+            print(f"✗ {misses} layouts for {len(unique_texts)} unique strings")
+            return False
+        print(f"✓ {len(cards_data)} cards needed {misses} layouts")
+        return True
+        
+    except Exception as e:
+        print(f"✗ Error testing text layout: {str(e)}")
+        return False
+
+def test_progress_and_cancel():
+    """Test progress reporting and clean cancellation"""
+    print(f"\n{'='*50}")
+    print("Testing Progress and Cancellation...")
+    print("="*50)
+    
+    try:
+        import threading
+        cards_data = [dict(card) for card in create_sample_card_data() * 5]
+        generator = CardGeneratorAndroid()
+        
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            output_file = os.path.join(tmp_dir, 'progress.pdf')
+            reports = []
+            generator.generate_pdf(cards_data, output_file,
+                                   progress=lambda done, total: reports.append((done, total)))
+            if reports[-1] != (len(cards_data), len(cards_data)) or len(reports) != len(cards_data):
+                print(f"✗ Unexpected progress reports: {reports[-3:]}")
+                return False
+            print(f"✓ Progress reported for all {len(cards_data)} cards")
+            
+            os.remove(output_file)
+            cancel_event = threading.Event()
+            
+            def cancel_after_five(done, total):
+                if done == 5:
+                    cancel_event.set()
+            
+            result = generator.generate_pdf(cards_data, output_file, progress=cancel_after_five,
+                                            cancel_event=cancel_event)
+            if result or os.path.exists(output_file):
+                print("✗ Cancelled run still produced a PDF")
+                return False
+            print("✓ Cancelled run stopped and left no partial file")
+        
+        return True
+        
+    except Exception as e:
+        print(f"✗ Error testing progress and cancellation: {str(e)}")
+        return False
+
+def test_render_cache():
+    """Test that unchanged cards are replayed from the render cache"""
+    print(f"\n{'='*50}")
+    print("Testing Render Cache...")
+    print("="*50)
+    
+    try:
+        cards_data = [dict(card, Card_Name=f"{card['Card_Name']} {i}")
+                      for i, card in enumerate(create_sample_card_data() * 5)]
+        
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            cache_dir = os.path.join(tmp_dir, 'render_cache')
+            output_file = os.path.join(tmp_dir, 'cached.pdf')
+            
+            generator = CardGeneratorAndroid(render_cache_dir=cache_dir)
+            generator.generate_pdf(cards_data, output_file)
+            first_size = os.path.getsize(output_file)
+            if generator.render_cache.misses != len(cards_data):
+                print(f"✗ Cold run: {generator.render_cache.stats()}")
+                return False
+            
+            # A new generator (next app run) edits one card and regenerates
+            cards_data[3]['Task'] = 'Edited task text'
+            generator = CardGeneratorAndroid(render_cache_dir=cache_dir)
+            if not generator.generate_pdf(cards_data, output_file):
+                print("✗ PDF generation from the cache failed")
+                return False
+            stats = generator.render_cache.stats()
+            if stats['hits'] != len(cards_data) - 1 or stats['misses'] != 1:
+                print(f"✗ Warm run: {stats}")
+                return False
+            if abs(os.path.getsize(output_file) - first_size) > 100:
+                print("✗ Replayed PDF differs in size from the rendered one")
+                return False
+            print(f"✓ {stats['hits']} cards replayed, only the edited card re-rendered")
+
+            # Two generators sharing a directory (render service workers) see
+            # each other's entries even though both indexed it while empty
+            shared_dir = os.path.join(tmp_dir, 'shared_cache')
+            writer = CardGeneratorAndroid(render_cache_dir=shared_dir)
+            reader = CardGeneratorAndroid(render_cache_dir=shared_dir)
+            writer.generate_pdf(cards_data, output_file)
+            reader.generate_pdf(cards_data, output_file)
+            stats = reader.render_cache.stats()
+            if stats['hits'] != len(cards_data) or stats['misses'] != 0:
+                print(f"✗ Entries written by another generator were not served: {stats}")
+                return False
+            if stats['bytes'] != writer.render_cache.current_bytes:
+                print("✗ Adopted entries not counted against the byte budget")
+                return False
+
+        print(f"✓ {stats['hits']} cards served from entries another generator wrote")
+        return True
+        
+    except Exception as e:
+        print(f"✗ Error testing render cache: {str(e)}")
+        return False
+
+def test_escpos_raster():
+    """Test ESC/POS raster output to a file and to a local socket"""
+    print(f"\n{'='*50}")
+    print("Testing ESC/POS Raster Output...")
+    print("="*50)
+    
+    try:
+        import socket
+        import threading
+        import escpos_raster
+        import numpy as np
+        from PIL import Image as PILImage
+        
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            image_path = os.path.join(tmp_dir, 'art.png')
+            PILImage.new('RGB', (120, 90), color='gray').save(image_path)
+            cards_data = create_sample_card_data()
+            cards_data[0] = dict(cards_data[0], Custom_Image=image_path)
+            
+            generator = CardGeneratorAndroid()
+            output_file = os.path.join(tmp_dir, 'cards.bin')
+            if not generator.generate_escpos(cards_data, output_file):
+                print("✗ ESC/POS generation failed")
+                return False
+            with open(output_file, 'rb') as f:
+                data = f.read()
+            
+            # Walk the GS v 0 blocks and check every header
+            renderer = escpos_raster.EscPosRasterRenderer(generator)
+            band_rows = renderer.card_height + renderer.margin
+            pos, rows, blocks = len(escpos_raster.ESC_INIT), 0, 0
+            while data.startswith(b'\x1dv0\x00', pos):
+                width_bytes = data[pos + 4] | data[pos + 5] << 8
+                block_rows = data[pos + 6] | data[pos + 7] << 8
+                if width_bytes != 30 or block_rows > escpos_raster.MAX_BLOCK_ROWS:
+                    print(f"✗ Bad raster block header: {width_bytes} bytes x {block_rows} rows")
+                    return False
+                pos += 8 + width_bytes * block_rows
+                rows += block_rows
+                blocks += 1
+            if data[pos:] != escpos_raster.GS_CUT or rows != band_rows * len(cards_data):
+                print(f"✗ Unexpected stream layout: {rows} rows, trailer {data[pos:]!r}")
+                return False
+            print(f"✓ {len(cards_data)} cards in {blocks} raster blocks ({len(data)} bytes)")
+            
+            # The gray image must come out dithered, not as a solid block
+            card = renderer.render_card(cards_data[0])
+            bits = escpos_raster.dither(np.asarray(card, dtype=np.float32))
+            if not 0.05 < bits.mean() < 0.5:
+                print(f"✗ Unexpected ink coverage {bits.mean():.2f}")
+                return False
+            
+            # No TrueType font at all, on a Pillow whose load_default() takes no size
+            from PIL import ImageFont
+            load_default = ImageFont.load_default
+            candidates, reportlab_font_path = escpos_raster.FONT_CANDIDATES, escpos_raster.reportlab_font_path
+            try:
+                ImageFont.load_default = lambda: load_default()
+                escpos_raster.FONT_CANDIDATES = {False: (), True: ()}
+                escpos_raster.reportlab_font_path = lambda bold: os.path.join(tmp_dir, 'missing.ttf')
+                escpos_raster.EscPosRasterRenderer(generator).render_card(cards_data[1])
+            finally:
+                ImageFont.load_default = load_default
+                escpos_raster.FONT_CANDIDATES = candidates
+                escpos_raster.reportlab_font_path = reportlab_font_path
+            print("✓ Falls back to PIL's fixed-size default font on older Pillow")
+            
+            # A local listener stands in for a network printer on port 9100
+            server = socket.socket()
+            server.bind(('127.0.0.1', 0))
+            server.listen(1)
+            received = []
+            
+            def accept():
+                conn, _ = server.accept()
+                with conn:
+                    received.append(b''.join(iter(lambda: conn.recv(65536), b'')))
+            
+            listener = threading.Thread(target=accept)
+            listener.start()
+            sent = generator.generate_escpos(cards_data, host='127.0.0.1',
+                                             port=server.getsockname()[1])
+            listener.join(timeout=10)
+            server.close()
+            if not sent or received != [data]:
+                print("✗ Socket output differs from file output")
+                return False
+            print("✓ Socket output matches file output")
+        
+        return True
+        
+    except Exception as e:
+        print(f"✗ Error testing ESC/POS output: {str(e)}")
+        return False
+
+def test_thumbnails():
+    """Test that image previews are decoded in the background and cached"""
+    print(f"\n{'='*50}")
+    print("Testing Thumbnail Service...")
+    print("="*50)
+    
+    try:
+        import shutil
+        from PIL import Image as PILImage
+        from thumbnails import ThumbnailService
+        
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            photo_path = os.path.join(tmp_dir, 'photo.jpg')
+            PILImage.new('RGB', (4000, 3000), color='teal').save(photo_path, quality=90)
+            copy_path = os.path.join(tmp_dir, 'copy.jpg')
+            shutil.copy(photo_path, copy_path)
+            cache_dir = os.path.join(tmp_dir, 'thumbnails')
+            
+            service = ThumbnailService(cache_dir)
+            results = []
+            future = service.request(photo_path, lambda path, thumb: results.append((path, thumb)))
+            future.result(timeout=30)
+            path, thumb = results[0]
+            if path != photo_path or thumb is None or max(thumb.size) > 160:
+                print(f"✗ Unexpected thumbnail: {results}")
+                return False
+            print(f"✓ 4000x3000 photo previewed as {thumb.size[0]}x{thumb.size[1]}")
+            
+            # Same bytes under another name come from memory
+            service.get(copy_path)
+            if service.hits != 1 or service.misses != 1:
+                print(f"✗ Content-keyed memory cache missed: {service.hits} hits")
+                return False
+            service.shutdown()
+            
+            # A new session reads the thumbnail back from disk
+            service = ThumbnailService(cache_dir)
+            if len(service.disk_cache) != 1:
+                print(f"✗ Expected one thumbnail on disk, found {len(service.disk_cache)}")
+                return False
+            if service.get(photo_path).size != thumb.size or service.disk_hits != 1:
+                print("✗ Thumbnail was not read back from disk")
+                return False
+            service.shutdown()
+        
+        print("✓ Thumbnails reused from memory and disk")
+        return True
+        
+    except Exception as e:
+        print(f"✗ Error testing thumbnails: {str(e)}")
+        return False
+
+def test_deck_model():
+    """Test the editor's plain-record deck model"""
+    print(f"\n{'='*50}")
+    print("Testing Deck Model...")
+    print("="*50)
+    
+    try:
+        import time
+        from deck_model import DeckModel
+        
+        deck = DeckModel()
+        start = time.perf_counter()
+        for i in range(5000):
+            index = deck.add()
+            deck.update(index, 'Value', str(i))
+        for _ in range(1000):
+            deck.remove(0)  # Renumbering is implicit in the position
+        elapsed = time.perf_counter() - start
+        if len(deck) != 4000 or deck.card_data(0)['Card_Name'] != 'Card 1':
+            print(f"✗ Unexpected deck state: {len(deck)} cards, {deck.card_data(0)}")
+            return False
+        print(f"✓ 5000 adds and 1000 deletes in {elapsed*1000:.1f}ms")
+        
+        # Blank fields fall back to the same defaults as the old widgets
+        deck.update(1, 'Task', '  Draw two  ')
+        card = deck.card_data(1)
+        expected = {'Card_Name': 'Card 2', 'Suit': 'Diamond', 'Value': '1001',
+                    'Task': 'Draw two', 'Rules': 'Play normally', 'Icon_Color': 'black',
+                    'Custom_Image': None, 'Quantity': '1'}
+        if card != expected:
+            print(f"✗ Unexpected card data: {card}")
+            return False
+        print("✓ Records convert to generator card data")
+        return True
+        
+    except Exception as e:
+        print(f"✗ Error testing deck model: {str(e)}")
+        return False
+
+def test_card_records():
+    """Test validated card records and the columnar deck container"""
+    print(f"\n{'='*50}")
+    print("Testing Card Records...")
+    print("="*50)
+    
+    try:
+        from card_record import CardRecord, CardColumns, Suit, IconColor
+        
+        record = CardRecord.from_dict(dict(create_sample_card_data()[0], Suit=' heart ',
+                                           Icon_Color='Blue'))
+        if record.suit is not Suit.HEART or record.color is not IconColor.BLUE:
+            print(f"✗ Suit/color not normalized: {record}")
+            return False
+        try:
+            CardRecord.from_dict(dict(record.to_dict(), Suit='Moon'))
+            print("✗ Unknown suit was accepted")
+            return False
+        except ValueError:
+            print("✓ Suits and colors normalized and validated on construction")
+
+        # Missing fields and wrongly typed values break the same contract
+        for bad in ({'Card_Name': 'Broken'}, dict(record.to_dict(), Quantity=[2]),
+                    dict(record.to_dict(), Quantity='two')):
+            try:
+                CardRecord.from_dict(bad)
+                print(f"✗ Bad card accepted: {bad}")
+                return False
+            except ValueError as e:
+                if 'Card ' not in str(e):
+                    print(f"✗ Error does not name the card: {e}")
+                    return False
+        print("✓ Missing fields and bad quantities raise ValueError naming the card")
+
+        sample = create_sample_card_data()
+        columns = CardColumns(dict(sample[i % len(sample)], Card_Name=f"Card {i}")
+                              for i in range(10000))
+        if len(columns) != 10000 or list(columns)[5] != columns[5] \
+                or columns[5].face() != dict(sample[1], Card_Name='Card 5'):
+            print("✗ Columnar deck does not round-trip")
+            return False
+        # 10,000 names plus the few unique Task/Rules strings
+        if len(columns.strings) > 10000 + 4 * len(sample) + 1:
+            print(f"✗ Strings not shared: {len(columns.strings)} in table")
+            return False
+        print(f"✓ 10000 cards in {columns.nbytes() // 1024} KiB of columns, "
+              f"{len(columns.strings)} unique strings")
+        
+        generator = CardGeneratorAndroid()
+        output_file = f"test_cards_{datetime.now().strftime('%Y%m%d_%H%M%S')}_records.pdf"
+        success = generator.generate_pdf(CardColumns(sample), output_file)
+        if os.path.exists(output_file):
+            os.remove(output_file)
+        if not success:
+            print("✗ PDF generation from a columnar deck failed")
+            return False
+        if generator.generate_pdf([dict(sample[0], Icon_Color='gold')], output_file):
+            print("✗ Invalid card color was rendered")
+            return False
+        print("✓ Generator renders columnar decks and rejects invalid cards up front")
+        return True
+        
+    except Exception as e:
+        print(f"✗ Error testing card records: {str(e)}")
+        return False
+
+def test_deck_project():
+    """Test journaled autosave, compaction and the asset store"""
+    print(f"\n{'='*50}")
+    print("Testing Deck Project Files...")
+    print("="*50)
+    
+    try:
+        import time
+        from PIL import Image as PILImage
+        from deck_model import DeckModel
+        from deck_project import DeckProject, JOURNAL_NAME
+        
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            project_path = os.path.join(tmp_dir, 'session.deck')
+            image_path = os.path.join(tmp_dir, 'art.png')
+            PILImage.new('RGB', (50, 50), color='red').save(image_path)
+            
+            deck = DeckModel(project=DeckProject(project_path, compact_every=1000))
+            for card in create_sample_card_data():
+                deck.add(dict(card))
+            deck.update(1, 'Task', 'Edited')
+            deck.remove(0)
+            stored = deck.set_image(0, image_path)
+            if deck.set_image(1, image_path) != stored:
+                print("✗ Same image stored twice")
+                return False
+            journal_path = os.path.join(project_path, JOURNAL_NAME)
+            journal_size = os.path.getsize(journal_path)
+            deck.update(2, 'Value', '9')
+            if os.path.getsize(journal_path) - journal_size > 100:
+                print("✗ A one-field edit rewrote more than one journal entry")
+                return False
+            deck.project.close()
+            
+            # Simulate a crash in the middle of writing the next entry
+            with open(journal_path, 'a', encoding='utf-8') as f:
+                f.write('{"op": "set", "ind')
+            project = DeckProject(project_path)
+            restored = project.load()
+            if restored != deck.records:
+                print("✗ Journal replay does not reproduce the deck")
+                return False
+            print(f"✓ {project.pending_ops} journaled edits replayed, torn entry dropped")
+            
+            deck = DeckModel(restored, project)
+            deck.update(0, 'Rules', 'After restore')
+            deck.save()
+            if os.path.getsize(journal_path) != 0 or DeckProject(project_path).load() != deck.records:
+                print("✗ Compaction lost edits")
+                return False
+            print("✓ Compaction folds the journal into the snapshot")
+
+            # Crash after the new snapshot is in place but before the journal
+            # is cleared: the old entries must not be applied a second time
+            deck.add(dict(create_sample_card_data()[0]))
+            deck.update(0, 'Rules', 'Before crash')
+            deck.project.close()
+            with open(journal_path, 'rb') as f:
+                stale_journal = f.read()
+            deck.save()
+            with open(journal_path, 'wb') as f:
+                f.write(stale_journal)
+            project = DeckProject(project_path)
+            if project.load() != deck.records or project.pending_ops != 0:
+                print("✗ Journal replayed twice after a crash during compaction")
+                return False
+            deck = DeckModel(project.load(), project)
+            deck.update(0, 'Rules', 'After crash')
+            deck.project.close()
+            if DeckProject(project_path).load() != deck.records:
+                print("✗ Edits after a crash during compaction were lost")
+                return False
+            print("✓ Entries already in the snapshot are skipped on replay")
+
+            # Corrupt entries surface as ValueError, which the app catches
+            corrupt_path = os.path.join(tmp_dir, 'corrupt.deck')
+            os.makedirs(corrupt_path)
+            for line in ('{"op": "remove", "index": 5}\n', '{"op": "set"}\n', '[1, 2]\n'):
+                with open(os.path.join(corrupt_path, JOURNAL_NAME), 'w', encoding='utf-8') as f:
+                    f.write(line)
+                try:
+                    DeckProject(corrupt_path).load()
+                    print(f"✗ Corrupt journal entry accepted: {line.strip()}")
+                    return False
+                except ValueError:
+                    pass
+            print("✓ Corrupt journal entries raise ValueError")
+
+            # A moved project still finds its assets
+            moved_path = os.path.join(tmp_dir, 'moved.deck')
+            os.rename(project_path, moved_path)
+            if not os.path.exists(DeckProject(moved_path).load()[0]['Custom_Image']):
+                print("✗ Assets not found after moving the project")
+                return False
+            print("✓ Images kept once in the asset store, relative to the project")
+            
+            big_path = os.path.join(tmp_dir, 'big.deck')
+            sample = create_sample_card_data()
+            big = DeckProject(big_path)
+            big.compact([dict(sample[i % len(sample)], Card_Name=f"Card {i}") for i in range(10000)])
+            start = time.perf_counter()
+            cards = DeckProject(big_path).load()
+            elapsed = time.perf_counter() - start
+            if len(cards) != 10000:
+                print(f"✗ Loaded {len(cards)} cards")
+                return False
+            print(f"✓ 10000-card deck loaded in {elapsed*1000:.1f}ms")
+        
+        return True
+        
+    except Exception as e:
+        print(f"✗ Error testing deck project: {str(e)}")
+        return False
+
+def test_card_quantity():
+    """Test that duplicate cards are rendered once and placed per copy"""
+    print(f"\n{'='*50}")
+    print("Testing Card Quantity...")
+    print("="*50)
+    
+    try:
+        import io
+        import escpos_raster
+        from reportlab.pdfgen import canvas as pdf_canvas
+        from card_generator_android import page_operators
+        
+        sample = create_sample_card_data()
+        generator = CardGeneratorAndroid()
+        
+        # Page content per copy: a whole card drawn inline vs one form placement
+        def stream_size(card):
+            c = pdf_canvas.Canvas(io.BytesIO())
+            generator.prepare_canvas(c)
+            generator.draw_card(c, 0, 0, card)  # First use builds any forms
+            first_op = len(page_operators(c))
+            generator.draw_card(c, 0, 0, card)
+            return len('\n'.join(page_operators(c)[first_op:]))
+        
+        inline = stream_size(sample[0])
+        placed = stream_size(dict(sample[0], Quantity=4))
+        if placed * 5 > inline:
+            print(f"✗ A copy costs {placed} bytes vs {inline} for a full card")
+            return False
+        print(f"✓ Each extra copy costs {placed} bytes of page content instead of {inline}")
+        
+        cards_data = [dict(card, Quantity=3) for card in sample]
+        output_file = f"test_cards_{datetime.now().strftime('%Y%m%d_%H%M%S')}_quantity.pdf"
+        success = generator.generate_pdf(cards_data, output_file)
+        if os.path.exists(output_file):
+            os.remove(output_file)
+        card_forms = [name for name in generator.form_recipes if name.startswith('face_')]
+        if not success or len(card_forms) != len(sample):
+            print(f"✗ Expected {len(sample)} card forms, got {len(card_forms)}")
+            return False
+        print(f"✓ {3 * len(sample)} copies drawn from {len(card_forms)} card forms")
+        
+        output = io.BytesIO()
+        count = escpos_raster.EscPosRasterRenderer(generator).write(cards_data, output)
+        if count != 3 * len(sample):
+            print(f"✗ Raster output printed {count} cards")
+            return False
+        print("✓ Raster output repeats each card's bands per copy")
+        return True
+        
+    except Exception as e:
+        print(f"✗ Error testing card quantity: {str(e)}")
+        return False
+
+def test_sheet_imposition():
+    """Test multi-up imposition on office sheets"""
+    print(f"\n{'='*50}")
+    print("Testing Sheet Imposition...")
+    print("="*50)
+    
+    try:
+        import re
+        import deck_import
+        from imposition import SheetLayout, sheet_size
+        
+        generator = CardGeneratorAndroid()
+        layout = SheetLayout(sheet_size('a4'), generator.card_width, generator.card_height,
+                             gutter=2*mm, bleed=1*mm)
+        if (layout.columns, layout.rows) != (6, 6):
+            print(f"✗ Expected a 6x6 grid on A4, got {layout.columns}x{layout.rows}")
+            return False
+        for x, y in layout.slots:
+            if x < 0 or y < 0 or x + generator.card_width > layout.page_width \
+                    or y + generator.card_height > layout.page_height:
+                print("✗ Card slot falls off the sheet")
+                return False
+        # Front and back of a slot share the same position after a long-edge flip
+        (x, y), (back_x, back_y) = layout.slots[0], layout.back_slots[0]
+        if abs(back_x + generator.card_width + x - layout.page_width) > 0.01 or back_y != y:
+            print("✗ Back page is not mirrored for duplex")
+            return False
+        positions = layout.place(100)
+        if positions[36][0] != 1 or positions[36][1:] != layout.slots[0]:
+            print("✗ Bulk placement does not roll over to the next sheet")
+            return False
+        print(f"✓ {layout.per_page} cards per A4 sheet, backs mirrored for duplex")
+        
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            deck_path = os.path.join(tmp_dir, 'deck.json')
+            with open(deck_path, 'w', encoding='utf-8') as f:
+                json.dump([dict(card, Quantity=20) for card in create_sample_card_data()], f)
+            output_file = os.path.join(tmp_dir, 'sheets.pdf')
+            if deck_import.main([deck_path, '-o', output_file, '--sheet', 'letter', '--backs']) != 0:
+                print("✗ Sheet imposition from the command line failed")
+                return False
+            with open(output_file, 'rb') as f:
+                pages = len(re.findall(rb'/Type /Page\b(?!s)', f.read()))
+            letter_layout = SheetLayout(sheet_size('letter'), generator.card_width,
+                                        generator.card_height)
+            sheets = -(-80 // letter_layout.per_page)
+            if pages != 2 * sheets:
+                print(f"✗ Expected {sheets} fronts and backs, got {pages} pages")
+                return False
+        print(f"✓ 80 cards imposed on {sheets} Letter sheets with back pages")
+        return True
+        
+    except Exception as e:
+        print(f"✗ Error testing sheet imposition: {str(e)}")
+        return False
+
+def test_instrumentation():
+    """Test phase timers, counters, the sampling hook and quiet output"""
+    print(f"\n{'='*50}")
+    print("Testing Instrumentation...")
+    print("="*50)
+    
+    try:
+        import contextlib
+        import io
+        from PIL import Image as PILImage
+        from instrumentation import Stats, NULL_STATS, PHASES
+        
+        if CardGeneratorAndroid().stats is not NULL_STATS:
+            print("✗ Instrumentation should be off by default")
+            return False
+        
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            image_path = os.path.join(tmp_dir, 'art.png')
+            PILImage.new('RGB', (120, 120), (200, 40, 40)).save(image_path)
+            cards_data = create_sample_card_data() * 2
+            cards_data[0] = dict(cards_data[0], Custom_Image=image_path)
+            cards_data[1] = dict(cards_data[1], Custom_Image=image_path)
+            
+            snapshots = []
+            stats = Stats(snapshots.append, sample_every=len(cards_data) // 2)
+            generator = CardGeneratorAndroid(stats=stats)
+            output_file = os.path.join(tmp_dir, 'stats.pdf')
+            printed = io.StringIO()
+            with contextlib.redirect_stdout(printed):
+                success = generator.generate_pdf(cards_data, output_file)
+        
+        if not success or ' - Done' in printed.getvalue():
+            print("✗ Quiet run still printed per-card lines")
+            return False
+        print(f"✓ Quiet run printed {len(printed.getvalue().splitlines())} summary lines")
+        
+        counters = stats.snapshot()['counters']
+        timers = stats.snapshot()['timers']
+        missing = [phase for phase in PHASES if phase not in timers]
+        if missing:
+            print(f"✗ Phases without timings: {missing}")
+            return False
+        if (counters.get('cards'), counters.get('images'), counters.get('image_cache_hits')) \
+                != (len(cards_data), 2, 1):
+            print(f"✗ Unexpected counters {counters}")
+            return False
+        print(f"✓ Timed {', '.join(PHASES)}; counted {counters}")
+        
+        # Two samples while drawing plus the final one after save
+        if len(snapshots) != 3 or snapshots[-1]['counters']['cards'] != len(cards_data):
+            print(f"✗ Hook received {len(snapshots)} snapshots")
+            return False
+        json.loads(stats.to_json())
+        print("✓ Sampling hook received JSON-ready snapshots")
+        return True
+        
+    except Exception as e:
+        print(f"✗ Error testing instrumentation: {str(e)}")
+        return False
+
+def test_image_decode():
+    """Test DPI-aware, aspect-preserving image decoding"""
+    print(f"\n{'='*50}")
+    print("Testing Image Decode...")
+    print("="*50)
+    
+    try:
+        import time
+        from PIL import Image as PILImage
+        
+        generator = CardGeneratorAndroid()
+        image_size = generator.template.layout.image_size
+        pixels = generator.image_pixels((image_size, image_size))
+        if pixels != (94, 94):
+            print(f"✗ 8mm at 300 dpi should be 94 pixels, got {pixels}")
+            return False
+        print(f"✓ Card images are decoded to {pixels[0]}x{pixels[1]} pixels (8mm at 300 dpi)")
+        
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            # Wide photo: green and blue bands either side of a red center
+            image_path = os.path.join(tmp_dir, 'photo.jpg')
+            photo = PILImage.new('RGB', (4000, 3000), 'red')
+            photo.paste((0, 160, 0), (0, 0, 500, 3000))
+            photo.paste((0, 0, 255), (3500, 0, 4000, 3000))
+            photo.save(image_path, quality=90)
+            
+            start = time.perf_counter()
+            cached_image = generator.load_custom_image(image_path)
+            elapsed = time.perf_counter() - start
+            image = cached_image.image
+            if image.size != pixels:
+                print(f"✗ Decoded image is {image.size}")
+                return False
+            left, right = image.getpixel((2, 47)), image.getpixel((91, 47))
+            if left[0] < 200 or right[0] < 200 or left[1] > 60 or right[2] > 60:
+                print(f"✗ Crop is not centered: edges are {left} and {right}")
+                return False
+            print(f"✓ 4000x3000 JPEG center-cropped to a square in {elapsed * 1000:.1f}ms")
+        return True
+        
+    except Exception as e:
+        print(f"✗ Error testing image decode: {str(e)}")
+        return False
+
+def test_output_profiles():
+    """Test archive/print/transfer output profiles"""
+    print(f"\n{'='*50}")
+    print("Testing Output Profiles...")
+    print("="*50)
+    
+    try:
+        import benchmark
+        
+        try:
+            CardGeneratorAndroid(profile='fax')
+            print("✗ Unknown profile was accepted")
+            return False
+        except ValueError:
+            pass
+        
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            image_paths = benchmark.make_images(tmp_dir, count=2)
+            cards_data = list(benchmark.make_deck(20, 'images', image_paths))
+            outputs = {}
+            for name in ('archive', 'print', 'transfer'):
+                output_file = os.path.join(tmp_dir, f'{name}.pdf')
+                if not CardGeneratorAndroid(profile=name).generate_pdf(cards_data, output_file):
+                    print(f"✗ PDF generation failed for the {name} profile")
+                    return False
+                with open(output_file, 'rb') as f:
+                    outputs[name] = f.read()
+        
+        if b'ASCII85Decode' in outputs['print']:
+            print("✗ Streams are still ASCII85 encoded")
+            return False
+        import types
+        from reportlab import rl_config
+        if type(rl_config) is not types.ModuleType:
+            print("✗ reportlab's rl_config module was patched")
+            return False
+        if b'/FontFile2' not in outputs['archive'] or b'/Helvetica' in outputs['archive']:
+            print("✗ Archive profile does not embed its fonts")
+            return False
+        if b'/DCTDecode' not in outputs['transfer'] or \
+                len(outputs['transfer']) * 2 > len(outputs['print']):
+            print("✗ Transfer profile does not recompress art")
+            return False
+        sizes = ', '.join(f"{name} {len(data) / len(cards_data):.0f}" for name, data in outputs.items())
+        print(f"✓ Bytes/card: {sizes}")
+        return True
+        
+    except Exception as e:
+        print(f"✗ Error testing output profiles: {str(e)}")
+        return False
+
+def test_render_service():
+    """Test the local HTTP render service against a localhost client"""
+    print(f"\n{'='*50}")
+    print("Testing Render Service...")
+    print("="*50)
+    
+    try:
+        import threading
+        import time
+        import urllib.error
+        import urllib.request
+        import render_service
+        
+        service = render_service.RenderService(workers=1, max_queue=1)
+        server = render_service.make_server(service, port=0)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        base_url = f'http://127.0.0.1:{server.server_address[1]}'
+        
+        def request(path, payload=None):
+            data = json.dumps(payload).encode('utf-8') if payload is not None else None
+            try:
+                with urllib.request.urlopen(urllib.request.Request(base_url + path, data)) as response:
+                    return response.status, response.read()
+            except urllib.error.HTTPError as e:
+                return e.code, e.read()
+        
+        try:
+            status, body = request('/render', create_sample_card_data())
+            if status != 200 or not body.startswith(b'%PDF'):
+                print(f"✗ /render returned {status}")
+                return False
+            print(f"✓ /render returned a {len(body)} byte PDF")
+            
+            bad_card = dict(create_sample_card_data()[0], Suit='Moon')
+            status, body = request('/render', {'cards': [bad_card]})
+            if status != 400 or b'Moon' not in body:
+                print(f"✗ Invalid deck returned {status}")
+                return False
+            # Missing fields and wrongly typed values are bad cards too
+            for cards, field in (([{'Card_Name': 'x'}], b'Suit'),
+                                 ([dict(create_sample_card_data()[0], Quantity=[2])], b'Quantity')):
+                status, body = request('/render', cards)
+                if status != 400 or b'cards[0]' not in body or field not in body:
+                    print(f"✗ Malformed card returned {status}: {body[:80]}")
+                    return False
+            print("✓ Invalid cards are rejected with 400 before queueing")
+            
+            # With max_queue=1 a second job is refused while the first is pending
+            status, body = request('/jobs', {'cards': create_sample_card_data() * 100,
+                                             'profile': 'transfer'})
+            job_id = json.loads(body)['job_id']
+            refused, _ = request('/jobs', create_sample_card_data())
+            if status != 202 or refused != 503:
+                print(f"✗ Expected 202 then 503, got {status} and {refused}")
+                return False
+            print("✓ Full queue answers 503")
+            
+            for _ in range(100):
+                status, body = request(f'/jobs/{job_id}')
+                if status != 202:
+                    break
+                time.sleep(0.1)
+            if status != 200 or not body.startswith(b'%PDF'):
+                print(f"✗ Polling the job returned {status}")
+                return False
+            
+            status, body = request('/stats')
+            stats = json.loads(body)
+            if stats['completed'] != 2 or stats['rejected'] != 1 or stats['latency_ms']['p50'] is None:
+                print(f"✗ Unexpected stats {stats}")
+                return False
+            print(f"✓ Polled job finished; p50 latency {stats['latency_ms']['p50']}ms")
+            
+            # A dead worker breaks the pool: the service answers and replaces it
+            import signal
+            for process in list(service.pool._processes.values()):
+                os.kill(process.pid, signal.SIGKILL)
+            time.sleep(0.5)
+            statuses = []
+            for _ in range(3):
+                status, body = request('/render', create_sample_card_data())
+                statuses.append(status)
+                if status == 200:
+                    break
+            stats = json.loads(request('/stats')[1])
+            if statuses[0] not in (500, 503) or statuses[-1] != 200 or \
+                    stats['queue_depth'] != 0 or stats['failed'] != 1:
+                print(f"✗ Service did not recover from a dead worker: {statuses}, {stats}")
+                return False
+            print(f"✓ Dead worker answered with {statuses[0]}, pool replaced")
+        finally:
+            server.shutdown()
+            server.server_close()
+            service.shutdown()
+        
+        # A warm generator serving many different decks keeps bounded state
+        import card_generator_android
+        from PIL import Image as PILImage
+        saved_limit = card_generator_android.MAX_FILE_DIGESTS
+        card_generator_android.MAX_FILE_DIGESTS = 8
+        render_service._generator_options = {'deterministic': True}
+        try:
+            with tempfile.TemporaryDirectory() as tmp_dir:
+                render_service._generator_options['render_cache_dir'] = tmp_dir
+                for order in range(40):
+                    image_path = os.path.join(tmp_dir, f'art{order}.png')
+                    PILImage.new('RGB', (20, 20), (order * 6, 0, 0)).save(image_path)
+                    cards = [dict(card, Card_Name=f"Order {order}", Quantity=2,
+                                  Custom_Image=image_path) for card in create_sample_card_data()]
+                    render_service.render_job(cards, 'print')
+                generator = render_service._generators.pop('print')
+        finally:
+            card_generator_android.MAX_FILE_DIGESTS = saved_limit
+            render_service._generator_options = {}
+        sizes = (len(generator.form_recipes), len(generator.image_blobs), len(generator._file_digests))
+        # Only the last order's forms (its 4 card faces and what they use) remain
+        if sizes[0] > 10 or sizes[2] > 8:
+            print(f"✗ Per-document state grows across jobs: {sizes}")
+            return False
+        print(f"✓ 40 distinct orders leave {sizes[0]} form recipes, {sizes[2]} file hashes")
+        return True
+        
+    except Exception as e:
+        print(f"✗ Error testing render service: {str(e)}")
+        return False
+
+def test_deterministic_output():
+    """Test byte-identical output and the whole-document cache"""
+    print(f"\n{'='*50}")
+    print("Testing Deterministic Output...")
+    print("="*50)
+    
+    try:
+        import io
+        import time
+        from PIL import Image as PILImage
+        from instrumentation import Stats
+        
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            image_path = os.path.join(tmp_dir, 'art.png')
+            PILImage.new('RGB', (200, 150), 'purple').save(image_path)
+            cards_data = create_sample_card_data() + [
+                dict(create_sample_card_data()[0], Custom_Image=image_path, Quantity=2)]
+            
+            def render(workers=1, **options):
+                output = io.BytesIO()
+                CardGeneratorAndroid(deterministic=True, **options).generate_pdf(
+                    cards_data, output, workers=workers)
+                return output.getvalue()
+            
+            first = render()
+            os.utime(image_path, (time.time() + 10, time.time() + 10))  # Same picture, new mtime
+            if render() != first or render(workers=2) != first:
+                print("✗ Repeated runs produced different bytes")
+                return False
+            print(f"✓ Repeated and parallel runs give identical {len(first)} byte PDFs")
+            
+            cache_dir = os.path.join(tmp_dir, 'cache')
+            render(render_cache_dir=cache_dir)
+            stats = Stats()
+            start = time.perf_counter()
+            cached = render(render_cache_dir=cache_dir, stats=stats)
+            elapsed = time.perf_counter() - start
+            if cached != first or stats.counters.get('document_cache_hits') != 1:
+                print("✗ Repeated deck was not served from the document cache")
+                return False
+            print(f"✓ Repeated deck served from the document cache in {elapsed * 1000:.1f}ms")
+            
+            PILImage.new('RGB', (200, 150), 'orange').save(image_path)
+            stats = Stats()
+            changed = render(render_cache_dir=cache_dir, stats=stats)
+            if changed == first or stats.counters.get('document_cache_hits'):
+                print("✗ Edited image still served the cached document")
+                return False
+            print("✓ Editing an image's content invalidates the cached document")
+        return True
+        
+    except Exception as e:
+        print(f"✗ Error testing deterministic output: {str(e)}")
+        return False
+
+def test_image_buffers():
+    """Test in-memory image sources and mmapped packed decks"""
+    print(f"\n{'='*50}")
+    print("Testing Image Buffers...")
+    print("="*50)
+    
+    try:
+        import io
+        from PIL import Image as PILImage
+        from image_source import ImageBlob
+        from deck_pack import PackedDeck, write_packed_deck
+        import deck_import
+        
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            image_path = os.path.join(tmp_dir, 'art.png')
+            PILImage.new('RGB', (200, 150), 'teal').save(image_path)
+            with open(image_path, 'rb') as f:
+                image_bytes = f.read()
+            base_card = create_sample_card_data()[0]
+            
+            def render(image, **options):
+                output = io.BytesIO()
+                CardGeneratorAndroid(deterministic=True, **options).generate_pdf(
+                    [dict(base_card, Custom_Image=image)], output)
+                return output.getvalue()
+            
+            from_path = render(image_path)
+            for source in (image_bytes, memoryview(image_bytes), ImageBlob(image_bytes)):
+                if render(source) != from_path:
+                    print(f"✗ {type(source).__name__} image rendered differently from the file")
+                    return False
+            print("✓ bytes, memoryview and ImageBlob images render like the file")
+            
+            cache_dir = os.path.join(tmp_dir, 'cache')
+            render(image_bytes, render_cache_dir=cache_dir)
+            if render(image_bytes, render_cache_dir=cache_dir) != from_path:
+                print("✗ Cached render of an in-memory image differs")
+                return False
+            print("✓ In-memory images work with the render cache")
+            
+            pack_path = os.path.join(tmp_dir, 'deck.cardpack')
+            cards = [dict(base_card, Custom_Image=image_path),
+                     dict(base_card, Card_Name='Copy', Custom_Image=image_bytes),
+                     create_sample_card_data()[1]]
+            write_packed_deck(pack_path, cards)
+            pack = PackedDeck(pack_path)
+            packed = list(pack)
+            image = packed[0]['Custom_Image']
+            if (len(pack.blobs) != 1 or not isinstance(image, ImageBlob)
+                    or not isinstance(image.data.obj, mmap.mmap)
+                    or bytes(image.data) != image_bytes or packed[2]['Custom_Image']):
+                print("✗ Packed deck did not map its images")
+                return False
+            print(f"✓ Packed deck stores the shared image once ({os.path.getsize(pack_path)} bytes)")
+            
+            output_path = os.path.join(tmp_dir, 'deck.pdf')
+            if deck_import.main([pack_path, '-o', output_path]) != 0 or not os.path.exists(output_path):
+                print("✗ Printing a packed deck failed")
+                return False
+            print("✓ Packed deck printed without extracting its images")
+        return True
+        
+    except Exception as e:
+        print(f"✗ Error testing image buffers: {str(e)}")
+        return False
+
+def test_startup_imports():
+    """Test that app startup stays within its import budget"""
+    print(f"\n{'='*50}")
+    print("Testing Startup Imports...")
+    print("="*50)
+    
+    try:
+        from benchmark import STARTUP_BUDGET_MS, measure_startup
+        
+        result = measure_startup(repeat=3)
+        if result['deferred_loaded']:
+            print(f"✗ Loaded at startup: {', '.join(result['deferred_loaded'])}")
+            return False
+        print("✓ PDF stack and PIL are left for first use")
+        if result['import_ms'] > STARTUP_BUDGET_MS:
+            print(f"✗ Startup imports took {result['import_ms']:.1f}ms "
+                  f"(budget {STARTUP_BUDGET_MS:.0f}ms)")
+            return False
+        print(f"✓ Startup imports in {result['import_ms']:.1f}ms (budget {STARTUP_BUDGET_MS:.0f}ms)")
+        return True
+        
+    except Exception as e:
+        print(f"✗ Error testing startup imports: {str(e)}")
+        return False
+
+def test_suit_registry():
+    """Test precomputed suit outlines and SVG icon packs"""
+    print(f"\n{'='*50}")
+    print("Testing Suit Registry...")
+    print("="*50)
+    
+    try:
+        import math
+        import re
+        import escpos_raster
+        import deck_import
+        from card_record import Suit, CardColumns, as_record
+        from suit_registry import SUIT_SHAPES
+        
+        if SUIT_SHAPES.shape(' heart ') is not SUIT_SHAPES.shape(Suit.HEART) or \
+                not all(suit in SUIT_SHAPES for suit in Suit):
+            print("✗ Built-in suits are not looked up from the registry")
+            return False
+        print("✓ Built-in suit outlines precomputed and looked up by name")
+        
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            pack_dir = os.path.join(tmp_dir, 'suits')
+            os.makedirs(pack_dir)
+            # A 360-point circle drawn as a path, moved by a group transform
+            circle = ' '.join(f"{'M' if i == 0 else 'L'}{50 + 40 * math.cos(math.radians(i)):.3f},"
+                              f"{50 + 40 * math.sin(math.radians(i)):.3f}" for i in range(360))
+            with open(os.path.join(pack_dir, 'Comet.svg'), 'w') as f:
+                f.write('<svg xmlns="http://www.w3.org/2000/svg" viewBox="0 0 200 100">'
+                        f'<g transform="translate(100 0)"><path d="{circle} Z"/></g>'
+                        '<path d="M10 90 C 20 40, 60 40, 90 50 Q 60 70 10 90 z"/></svg>')
+            with open(os.path.join(pack_dir, 'Ring.svg'), 'w') as f:
+                f.write('<svg xmlns="http://www.w3.org/2000/svg" viewBox="0 0 24 24">'
+                        '<path fill-rule="evenodd" d="M12 2a10 10 0 1 0 0.01 0zM12 7a5 5 0 1 0 0.01 0z"/>'
+                        '</svg>')
+            with open(os.path.join(pack_dir, 'Broken.svg'), 'w') as f:
+                f.write('<svg')
+            
+            suits = SUIT_SHAPES.load_icon_pack(pack_dir)
+            if [suit.value for suit in suits] != ['Comet', 'Ring']:
+                print(f"✗ Unexpected suits loaded: {suits}")
+                return False
+            comet = SUIT_SHAPES.shape('comet')
+            points = [point for part in comet.parts for polygon in part[1] for point in polygon]
+            if len(points) >= 360 or not all(0 <= x <= 1 and 0 <= y <= 1 for x, y in points):
+                print(f"✗ Outline not simplified into the unit box ({len(points)} points)")
+                return False
+            ring = SUIT_SHAPES.shape('Ring')
+            if len(ring.parts[0][1]) != 2:
+                print("✗ Ring lost its hole")
+                return False
+            SUIT_SHAPES.load_icon_pack(pack_dir)
+            if SUIT_SHAPES.shape('Comet') is not comet:
+                print("✗ Unchanged icon was parsed again")
+                return False
+            print(f"✓ Icon pack parsed once: 360-point circle kept as {len(points)} points, "
+                  "broken file skipped")
+            
+            card = dict(create_sample_card_data()[0], Suit='comet')
+            ring_card = dict(create_sample_card_data()[1], Suit='Ring')
+            record = as_record(card)
+            if record.to_dict()['Suit'] != 'Comet' or list(CardColumns([record]))[0] != record:
+                print("✗ Custom suit not accepted by card records")
+                return False
+            
+            generator = CardGeneratorAndroid(icon_packs=[pack_dir])
+            output_file = os.path.join(tmp_dir, 'suits.pdf')
+            if not generator.generate_pdf([card, ring_card] * 5, output_file, workers=2):
+                print("✗ Rendering custom suits failed")
+                return False
+            with open(output_file, 'rb') as f:
+                data = f.read()
+            if data.count(b'/Subtype /Form') != 3 or b'suit_comet_red' not in data:
+                print("✗ Custom suit glyphs were not drawn once as forms")
+                return False
+            print("✓ Custom suits render as one scaled glyph form each (parallel workers too)")
+            
+            # Packs belong to the generator that loaded them
+            style_dir = os.path.join(tmp_dir, 'styled')
+            os.makedirs(style_dir)
+            with open(os.path.join(style_dir, 'Heart.svg'), 'w') as f:
+                f.write('<svg xmlns="http://www.w3.org/2000/svg" viewBox="0 0 10 10">'
+                        '<rect width="10" height="10"/></svg>')
+            plain = CardGeneratorAndroid()
+            plain_signature = plain.layout_signature
+            styled = CardGeneratorAndroid(icon_packs=[style_dir])
+            if plain.suit_shapes.shape('Heart') != SUIT_SHAPES.shape('Heart') or \
+                    styled.suit_shapes.shape('Heart') == SUIT_SHAPES.shape('Heart') or \
+                    plain.layout_signature != plain_signature or \
+                    styled.layout_signature == plain_signature:
+                print("✗ An icon pack restyled suits for another generator")
+                return False
+            print("✓ Icon packs restyle only the generator that loaded them")
+            
+            # Form names stay ASCII whatever the pack's file names
+            os.rename(os.path.join(style_dir, 'Heart.svg'), os.path.join(style_dir, 'Épée.svg'))
+            sword_card = dict(create_sample_card_data()[0], Suit='Épée')
+            if not CardGeneratorAndroid(icon_packs=[style_dir]).generate_pdf([sword_card], output_file):
+                print("✗ Rendering a non-ASCII suit failed")
+                return False
+            with open(output_file, 'rb') as f:
+                names = re.findall(rb'FormXob\.(suit_[^\s/<>\[\]()]+)', f.read())
+            if not names or not all(re.fullmatch(rb'[a-z0-9_]+', name) for name in names):
+                print(f"✗ Suit form names are not plain ASCII: {set(names)}")
+                return False
+            print(f"✓ Non-ASCII suit drawn as form {names[0].decode()}")
+            
+            band = escpos_raster.EscPosRasterRenderer(generator).render_card(ring_card)
+            if band.getextrema()[0] != 0:
+                print("✗ Custom suit missing from the thermal raster")
+                return False
+            
+            output_file = os.path.join(tmp_dir, 'deck.pdf')
+            deck_file = os.path.join(tmp_dir, 'deck.jsonl')
+            with open(deck_file, 'w') as f:
+                f.write(json.dumps(card) + '\n')
+            if deck_import.main([deck_file, '-o', output_file, '--suits', pack_dir]) != 0:
+                print("✗ deck_import --suits failed")
+                return False
+            print("✓ Custom suits in thermal raster and deck_import --suits")
+        return True
+        
+    except Exception as e:
+        print(f"✗ Error testing suit registry: {str(e)}")
+        return False
+
 def main():
     """Main test function"""
     print("Android Card Game Generator - Test Suite")
     print("="*60)
     
-    success_count = 0
-    total_tests = 2
+    tests = [
+        test_card_generator,     # Basic PDF generation
+        test_image_processing,   # Image processing
+        test_image_cache,        # Image reuse across cards
+        test_suit_glyph_forms,   # Suit glyph reuse across cards
+        test_parallel_generation,  # Sharded multi-process rendering
+        test_streaming_generation,  # Paginated generation from iterators
+        test_benchmark_baseline,  # Benchmark metrics and regression check
+        test_deck_import,        # CSV / XLSX / JSON-lines import
+        test_text_layout,        # Measured, memoized text wrapping
+        test_progress_and_cancel,  # Progress callback and cancel event
+        test_render_cache,       # Incremental regeneration across runs
+        test_escpos_raster,      # Thermal printer raster output
+        test_thumbnails,         # Background image previews
+        test_deck_model,         # Editor records behind the recycled list
+        test_card_records,       # Validated records and columnar decks
+        test_deck_project,       # Autosave journal and deck files
+        test_card_quantity,      # Render-once placement of duplicates
+        test_sheet_imposition,   # Multi-up office sheets with cut marks
+        test_instrumentation,    # Phase timers, counters and quiet output
+        test_image_decode,       # DPI-aware draft-mode decode with center crop
+        test_output_profiles,    # Image encoding and font embedding
+        test_render_service,     # Warm worker pool behind a local HTTP endpoint
+        test_deterministic_output,  # Byte-identical PDFs and the document cache
+        test_image_buffers,      # In-memory images and mmapped packed decks
+        test_startup_imports,    # Lazy imports and the startup budget
+        test_suit_registry,      # Precomputed suit outlines and SVG icon packs
+    ]
     
-    # Test 1: Basic PDF generation
-    if test_card_generator():
-        success_count += 1
+    success_count = 0
+    total_tests = len(tests)
     
-    # Test 2: Image processing
-    if test_image_processing():
-        success_count += 1
+    for test in tests:
+        if test():
+            success_count += 1
     
     # Summary
     print(f"\n{'='*60}")
@@ -0,0 +1,86 @@
+"""
+Text layout for the Android Card Generator
+Wraps card text on measured glyph widths and memoizes every layout, so a
+deck with repeated Task/Rules text pays for one layout per unique string
+"""
+
+from functools import lru_cache
+
+from reportlab.pdfbase.pdfmetrics import stringWidth
+
+LAYOUT_CACHE_SIZE = 4096
+SHRINK_STEP = 0.25  # Font size decrement (pt) when shrinking text to fit
+
+
+def _split_word(word, font_name, font_size, max_width):
+    """Break a word that is wider than the box into pieces that fit"""
+    pieces = []
+    current = ''
+    for char in word:
+        if current and stringWidth(current + char, font_name, font_size) > max_width:
+            pieces.append(current)
+            current = char
+        else:
+            current += char
+    if current:
+        pieces.append(current)
+    return pieces
+
+
+@lru_cache(maxsize=LAYOUT_CACHE_SIZE)
+def wrap_lines(text, font_name, font_size, max_width):
+    """Greedy word wrap on real glyph widths; returns a tuple of lines"""
+    space_width = stringWidth(' ', font_name, font_size)
+    lines = []
+    current = []
+    current_width = 0
+
+    for word in text.split():
+        word_width = stringWidth(word, font_name, font_size)
+        if word_width > max_width:
+            pieces = _split_word(word, font_name, font_size, max_width)
+        else:
+            pieces = [word]
+
+        for piece in pieces:
+            piece_width = word_width if len(pieces) == 1 else stringWidth(piece, font_name, font_size)
+            if current and current_width + space_width + piece_width > max_width:
+                lines.append(' '.join(current))
+                current = [piece]
+                current_width = piece_width
+            elif current:
+                current.append(piece)
+                current_width += space_width + piece_width
+            else:
+                current = [piece]
+                current_width = piece_width
+
+    if current:
+        lines.append(' '.join(current))
+    return tuple(lines)
+
+
+@lru_cache(maxsize=LAYOUT_CACHE_SIZE)
+def fit_text(text, font_name, font_size, max_width, max_lines=2, min_font_size=None):
+    """Lay text out in at most max_lines lines; returns (lines, font_size)
+
+    With min_font_size set, the size is reduced step by step until the text
+    fits, never going below min_font_size.  Text that still does not fit is
+    truncated to max_lines.
+    """
+    lines = wrap_lines(text, font_name, font_size, max_width)
+    if min_font_size is not None:
+        while len(lines) > max_lines and font_size - SHRINK_STEP >= min_font_size:
+            font_size -= SHRINK_STEP
+            lines = wrap_lines(text, font_name, font_size, max_width)
+    return lines[:max_lines], font_size
+
+
+def layout_cache_info():
+    """Hit/miss statistics for the layout caches"""
+    return {'fit_text': fit_text.cache_info(), 'wrap_lines': wrap_lines.cache_info()}
+
+
+def clear_layout_cache():
+    fit_text.cache_clear()
+    wrap_lines.cache_clear()
@@ -0,0 +1,132 @@
+"""
+Background thumbnails for the Android Card Generator
+Decodes picked photos off the UI thread and downscales them to preview size,
+so the editor never uploads a full camera image as a texture.  Thumbnails
+are kept in a bounded memory cache and on disk, keyed by file content.
+"""
+
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+import hashlib
+import os
+import threading
+
+from render_cache import RenderCache
+
+DEFAULT_THUMB_SIZE = (160, 160)  # Pixels; comfortably covers dp(60) on xxhdpi
+HASH_CHUNK = 1024 * 1024
+
+
+def file_digest(image_path):
+    """Content hash of a file, read in chunks"""
+    digest = hashlib.sha1()
+    with open(image_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def make_thumbnail(image_path, size):
+    """Decode image_path at reduced resolution and shrink it to fit size"""
+    # Imported on the first thumbnail (on a worker thread), keeping PIL out of startup
+    from PIL import Image as PILImage, ImageOps
+    with PILImage.open(image_path) as image:
+        # JPEGs decode straight at 1/2, 1/4 or 1/8 scale
+        image.draft('RGB', size)
+        image = ImageOps.exif_transpose(image)
+        image.thumbnail(size, PILImage.LANCZOS)
+        return image.convert('RGBA')
+
+
+class ThumbnailService:
+    """Thread pool that turns image paths into small RGBA thumbnails
+
+    request() never blocks: the callback is invoked on a worker thread
+    with (image_path, thumbnail or None), so UI code must hop back to its
+    own thread before touching widgets.
+    """
+
+    def __init__(self, cache_dir=None, size=DEFAULT_THUMB_SIZE, max_bytes=8 * 1024 * 1024,
+                 disk_bytes=32 * 1024 * 1024, workers=2):
+        self.size = (int(size[0]), int(size[1]))
+        self.max_bytes = max_bytes
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.disk_hits = 0
+        self.disk_cache = RenderCache(cache_dir, disk_bytes) if cache_dir else None
+        self._entries = OrderedDict()
+        self._digests = {}  # (path, mtime, size) -> content hash
+        self._lock = threading.Lock()
+        self._disk_lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=workers,
+                                            thread_name_prefix='thumbnail')
+
+    def __len__(self):
+        return len(self._entries)
+
+    def digest(self, image_path):
+        """Content hash of image_path, re-read only when the file changes"""
+        stat = os.stat(image_path)
+        stamp = (os.path.abspath(image_path), stat.st_mtime_ns, stat.st_size)
+        digest = self._digests.get(stamp)
+        if digest is None:
+            digest = self._digests[stamp] = file_digest(image_path)
+        return digest
+
+    def get(self, image_path):
+        """Return the thumbnail for image_path, decoding it on a miss (blocking)"""
+        key = f'{self.digest(image_path)}_{self.size[0]}x{self.size[1]}'
+        with self._lock:
+            thumb = self._entries.get(key)
+            if thumb is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return thumb
+            self.misses += 1
+
+        thumb = None
+        if self.disk_cache is not None:
+            # RenderCache keeps an in-memory index; workers take turns with it
+            with self._disk_lock:
+                thumb = self.disk_cache.load_image(key)
+            if thumb is not None:
+                self.disk_hits += 1
+        if thumb is None:
+            thumb = make_thumbnail(image_path, self.size)
+            if self.disk_cache is not None:
+                with self._disk_lock:
+                    self.disk_cache.store_image(key, thumb)
+        thumb = thumb.convert('RGBA')
+
+        with self._lock:
+            if key not in self._entries:
+                self._entries[key] = thumb
+                self.current_bytes += thumb.width * thumb.height * 4
+                self._evict()
+        return thumb
+
+    def request(self, image_path, callback):
+        """Build the thumbnail in the background; returns the Future"""
+        def work():
+            try:
+                thumb = self.get(image_path)
+            except (OSError, ValueError) as e:
+                print(f"Error creating thumbnail for {image_path}: {e}")
+                thumb = None
+            callback(image_path, thumb)
+            return thumb
+        return self._executor.submit(work)
+
+    def _evict(self):
+        while self.current_bytes > self.max_bytes and len(self._entries) > 1:
+            _, old = self._entries.popitem(last=False)
+            self.current_bytes -= old.width * old.height * 4
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.current_bytes = 0
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)